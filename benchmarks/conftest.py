@@ -0,0 +1,100 @@
+"""
+Benchmarks py.test configuration and fixtures
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from .corpus import generate_gelf_corpus
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+RESULTS = {}
+
+
+def pytest_addoption(parser):
+    """Add benchmarks command line options"""
+
+    group = parser.getgroup("benchmarks")
+    group.addoption(
+        "--benchmark-events",
+        type=int,
+        default=200000,
+        help="Number of GELF records of the synthetic corpus",
+    )
+    group.addoption(
+        "--benchmark-threshold",
+        type=float,
+        default=0.2,
+        help="Tolerated relative regression compared to the baseline",
+    )
+    group.addoption(
+        "--benchmark-baseline",
+        default=str(BASELINE_FILE),
+        help="Path to the baseline results file",
+    )
+    group.addoption(
+        "--benchmark-update",
+        action="store_true",
+        default=False,
+        help="Write benchmark results to the baseline file",
+    )
+
+
+@pytest.fixture(scope="session")
+def gelf_corpus(request, tmp_path_factory):
+    """Generate a deterministic synthetic GELF corpus."""
+
+    events = request.config.getoption("--benchmark-events")
+    path = tmp_path_factory.mktemp("corpus") / f"gelf-{events}.log"
+    generate_gelf_corpus(str(path), events)
+    return str(path), events
+
+
+@pytest.fixture(scope="session")
+def baseline(request):
+    """Load baseline results (benchmarks are skipped without baseline, unless
+    it is being updated)."""
+
+    path = Path(request.config.getoption("--benchmark-baseline"))
+    if not path.exists():
+        if request.config.getoption("--benchmark-update"):
+            return {}
+        pytest.skip(f"no baseline results ({path}), create it with --benchmark-update")
+    with path.open() as baseline_file:
+        return json.load(baseline_file)
+
+
+@pytest.fixture
+def benchmark_results():
+    """Collect benchmark results (reported at the end of the session)."""
+
+    return RESULTS
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    """Report benchmark results and update the baseline if required"""
+
+    if not RESULTS:
+        return
+
+    terminalreporter.section("benchmarks")
+    terminalreporter.write_line(
+        f"{'benchmark':<32}{'events/s':>12}{'peak RSS (MiB)':>16}"
+        f"{'p50 chunk (ms)':>16}{'p95 chunk (ms)':>16}"
+    )
+    for name, result in RESULTS.items():
+        terminalreporter.write_line(
+            f"{name:<32}{result['events_per_second']:>12.0f}"
+            f"{result['peak_rss'] / 1024:>16.1f}"
+            f"{result['chunk_latency_p50'] * 1000:>16.2f}"
+            f"{result['chunk_latency_p95'] * 1000:>16.2f}"
+        )
+
+    if config.getoption("--benchmark-update"):
+        path = Path(config.getoption("--benchmark-baseline"))
+        results = json.loads(path.read_text()) if path.exists() else {}
+        results.update(RESULTS)
+        path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+        terminalreporter.write_line(f"Baseline updated: {path}")
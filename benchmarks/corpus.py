@@ -0,0 +1,78 @@
+"""
+Synthetic GELF corpus generation for benchmarks.
+"""
+
+import json
+import random
+
+EVENT_TYPES = (
+    "play_video",
+    "pause_video",
+    "seek_video",
+    "problem_check",
+    "problem_graded",
+    "page_close",
+    "edx.course.enrollment.activated",
+    "/courses/course-v1:ralph+bench+2021/courseware",
+)
+EVENT_SOURCES = ("browser", "server", "mobile")
+
+
+def generate_event(rng, idx):
+    """Generate an Open edX tracking log event."""
+
+    course_id = f"course-v1:ralph+bench{rng.randrange(10)}+2021"
+    return {
+        "username": f"user_{rng.randrange(10000)}",
+        "event_type": rng.choice(EVENT_TYPES),
+        "event_source": rng.choice(EVENT_SOURCES),
+        "event": json.dumps(
+            {"id": f"block-v1:{course_id}+type@video+block@{rng.randrange(100)}"}
+        ),
+        "time": f"2021-01-{idx % 28 + 1:02d}T12:00:{idx % 60:02d}.000000+00:00",
+        "ip": f"10.0.{rng.randrange(256)}.{rng.randrange(256)}",
+        "agent": "Mozilla/5.0 (X11; Linux x86_64) Gecko/20100101 Firefox/84.0",
+        "host": "lms.example.com",
+        "referer": f"https://lms.example.com/courses/{course_id}/courseware",
+        "accept_language": "fr-FR,fr;q=0.9",
+        "page": None,
+        "session": f"{rng.getrandbits(128):032x}",
+        "context": {
+            "course_id": course_id,
+            "org_id": "ralph",
+            "user_id": rng.randrange(100000),
+            "path": "/event",
+        },
+    }
+
+
+def generate_gelf_record(rng, idx):
+    """Generate a GELF record (as the gelf_logger test fixture does) wrapping
+    an Open edX event."""
+
+    return json.dumps(
+        {
+            "version": "1.1",
+            "host": "ralph-benchmark",
+            "short_message": json.dumps(generate_event(rng, idx)),
+            "timestamp": 1609459200.0 + idx,
+            "level": 6,
+            "_logger": "tracking",
+        }
+    )
+
+
+def generate_gelf_corpus(path, events, seed=42):
+    """Write a deterministic GELF corpus of events records to path.
+
+    Args:
+        path (string): Path to the corpus file.
+        events (int): The number of GELF records to generate.
+        seed (int): The random generator seed (same seed, same corpus).
+
+    """
+
+    rng = random.Random(seed)
+    with open(path, "w") as corpus:
+        for idx in range(events):
+            corpus.write(generate_gelf_record(rng, idx) + "\n")
@@ -0,0 +1,83 @@
+"""
+GELF parser throughput benchmarks.
+"""
+
+import resource
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pytest
+
+from ralph.parsers import GELFParser
+
+ENGINES = ("pandas", "json", "orjson", "msgspec")
+CHUNK_SIZES = (1000, 5000, 10000)
+
+
+def measure_parser(input_file, engine, chunksize):
+    """Parse the input file and measure the parser performance.
+
+    This function is run in a dedicated process so that the peak resident set
+    size only accounts for this benchmark.
+    """
+
+    parser = GELFParser(engine=engine)
+    latencies = []
+    events = 0
+    start = chunk_start = time.perf_counter()
+    for events, _ in enumerate(parser.parse(input_file, chunksize=chunksize), 1):
+        # Events are yielded by bursts of chunksize events
+        if events % chunksize == 0:
+            now = time.perf_counter()
+            latencies.append(now - chunk_start)
+            chunk_start = now
+    duration = time.perf_counter() - start
+    latencies = latencies or [duration]
+
+    return {
+        "events": events,
+        "duration": duration,
+        "events_per_second": events / duration,
+        # Kilobytes on Linux
+        "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "chunk_latency_p50": statistics.median(latencies),
+        "chunk_latency_p95": sorted(latencies)[int(len(latencies) * 0.95)],
+        "chunk_latency_max": max(latencies),
+    }
+
+
+@pytest.mark.parametrize("chunksize", CHUNK_SIZES)
+@pytest.mark.parametrize("engine", ENGINES)
+def test_gelfparser_throughput(
+    request, gelf_corpus, baseline, benchmark_results, engine, chunksize
+):
+    """Benchmark the GELFParser engines with various chunk sizes."""
+    # pylint: disable=too-many-arguments
+
+    if engine != "json":
+        pytest.importorskip(engine)
+
+    input_file, events = gelf_corpus
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        result = pool.submit(measure_parser, input_file, engine, chunksize).result()
+    assert result["events"] == events
+
+    name = f"gelf-{events}-{engine}-{chunksize}"
+    benchmark_results[name] = result
+
+    if name not in baseline:
+        pytest.skip(f"no baseline results for {name}")
+    threshold = request.config.getoption("--benchmark-threshold")
+    expected = baseline[name]
+    assert result["events_per_second"] >= expected["events_per_second"] * (
+        1 - threshold
+    ), (
+        f"{name} throughput regression: {result['events_per_second']:.0f} events/s "
+        f"(baseline: {expected['events_per_second']:.0f} events/s)"
+    )
+    assert result["peak_rss"] <= expected["peak_rss"] * (1 + threshold), (
+        f"{name} memory regression: {result['peak_rss']} KiB "
+        f"(baseline: {expected['peak_rss']} KiB)"
+    )
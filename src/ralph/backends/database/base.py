@@ -13,5 +13,5 @@ class BaseDatabase(ABC):
         """Read chunk_size records and stream them to stdout"""
 
     @abstractmethod
-    def put(self, chunk_size=10):
-        """Write chunk_size records from stdin"""
+    def put(self, chunk_size=10, stream=None):
+        """Write chunk_size records from the stream (or stdin)"""
@@ -47,8 +47,9 @@ class ESDatabase(BaseDatabase):
                 "_source": item,
             }
 
-    def put(self, chunk_size=500):
-        """Write documents streamed from the standard input to the instance index"""
+    def put(self, chunk_size=500, stream=None):
+        """Write documents streamed from the standard input (or the given
+        stream of lines) to the instance index"""
 
         logger.debug(
             "Start writing to the %s index (chunk size: %d)", self.index, chunk_size
@@ -57,7 +58,7 @@ class ESDatabase(BaseDatabase):
         documents = 0
         for success, action in streaming_bulk(
             client=self.client,
-            actions=self.to_documents(sys.stdin, lambda d: d.get("id", None)),
+            actions=self.to_documents(stream or sys.stdin, lambda d: d.get("id", None)),
             chunk_size=chunk_size,
         ):
             documents += success
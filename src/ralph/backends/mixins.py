@@ -3,7 +3,8 @@
 import json
 import logging
 
-from ralph.defaults import HISTORY_FILE
+from ralph.defaults import HISTORY_FILE, LEGACY_HISTORY_FILE
+from ralph.history import HistoryStore
 
 logger = logging.getLogger(__name__)
 
@@ -12,44 +13,52 @@ class HistoryMixin:
     """Handle backend download history to avoid fetching same files multiple
     times if they are already available."""
 
+    @property
+    def history_store(self):
+        """Get backend history store"""
+
+        if not hasattr(self, "_history_store"):
+            self._history_store = HistoryStore(HISTORY_FILE, LEGACY_HISTORY_FILE)
+        return self._history_store
+
     @property
     def history(self):
         """Get backend history"""
 
-        logging.debug("Loading history file: %s", str(HISTORY_FILE))
+        return self.history_store.entries
 
-        if not hasattr(self, "_history"):
-            try:
-                with HISTORY_FILE.open() as history_file:
-                    self._history = json.load(history_file)
-            except FileNotFoundError:
-                self._history = []
-        return self._history
+    def get_history_ids(self, command):
+        """Get ids of the backend history entries of a command (e.g. ids of
+        fetched archives)"""
 
-    # pylint: disable=no-self-use
-    def write_history(self, history):
-        """Write given history as a JSON file"""
+        return self.history_store.ids(self.name, command)
 
-        logging.debug("Writing history file: %s", str(HISTORY_FILE))
-
-        if not HISTORY_FILE.parent.exists():
-            HISTORY_FILE.parent.mkdir(parents=True)
+    def write_history(self, history):
+        """Write given history as a JSON lines file
 
-        with HISTORY_FILE.open("w") as history_file:
-            json.dump(history, history_file)
+        The given history replaces the loaded one: entries appended to the
+        history file by other processes since then are kept.
+        """
 
-        # Update history
-        self._history = history
+        loaded = {json.dumps(entry, sort_keys=True) for entry in self.history}
+        history = list(history)
+        self.history_store.rewrite(
+            lambda entries: history
+            + [
+                entry
+                for entry in entries
+                if json.dumps(entry, sort_keys=True) not in loaded
+            ]
+        )
 
     def clean_history(self, selector):
         """Clean selected events from the history.
 
         selector: a callable that selects events that need to be removed
         """
-        self._history = list(filter(lambda event: not selector(event), self.history))
-        self.write_history(self._history)
+        self.history_store.remove(selector)
 
     def append_to_history(self, event):
         """Append event to history"""
 
-        self.write_history(self.history + [event])
+        self.history_store.append(event)
@@ -1,25 +1,98 @@
 """Base storage backend for Ralph"""
 
+import logging
 from abc import ABC, abstractmethod
+from fnmatch import fnmatchcase
+
+from ralph.exceptions import BackendParameterException
+
+logger = logging.getLogger(__name__)
+
+
+def match_archive(name, prefix=None, pattern=None):
+    """Whether an archive name starts with the prefix and matches the glob
+    pattern (if given)"""
+
+    if prefix and not name.startswith(prefix):
+        return False
+    return not pattern or fnmatchcase(name, pattern)
+
+
+def check_read_range(offset, length, decompress):
+    """Check the byte range of an archive to read"""
+
+    if offset < 0 or (length is not None and length < 0):
+        msg = "Invalid archive range (offset: %s | length: %s)"
+        logger.error(msg, offset, length)
+        raise BackendParameterException(msg % (offset, length))
+    if decompress and (offset or length is not None):
+        msg = "Cannot decompress a range of an archive"
+        logger.error(msg)
+        raise BackendParameterException(msg)
+
+
+def check_list_filters(storage, **filters):
+    """Check list filters given (not None) are supported by the storage
+    backend"""
+
+    for name, value in filters.items():
+        if value is not None and name not in storage.list_filters:
+            msg = "The %s backend does not support the %s filter"
+            logger.error(msg, storage.name, name)
+            raise BackendParameterException(msg % (storage.name, name))
 
 
 class BaseStorage(ABC):
     """Base storage backend interface"""
 
     name = "base"
+    # Filters of listed archives supported by the backend
+    list_filters = ("prefix", "pattern", "limit", "offset")
 
     @abstractmethod
-    def list(self, details=False, new=False):
-        """List files in the storage backend"""
+    def list(  # pylint: disable=too-many-arguments
+        self,
+        details=False,
+        new=False,
+        prefix=None,
+        pattern=None,
+        limit=None,
+        offset=0,
+        since=None,
+        until=None,
+        sort=None,
+    ):
+        """List files in the storage backend
+
+        Archives can be filtered by name prefix or glob pattern and paginated
+        (skipping `offset` archives and listing at most `limit` archives).
+        Backends may also filter archives by modification date (`since` and
+        `until` datetimes) and sort them (`sort` key): filters supported by a
+        backend are listed in its `list_filters` attribute.
+        """
 
     @abstractmethod
     def url(self, name):
         """Get `name` file absolute URL"""
 
     @abstractmethod
-    def read(self, name, chunk_size=4096):
-        """Read `name` file and stream its content by chunks of a given size"""
+    def read(  # pylint: disable=too-many-arguments
+        self, name, chunk_size=4096, decompress=False, offset=0, length=None
+    ):
+        """Read `name` file and stream its content by chunks of a given size
+
+        If decompress is True, compressed content (gzip, bz2, xz or zstd) is
+        decompressed before being streamed.
+
+        Only `length` bytes (or until the end of the file) starting from the
+        `offset` byte are streamed if given (whole archives only are recorded
+        in the history).
+        """
 
     @abstractmethod
-    def write(self, name, chunk_size=4096, overwrite=False):
-        """Write content to the `name` target"""
+    def write(self, name, chunk_size=4096, overwrite=False, stream=None):
+        """Write content to the `name` target
+
+        Content is read from the stream if given, from the standard input
+        otherwise.
+        """
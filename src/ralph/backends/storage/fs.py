@@ -1,26 +1,127 @@
 """FileSystem storage backend for Ralph"""
 
 import datetime
+import errno
+import io
 import logging
+import os
 import sys
+from itertools import islice
+from operator import attrgetter
 from pathlib import Path
 
-from ralph.defaults import FS_STORAGE_DEFAULT_PATH
+from ralph.compression import iter_decompress, iter_file_chunks
+from ralph.defaults import (
+    DEFAULT_FS_READ_BUFFER_SIZE,
+    DEFAULT_FS_WRITE_BUFFER_SIZE,
+    FS_STORAGE_DEFAULT_FSYNC,
+    FS_STORAGE_DEFAULT_PATH,
+)
+from ralph.exceptions import ConfigurationException
 
 from ..mixins import HistoryMixin
-from .base import BaseStorage
+from .base import BaseStorage, check_read_range, match_archive
 
 logger = logging.getLogger(__name__)
 
+# sendfile errors meaning that file descriptors are not supported (e.g. file
+# descriptors of in-memory file objects)
+SENDFILE_UNSUPPORTED_ERRORS = {
+    errno.EBADF,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.EOPNOTSUPP,
+}
+FSYNC_POLICIES = ("none", "file", "full")
+# Archives sort keys (of directory entries)
+SORT_KEYS = {
+    "name": attrgetter("name"),
+    "size": lambda entry: entry.stat().st_size,
+    "modified": lambda entry: entry.stat().st_mtime,
+}
+
+
+def sendfile(file, stream, length=None):
+    """Copy the remaining content of a file (or its next `length` bytes) to a
+    binary stream with the `sendfile` system call (the kernel copies data
+    without going through Python buffers).
+
+    Returns:
+        False if the stream does not support it (nothing has been copied).
+
+    """
+
+    if not hasattr(os, "sendfile"):
+        return False
+    try:
+        in_fd, out_fd = file.fileno(), stream.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return False
+
+    stream.flush()
+    offset = file.tell()
+    size = os.fstat(in_fd).st_size
+    if length is not None:
+        size = min(size, offset + length)
+    while offset < size:
+        try:
+            sent = os.sendfile(out_fd, in_fd, offset, size - offset)
+        except OSError as error:
+            if error.errno not in SENDFILE_UNSUPPORTED_ERRORS:
+                raise
+            # Copy the remaining content through Python buffers
+            file.seek(offset)
+            return False
+        if not sent:
+            break
+        offset += sent
+    file.seek(offset)
+    return True
+
+
+def copy_file(file, stream, buffer_size=DEFAULT_FS_READ_BUFFER_SIZE, length=None):
+    """Copy the remaining content of a file (or its next `length` bytes) to a
+    binary stream (with `sendfile` if possible, reading it into a reused buffer
+    otherwise)."""
+
+    start = file.tell()
+    if sendfile(file, stream, length):
+        return
+
+    view = memoryview(bytearray(buffer_size))
+    if length is not None:
+        # sendfile may have copied a part of the content before failing
+        length -= file.tell() - start
+    while length is None or length > 0:
+        read = file.readinto(view if length is None else view[:length])
+        if not read:
+            break
+        stream.write(view[:read])
+        if length is not None:
+            length -= read
+
 
 class FSStorage(HistoryMixin, BaseStorage):
     """FileSystem storage backend"""
 
     name = "fs"
+    list_filters = BaseStorage.list_filters + ("since", "until", "sort")
+
+    # pylint: disable=too-many-arguments
 
-    def __init__(self, path=FS_STORAGE_DEFAULT_PATH):
-        """Create the path directory if it does not exist"""
+    def __init__(self, path=FS_STORAGE_DEFAULT_PATH, fsync=FS_STORAGE_DEFAULT_FSYNC):
+        """Create the path directory if it does not exist
 
+        fsync: sync written archives to disk before renaming them (`file`),
+        sync the storage directory after renaming them as well (`full`) or
+        leave it to the operating system (`none`)
+        """
+
+        if fsync not in FSYNC_POLICIES:
+            msg = "Invalid fsync policy %s (expected one of: %s)"
+            logger.error(msg, fsync, ", ".join(FSYNC_POLICIES))
+            raise ConfigurationException(msg % (fsync, ", ".join(FSYNC_POLICIES)))
+        self._fsync = fsync
         self._path = Path(path)
         if not self._path.is_dir():
             logger.info("FS storage directory doesn't exist, creating: %s", self._path)
@@ -28,6 +129,43 @@ class FSStorage(HistoryMixin, BaseStorage):
 
         logger.debug("File system storage path: %s", self._path)
 
+    @staticmethod
+    def _is_temporary(name):
+        """Return whether the file is an archive being written"""
+
+        return name.startswith(".") and name.endswith(".tmp")
+
+    def _rename(self, temporary, file_path, name, overwrite):
+        """Atomically rename a written temporary file to the archive path"""
+
+        if overwrite:
+            os.replace(temporary, file_path)
+        else:
+            # Linking fails if the archive has been created in the meantime
+            try:
+                os.link(temporary, file_path)
+            except FileExistsError:
+                msg = "%s already exists and overwrite is not allowed"
+                logger.error(msg, name)
+                raise FileExistsError(msg, name) from None
+            except OSError as error:
+                # Some file systems do not support hard links
+                logger.debug("Cannot link %s (%s), renaming it", name, error)
+                if file_path.exists():
+                    msg = "%s already exists and overwrite is not allowed"
+                    logger.error(msg, name)
+                    raise FileExistsError(msg, name) from None
+                os.replace(temporary, file_path)
+            else:
+                temporary.unlink()
+
+        if self._fsync == "full":
+            directory = os.open(file_path.parent, os.O_RDONLY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+
     def _get_filepath(self, name, strict=False):
         """Return path of the archive in the FS storage, or throws an exception if not found"""
 
@@ -38,11 +176,11 @@ class FSStorage(HistoryMixin, BaseStorage):
             raise FileNotFoundError(msg % file_path)
         return file_path
 
-    def _details(self, name):
+    def _details(self, name, stats=None):
         """Get name archive details"""
 
-        file_path = self._get_filepath(name)
-        stats = file_path.stat()
+        if stats is None:
+            stats = self._get_filepath(name).stat()
 
         return {
             "filename": name,
@@ -52,39 +190,117 @@ class FSStorage(HistoryMixin, BaseStorage):
             ).isoformat(),
         }
 
-    def list(self, details=False, new=False):
-        """List files in the storage backend"""
+    def list(
+        self,
+        details=False,
+        new=False,
+        prefix=None,
+        pattern=None,
+        limit=None,
+        offset=0,
+        since=None,
+        until=None,
+        sort=None,
+    ):
+        """List files in the storage backend
 
-        archives = [archive.name for archive in self._path.iterdir()]
-        logger.debug("Found %d archives", len(archives))
+        Archives are streamed while the storage directory is scanned, unless
+        they are sorted. Files stats are only read once (and only if needed).
 
-        if new:
-            archives = set(archives) - set(
-                entry.get("id")
-                for entry in filter(
-                    lambda e: e["backend"] == self.name and e["command"] == "fetch",
-                    self.history,
-                )
-            )
+        prefix, pattern: list only archives starting with the prefix or
+        matching the glob pattern
+
+        limit, offset: list at most `limit` archives after skipping `offset`
+        archives
+
+        since, until: list only archives modified since (or until) this
+        datetime (UTC if naive)
+
+        sort: sort archives by `name`, `size` or `modified` date (prefixed
+        with `-` for descending order)
+        """
+
+        entries = self._scan(
+            prefix=prefix,
+            pattern=pattern,
+            fetched=self.get_history_ids("fetch") if new else (),
+            since=self._get_timestamp(since),
+            until=self._get_timestamp(until),
+        )
+        if sort:
+            key = SORT_KEYS[sort.lstrip("-")]
+            entries = sorted(entries, key=key, reverse=sort.startswith("-"))
+
+        stop = offset + limit if limit is not None else None
+        for entry in islice(entries, offset, stop):
+            yield self._details(entry.name, entry.stat()) if details else entry.name
+
+    @staticmethod
+    def _get_timestamp(date):
+        """Return the POSIX timestamp of a datetime (UTC if naive) or None"""
+
+        if date is None:
+            return None
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=datetime.timezone.utc)
+        return date.timestamp()
 
-            logger.debug("New archives: %d", len(archives))
+    def _scan(self, prefix, pattern, fetched, since, until):
+        """Yield directory entries of archives matching filters"""
 
-        for archive in archives:
-            yield self._details(archive) if details else archive
+        with os.scandir(self._path) as entries:
+            for entry in entries:
+                name = entry.name
+                if (
+                    self._is_temporary(name)
+                    or name in fetched
+                    or not match_archive(name, prefix, pattern)
+                    or not entry.is_file()
+                ):
+                    continue
+                if since is not None or until is not None:
+                    # Entries cache their stats
+                    modified = entry.stat().st_mtime
+                    if since is not None and modified < since:
+                        continue
+                    if until is not None and modified > until:
+                        continue
+                yield entry
 
     def url(self, name):
         """Get `name` file absolute URL"""
 
         return str(self._get_filepath(name).resolve(strict=True))
 
-    def read(self, name, chunk_size=4096):
+    def read(self, name, chunk_size=4096, decompress=False, offset=0, length=None):
         """Read `name` file and stream its content by chunks of a given size"""
 
-        logger.debug("Getting archive: %s", name)
+        logger.debug(
+            "Getting archive: %s (decompress: %s | offset: %s | length: %s)",
+            name,
+            decompress,
+            offset,
+            length,
+        )
+        check_read_range(offset, length, decompress)
 
         with self._get_filepath(name).open("rb") as file:
-            while chunk := file.read(chunk_size):
-                sys.stdout.buffer.write(chunk)
+            if not decompress:
+                # Archives are copied by large buffers (or by the kernel)
+                file.seek(offset)
+                sys.stdout.flush()
+                copy_file(
+                    file,
+                    sys.stdout.buffer,
+                    max(chunk_size, DEFAULT_FS_READ_BUFFER_SIZE),
+                    length,
+                )
+            else:
+                for chunk in iter_decompress(iter_file_chunks(file, chunk_size)):
+                    sys.stdout.buffer.write(chunk)
+
+        if offset or length is not None:
+            return
 
         details = self._details(name)
         # Archive is supposed to have been fully fetched, add a new entry to
@@ -102,8 +318,13 @@ class FSStorage(HistoryMixin, BaseStorage):
             }
         )
 
-    def write(self, name, chunk_size=4096, overwrite=False):
-        """Write content to the `name` target"""
+    def write(self, name, chunk_size=4096, overwrite=False, stream=None):
+        """Write content read from the standard input (or the given stream) to
+        the `name` target
+
+        Content is written to a temporary file renamed to the target once
+        complete: an interrupted write never leaves a partial archive.
+        """
 
         logger.debug("Creating archive: %s", name)
 
@@ -113,9 +334,22 @@ class FSStorage(HistoryMixin, BaseStorage):
             logger.error(msg, name)
             raise FileExistsError(msg, name)
 
-        with file_path.open("w") as file:
-            while chunk := sys.stdin.read(chunk_size):
-                file.write(chunk)
+        # Binary content is copied untouched (text streams are UTF-8 encoded)
+        stream = stream or sys.stdin
+        stream = getattr(stream, "buffer", stream)
+        buffer_size = max(chunk_size, DEFAULT_FS_WRITE_BUFFER_SIZE)
+        temporary = file_path.with_name(f".{file_path.name}.{os.getpid()}.tmp")
+        try:
+            with temporary.open("wb") as file:
+                while chunk := stream.read(buffer_size):
+                    file.write(chunk.encode() if isinstance(chunk, str) else chunk)
+                if self._fsync != "none":
+                    file.flush()
+                    os.fsync(file.fileno())
+            self._rename(temporary, file_path, name, overwrite)
+        except BaseException:
+            temporary.unlink(missing_ok=True)
+            raise
 
         details = self._details(name)
         # Archive is supposed to have been fully created, add a new entry to
@@ -3,14 +3,23 @@
 import datetime
 import logging
 import sys
+import time
+from itertools import islice
 
 import ovh
 import requests
 
+from ralph.compression import iter_decompress
+from ralph.defaults import (
+    LDP_STORAGE_CONNECT_TIMEOUT,
+    LDP_STORAGE_READ_RETRIES,
+    LDP_STORAGE_READ_RETRY_DELAY,
+    LDP_STORAGE_READ_TIMEOUT,
+)
 from ralph.exceptions import BackendParameterException
 
 from ..mixins import HistoryMixin
-from .base import BaseStorage
+from .base import BaseStorage, check_list_filters, check_read_range, match_archive
 
 logger = logging.getLogger(__name__)
 
@@ -82,15 +91,36 @@ class LDPStorage(HistoryMixin, BaseStorage):
 
         return download_url
 
-    def list(self, details=False, new=False):
+    def list(
+        self,
+        details=False,
+        new=False,
+        prefix=None,
+        pattern=None,
+        limit=None,
+        offset=0,
+        since=None,
+        until=None,
+        sort=None,
+    ):
         """List archives for a given stream.
 
         details: get detailled information about archives instead of their ids
 
         new: given the history, list only not already fetched archives
 
+        prefix, pattern: list only archives ids starting with the prefix or
+        matching the glob pattern
+
+        limit, offset: list at most `limit` archives after skipping `offset`
+        archives
+
+        since, until, sort: not supported by this backend
+
         """
 
+        check_list_filters(self, since=since, until=until, sort=sort)
+
         list_archives_endpoint = self._archive_endpoint
         logger.debug("List archives endpoint: %s", list_archives_endpoint)
         logger.debug("List archives details: %s", str(details))
@@ -98,32 +128,45 @@ class LDPStorage(HistoryMixin, BaseStorage):
         archives = self.client.get(list_archives_endpoint)
         logger.debug("Found %d archives", len(archives))
 
-        if new:
-            archives = set(archives) - set(
-                entry.get("id")
-                for entry in filter(
-                    lambda e: e["backend"] == self.name and e["command"] == "fetch",
-                    self.history,
-                )
-            )
-            logger.debug("New archives: %d", len(archives))
-
-        for archive in archives:
+        fetched = self.get_history_ids("fetch") if new else ()
+        archives = (
+            archive
+            for archive in archives
+            if archive not in fetched and match_archive(archive, prefix, pattern)
+        )
+        stop = offset + limit if limit is not None else None
+        for archive in islice(archives, offset, stop):
             yield self._details(archive) if details else archive
 
-    def read(self, name, chunk_size=4096):
-        """Read the `name` archive file and stream its content"""
+    def read(self, name, chunk_size=4096, decompress=False, offset=0, length=None):
+        """Read the `name` archive file and stream its content
 
-        logger.debug("Getting archive: %s", name)
+        Interrupted downloads are resumed from the last streamed byte.
+        """
+
+        logger.debug(
+            "Getting archive: %s (decompress: %s | offset: %s | length: %s)",
+            name,
+            decompress,
+            offset,
+            length,
+        )
+        check_read_range(offset, length, decompress)
 
         # Get detailled information about the archive to fetch
         details = self._details(name)
 
         # Stream response (archive content)
-        with requests.get(self.url(name), stream=True) as result:
-            result.raise_for_status()
-            for chunk in result.iter_content(chunk_size=chunk_size):
-                sys.stdout.buffer.write(chunk)
+        chunks = self._iter_content(
+            name, chunk_size, offset, length, size=details.get("size")
+        )
+        if decompress:
+            chunks = iter_decompress(chunks)
+        for chunk in chunks:
+            sys.stdout.buffer.write(chunk)
+
+        if offset or length is not None:
+            return
 
         # Archive is supposed to have been fully fetched, add a new entry to
         # the history.
@@ -140,7 +183,103 @@ class LDPStorage(HistoryMixin, BaseStorage):
             }
         )
 
-    def write(self, name, chunk_size=4096, overwrite=False):
+    def _request(self, name, offset, end):
+        """Request the `name` archive content from the `offset` byte (to the
+        `end` byte excluded, if given)"""
+
+        options = {"timeout": (LDP_STORAGE_CONNECT_TIMEOUT, LDP_STORAGE_READ_TIMEOUT)}
+        if offset or end is not None:
+            last = end - 1 if end is not None else ""
+            options["headers"] = {"Range": f"bytes={offset}-{last}"}
+        # A new temporary URL is requested as the previous one may have expired
+        return requests.get(self.url(name), stream=True, **options)
+
+    # pylint: disable=too-many-arguments
+    def _iter_content(
+        self,
+        name,
+        chunk_size,
+        offset=0,
+        length=None,
+        size=None,
+        retries=LDP_STORAGE_READ_RETRIES,
+        retry_delay=LDP_STORAGE_READ_RETRY_DELAY,
+    ):
+        """Yield the `name` archive content (from the `offset` byte).
+
+        Yielded bytes are counted against the expected content size (the
+        requested `length`, the archive `size` or the response Content-Length).
+        If the connection fails, the server responds with an error (5xx) or
+        the content is short, the download is resumed with a HTTP range
+        request starting from the next byte to yield (up to `retries` times in
+        a row, waiting `retry_delay` seconds the first time and twice as long
+        each time).
+        """
+
+        end = offset + length if length is not None else None
+        if size is not None:
+            end = size if end is None else min(end, size)
+        failures = 0
+        while end is None or offset < end:
+            try:
+                with self._request(name, offset, end) as response:
+                    response.raise_for_status()
+                    # Servers ignoring the range send the whole content
+                    skip = offset if response.status_code != 206 else 0
+                    if end is None and response.headers.get("Content-Length"):
+                        end = offset - skip + int(response.headers["Content-Length"])
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if skip:
+                            chunk, skip = chunk[skip:], max(skip - len(chunk), 0)
+                        if end is not None:
+                            chunk = chunk[: end - offset]
+                        if not chunk:
+                            continue
+                        yield chunk
+                        offset += len(chunk)
+                        failures = 0
+                        if offset == end:
+                            break
+                if end is not None and offset < end:
+                    # Streamed content length is not checked by requests
+                    raise requests.exceptions.ChunkedEncodingError(
+                        f"Incomplete content ({offset} of {end} bytes)"
+                    )
+                return
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.HTTPError,
+                requests.exceptions.Timeout,
+            ) as error:
+                # Only server errors (e.g. 502, 503 or 504) may be transient
+                if isinstance(error, requests.exceptions.HTTPError) and (
+                    error.response is None or error.response.status_code < 500
+                ):
+                    raise
+                failures += 1
+                if failures > retries:
+                    logger.error(
+                        "Cannot download archive %s (offset: %d): %s",
+                        name,
+                        offset,
+                        error,
+                    )
+                    raise
+                delay = retry_delay * 2 ** (failures - 1)
+                logger.warning(
+                    "Archive %s download interrupted at byte %d (%s), "
+                    "retrying in %.1f seconds (%d/%d)",
+                    name,
+                    offset,
+                    error,
+                    delay,
+                    failures,
+                    retries,
+                )
+                time.sleep(delay)
+
+    def write(self, name, chunk_size=4096, overwrite=False, stream=None):
         """LDP storage backend is read-only, calling this method will raise an error"""
 
         msg = "LDP storage backend is read-only, cannot write to %s"
@@ -0,0 +1,166 @@
+"""
+Ralph extraction checkpoints.
+"""
+
+import json
+import logging
+import os
+import time
+from hashlib import sha256
+from pathlib import Path
+
+from .defaults import CHECKPOINTS_DIR, DEFAULT_CHECKPOINT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """Extraction progress of an input file to an output file persisted in the
+    app directory.
+
+    A checkpoint records the input identity (resolved path, size and
+    modification time), the output file path, the byte offset following the
+    last extracted line, the number of events emitted so far and the size of
+    the output file. A checkpoint is discarded if the input file changed since
+    it has been saved.
+    """
+
+    # Attributes mirror the saved checkpoint document
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        input_file,
+        output=None,
+        directory=CHECKPOINTS_DIR,
+        interval=DEFAULT_CHECKPOINT_INTERVAL,
+    ):
+        """Instantiate the checkpoint of an input file.
+
+        Args:
+            input_file (string): Path to the input file.
+            output (string): Path to the output file events are appended to.
+            directory (string): Path to the directory checkpoints are stored
+                in.
+            interval (float): The minimal delay (in seconds) between two
+                checkpoint saves.
+
+        """
+
+        path = Path(input_file).resolve()
+        stat = path.stat()
+        self.identity = {
+            "input": str(path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "output": str(Path(output).resolve()) if output else None,
+        }
+        # Extractions of an input file to distinct outputs are independent
+        key = json.dumps([self.identity["input"], self.identity["output"]])
+        self.path = Path(directory) / f"{sha256(key.encode()).hexdigest()}.json"
+        self.output_size = None
+        self.interval = interval
+        self.offset = 0
+        self.events = 0
+        self.completed = False
+        self.loaded = False
+        self._saved_at = time.monotonic()
+
+    def load(self):
+        """Load the last saved checkpoint of the input file (if any, `loaded`
+        being set once loaded)."""
+
+        try:
+            with self.path.open() as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return self
+        except ValueError:
+            logger.warning("Ignoring corrupted checkpoint: %s", self.path)
+            return self
+
+        if {key: checkpoint.get(key) for key in self.identity} != self.identity:
+            logger.warning(
+                "Input file %s changed since its last checkpoint, starting over",
+                self.identity["input"],
+            )
+            return self
+
+        self.offset = checkpoint["offset"]
+        self.events = checkpoint["events"]
+        self.completed = checkpoint["completed"]
+        self.output_size = checkpoint.get("output_size")
+        self.loaded = True
+        return self
+
+    @property
+    def output(self):
+        """The resolved path of the output file (if any)."""
+
+        return self.identity["output"]
+
+    def rollback_output(self):
+        """Truncate the output file to its size at the last checkpoint.
+
+        Events written after the last checkpoint will be extracted again when
+        resuming: they are discarded to avoid duplicates.
+        """
+
+        if self.output_size is None or not os.path.exists(self.output):
+            return
+        if os.path.getsize(self.output) > self.output_size:
+            logger.info(
+                "Discarding events written to %s after the last checkpoint",
+                self.output,
+            )
+            os.truncate(self.output, self.output_size)
+
+    def advance(self, offset, events):
+        """Record that events up to the byte offset have been emitted."""
+
+        self.offset = offset
+        self.events += events
+
+    @property
+    def due(self):
+        """Whether the checkpoint interval elapsed since the last save."""
+
+        return time.monotonic() - self._saved_at >= self.interval
+
+    def save(self, completed=False):
+        """Atomically write the checkpoint to the checkpoints directory.
+
+        Events written to the output file should be flushed before saving.
+        """
+
+        self.completed = completed
+        if self.output is not None:
+            self.output_size = os.path.getsize(self.output)
+        logger.debug(
+            "Saving checkpoint of %s (offset: %d | events: %d)",
+            self.identity["input"],
+            self.offset,
+            self.events,
+        )
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix(".tmp")
+        with temporary.open("w") as checkpoint_file:
+            json.dump(
+                {
+                    **self.identity,
+                    "offset": self.offset,
+                    "events": self.events,
+                    "completed": self.completed,
+                    "output_size": self.output_size,
+                },
+                checkpoint_file,
+            )
+        os.replace(temporary, self.path)
+        self._saved_at = time.monotonic()
+
+    def discard(self):
+        """Remove the saved checkpoint (once the extraction is complete)."""
+
+        logger.debug("Removing checkpoint of %s", self.identity["input"])
+        self.path.unlink(missing_ok=True)
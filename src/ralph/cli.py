@@ -3,22 +3,49 @@
 import json
 import logging
 import sys
+from contextlib import nullcontext
 from inspect import signature
+from itertools import zip_longest
 
 import click
 from click_option_group import optgroup
 
 from ralph.backends import BackendTypes
+from ralph.checkpoint import Checkpoint
+from ralph.converter import XAPIConverter
+from ralph.dedupe import DedupeIndex, Deduplicator
 from ralph.defaults import (
+    DEDUPE_INDEX_DIR,
     DEFAULT_BACKEND_CHUNCK_SIZE,
+    DEFAULT_CONVERTER_CHUNK_SIZE,
+    DEFAULT_CONVERTER_PLATFORM_URL,
+    DEFAULT_FILTER_CHUNK_SIZE,
     DEFAULT_GELF_PARSER_CHUNCK_SIZE,
+    DEFAULT_GELF_PARSER_ENGINE,
+    DEFAULT_SAMPLING_KEY,
     ENVVAR_PREFIX,
+    HISTORY_FILE,
+    HISTORY_RETENTION_DAYS,
+    LEGACY_HISTORY_FILE,
     DatabaseBackends,
+    Filters,
+    Formatters,
+    ParserEngines,
     Parsers,
     StorageBackends,
 )
-from ralph.exceptions import UnsupportedBackendException
+from ralph.exceptions import (
+    BackendParameterException,
+    PredicateSyntaxError,
+    UnsupportedBackendException,
+)
+from ralph.filters import FilterPipeline
+from ralph.history import HistoryStore
 from ralph.logger import configure_logging
+from ralph.parsers import Quarantine, iter_chunks
+from ralph.predicates import Predicate
+from ralph.router import Router, load_routes
+from ralph.sampling import HashSampler, ReservoirSampler
 from ralph.utils import (
     get_backend_type,
     get_class_from_name,
@@ -26,13 +53,17 @@ from ralph.utils import (
     get_instance_from_class,
     get_root_logger,
 )
+from ralph.validator import Validator
 
 # cli module logger
 logger = logging.getLogger(__name__)
 
 # Lazy evaluations
 DATABASE_BACKENDS = (lambda: [backend.value for backend in DatabaseBackends])()
+FILTERS = (lambda: [filter_.name.lower() for filter_ in Filters])()
+FORMATTERS = (lambda: [formatter.value for formatter in Formatters])()
 PARSERS = (lambda: [parser.value for parser in Parsers])()
+PARSER_ENGINES = (lambda: [engine.name.lower() for engine in ParserEngines])()
 STORAGE_BACKENDS = (lambda: [backend.value for backend in StorageBackends])()
 BACKENDS = (lambda: DATABASE_BACKENDS + STORAGE_BACKENDS)()
 
@@ -108,7 +139,22 @@ def backends_options(name=None, backends=None):
     return wrapper
 
 
+def compile_predicate(ctx, param, value):
+    """Compile a predicate expression option value"""
+    # pylint: disable=unused-argument
+
+    if value is None:
+        return None
+    if isinstance(value, tuple):
+        return tuple(compile_predicate(ctx, param, expression) for expression in value)
+    try:
+        return Predicate(value)
+    except PredicateSyntaxError as error:
+        raise click.BadParameter(str(error)) from error
+
+
 @cli.command()
+@click.argument("input_files", nargs=-1, type=click.Path(exists=True, dir_okay=False))
 @click.option(
     "-p",
     "--parser",
@@ -123,19 +169,481 @@ def backends_options(name=None, backends=None):
     default=DEFAULT_GELF_PARSER_CHUNCK_SIZE,
     help="Parse events by chunks of size #",
 )
-def extract(parser, chunksize):
-    """Extract input events from a container format using a dedicated parser"""
+@click.option(
+    "-e",
+    "--engine",
+    type=click.Choice(PARSER_ENGINES),
+    default=DEFAULT_GELF_PARSER_ENGINE,
+    help="JSON engine used to decode container records",
+)
+@click.option(
+    "--fast-path/--no-fast-path",
+    default=True,
+    help="Extract events from raw records without decoding them (if possible)",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Parse input files using # processes",
+)
+@click.option(
+    "-w",
+    "--where",
+    type=str,
+    default=None,
+    callback=compile_predicate,
+    metavar="EXPR",
+    help="Only extract events matching this predicate expression "
+    "(e.g. 'event_type startswith \"problem_\"')",
+)
+@click.option(
+    "--ordered/--unordered",
+    default=True,
+    help="Keep (or not) events order when parsing with multiple jobs",
+)
+@click.option(
+    "--tolerant/--strict",
+    default=False,
+    help="Skip malformed records instead of aborting (strict by default)",
+)
+@click.option(
+    "-q",
+    "--quarantine",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Append skipped malformed records to this JSON lines file "
+    "(implies --tolerant)",
+)
+@click.option(
+    "-f",
+    "--format",
+    "format_",
+    type=click.Choice(get_class_names(FORMATTERS)),
+    default="ndjson",
+    help="Output format of extracted events",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write events to this file instead of the standard output",
+)
+@click.option(
+    "--resume",
+    default=False,
+    is_flag=True,
+    help="Checkpoint extraction progress and resume from the last checkpoint "
+    "of input files (events are appended to the --output file)",
+)
+def extract(
+    input_files,
+    parser,
+    chunksize,
+    engine,
+    fast_path,
+    jobs,
+    where,
+    ordered,
+    tolerant,
+    quarantine,
+    format_,
+    output,
+    resume,
+):  # pylint: disable=too-many-arguments,too-many-branches,too-many-locals,too-many-statements
+    """Extract input events from a container format using a dedicated parser
+
+    Events are read from INPUT_FILES if given (uncompressed files are
+    memory-mapped) or from the standard input.
+    """
+
+    logger.info(
+        "Extracting events using the %s parser (chunk size: %d | engine: %s)",
+        parser,
+        chunksize,
+        engine,
+    )
+
+    if tolerant or quarantine:
+        quarantine = Quarantine(quarantine)
+    parser = get_class_from_name(parser, PARSERS)(
+        engine=engine, fast_path=fast_path, quarantine=quarantine, predicate=where
+    )
+
+    if jobs > 1 and not input_files:
+        raise click.UsageError("Parsing with multiple jobs requires input files")
+
+    if resume and not input_files:
+        raise click.UsageError("Resuming an extraction requires input files")
+
+    # Events written to the standard output cannot be rolled back
+    if resume and not output:
+        raise click.UsageError("Resuming an extraction requires an output file")
+
+    if resume and jobs > 1:
+        raise click.UsageError(
+            "Resuming an extraction with multiple jobs is not supported"
+        )
+
+    try:
+        formatter = get_class_from_name(format_, FORMATTERS)(
+            output=output, batch_size=chunksize, append=resume
+        )
+    except ValueError as error:
+        raise click.UsageError(str(error)) from error
+
+    counter = {"events": 0}
+    checkpoints = (
+        [Checkpoint(input_file, output=output).load() for input_file in input_files]
+        if resume
+        else []
+    )
+
+    # Without checkpoint, the extraction starts over (e.g. once completed, its
+    # checkpoints being removed): the output file is replaced
+    if resume and not any(checkpoint.loaded for checkpoint in checkpoints):
+        formatter.append = False
+
+    # Events written after the checkpoint of the first input to extract will
+    # be extracted again
+    for checkpoint in checkpoints:
+        if not checkpoint.completed:
+            checkpoint.rollback_output()
+            break
+
+    def checkpointed_events(input_file, checkpoint):
+        """Yield events of an input file, checkpointing emitted ones"""
+
+        if checkpoint.completed:
+            logger.info("Events of %s have already been extracted", input_file)
+            return
+        if checkpoint.offset:
+            logger.info(
+                "Resuming extraction of %s from offset %d (%d events extracted)",
+                input_file,
+                checkpoint.offset,
+                checkpoint.events,
+            )
+        else:
+            # Record the output size before extracting the first events
+            formatter.flush()
+            checkpoint.save()
+
+        for offset, chunk in parser.parse_chunks(
+            input_file, chunksize=chunksize, start=checkpoint.offset
+        ):
+            yield from chunk
+            # The consumer requested the next event: all events of the chunk
+            # have been written
+            counter["events"] += len(chunk)
+            checkpoint.advance(offset, len(chunk))
+            if checkpoint.due:
+                formatter.flush()
+                checkpoint.save()
+        formatter.flush()
+        checkpoint.save(completed=True)
+
+    def events():
+        """Yield events extracted from all inputs"""
+
+        for input_file, checkpoint in zip_longest(
+            input_files or (sys.stdin,), checkpoints
+        ):
+            if checkpoint is not None:
+                yield from checkpointed_events(input_file, checkpoint)
+                continue
+            if jobs > 1:
+                extracted = parser.parse_parallel(
+                    input_file, jobs, ordered=ordered, chunksize=chunksize
+                )
+            else:
+                extracted = parser.parse(input_file, chunksize=chunksize)
+            if parser.quarantine is None:
+                yield from extracted
+                continue
+            for event in extracted:
+                counter["events"] += 1
+                yield event
+
+    try:
+        formatter.write(events())
+    finally:
+        if parser.quarantine is not None:
+            parser.quarantine.close()
+
+    # The extraction is complete: it should not be resumed anymore
+    for checkpoint in checkpoints:
+        checkpoint.discard()
+
+    if parser.quarantine is not None:
+        logger.info(
+            "Extracted %d events, skipped %d malformed records",
+            counter["events"],
+            parser.quarantine.count,
+        )
+
+
+@cli.command(name="filter")
+@click.option(
+    "-f",
+    "--filter",
+    "filters",
+    type=click.Choice(FILTERS),
+    multiple=True,
+    help="Filter to apply to events (could be repeated)",
+)
+@click.option(
+    "-w",
+    "--where",
+    multiple=True,
+    callback=compile_predicate,
+    metavar="EXPR",
+    help="Only keep events matching this predicate expression (could be repeated)",
+)
+@click.option(
+    "-c",
+    "--chunksize",
+    type=int,
+    default=DEFAULT_FILTER_CHUNK_SIZE,
+    help="Filter events by chunks of size #",
+)
+def filter_(filters, where, chunksize):
+    """Filter JSON events read from the standard input"""
+
+    if not filters and not where:
+        raise click.UsageError("At least one filter or predicate is required")
 
     logger.info(
-        "Extracting events using the %s parser (chunk size: %d)", parser, chunksize
+        "Filtering events using the %s filters (chunk size: %d)",
+        ", ".join(filters + tuple(predicate.expression for predicate in where)),
+        chunksize,
     )
 
-    parser = get_class_from_name(parser, PARSERS)()
+    pipeline = FilterPipeline(
+        [Filters[filter_.upper()].value for filter_ in filters] + list(where),
+        chunksize=chunksize,
+    )
+    events = (line.rstrip("\n") for line in sys.stdin if not line.isspace())
+    for event in pipeline(events):
+        click.echo(event)
 
-    for event in parser.parse(sys.stdin, chunksize=chunksize):
+
+@cli.command()
+@click.option(
+    "-r",
+    "--rate",
+    type=click.FloatRange(min=0, max=1),
+    default=None,
+    help="Keep this fraction of key field values (deterministic sampling)",
+)
+@click.option(
+    "-k",
+    "--key",
+    default=DEFAULT_SAMPLING_KEY,
+    help="Event field (dotted path) hashed to sample events with a rate",
+)
+@click.option(
+    "-n",
+    "--size",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Keep a uniform random sample of # events (reservoir sampling)",
+)
+@click.option(
+    "-s",
+    "--seed",
+    default=None,
+    help="Seed of the sampling (same seed, same sample)",
+)
+@click.option(
+    "-c",
+    "--chunksize",
+    type=int,
+    default=DEFAULT_FILTER_CHUNK_SIZE,
+    help="Sample events by chunks of size # (with a rate)",
+)
+def sample(rate, key, size, seed, chunksize):
+    """Sample JSON events read from the standard input"""
+
+    if (rate is None) == (size is None):
+        raise click.UsageError("Either a sampling rate or size is required")
+
+    events = (line.rstrip("\n") for line in sys.stdin if not line.isspace())
+    if rate is not None:
+        logger.info("Sampling %s%% of events by %s values", rate * 100, key)
+        sampler = FilterPipeline(
+            [HashSampler(rate, key=key, seed=seed or "")], chunksize=chunksize
+        )
+    else:
+        logger.info("Sampling %d events", size)
+        sampler = ReservoirSampler(size, seed=seed)
+
+    for event in sampler(events):
         click.echo(event)
 
 
+@cli.command()
+@click.option(
+    "-k",
+    "--key",
+    default=None,
+    help="Event field (dotted path) identifying events (instead of their content)",
+)
+@click.option(
+    "-i",
+    "--index",
+    type=click.Path(file_okay=False, writable=True),
+    default=str(DEDUPE_INDEX_DIR),
+    help="Directory of the persistent index of seen events",
+)
+@click.option(
+    "-c",
+    "--chunksize",
+    type=int,
+    default=DEFAULT_FILTER_CHUNK_SIZE,
+    help="Deduplicate events by chunks of size #",
+)
+def dedupe(key, index, chunksize):
+    """Drop JSON events read from the standard input that have already been
+    seen (in this run or in previous ones)"""
+
+    logger.info("Deduplicating events using the %s index", index)
+
+    events = (line.rstrip("\n") for line in sys.stdin if not line.isspace())
+    with DedupeIndex(index) as dedupe_index:
+        deduplicator = Deduplicator(dedupe_index, key=key)
+        for event in FilterPipeline([deduplicator], chunksize=chunksize)(events):
+            click.echo(event)
+
+    logger.info(
+        "Dropped %d duplicate events (%d events indexed)",
+        deduplicator.duplicates,
+        len(dedupe_index),
+    )
+
+
+@cli.command()
+@click.option(
+    "-r",
+    "--routes",
+    type=click.Path(exists=True, dir_okay=False),
+    required=True,
+    help="YAML file defining routes (predicate and backend of each route)",
+)
+@click.option(
+    "-c",
+    "--chunk-size",
+    type=int,
+    default=DEFAULT_BACKEND_CHUNCK_SIZE,
+    help="Write events to database backends by chunks of size #",
+)
+@click.option(
+    "-f", "--force", default=False, is_flag=True, help="Overwrite existing archives"
+)
+def route(routes, chunk_size, force):
+    """Route JSON events read from the standard input to several backends"""
+
+    routes = load_routes(routes)
+    logger.info("Routing events to %s", ", ".join(route_.name for route_ in routes))
+
+    router = Router(routes, chunk_size=chunk_size, overwrite=force)
+    for name, events in router.route(sys.stdin).items():
+        logger.info("Routed %d events to %s", events, name)
+
+
+@cli.command()
+@click.option(
+    "-u",
+    "--platform-url",
+    default=DEFAULT_CONVERTER_PLATFORM_URL,
+    help="URL of the Open edX platform events have been emitted by",
+)
+@click.option(
+    "-c",
+    "--chunksize",
+    type=int,
+    default=DEFAULT_CONVERTER_CHUNK_SIZE,
+    help="Convert events by chunks of size #",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Convert events using # processes",
+)
+def convert(platform_url, chunksize, jobs):
+    """Convert Open edX events read from the standard input to xAPI statements"""
+
+    logger.info(
+        "Converting events to xAPI statements (chunk size: %d | jobs: %d)",
+        chunksize,
+        jobs,
+    )
+
+    converter = XAPIConverter(platform_url)
+    events = (line.rstrip("\n") for line in sys.stdin if not line.isspace())
+    for statement in converter(events, chunksize, jobs=jobs):
+        click.echo(statement)
+
+    if converter.skipped:
+        logger.info("Skipped %d events without converter", converter.skipped)
+    if converter.failed:
+        logger.warning("Failed to convert %d events", converter.failed)
+
+
+@cli.command()
+@click.option(
+    "-i",
+    "--invalid",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Append invalid events (with their error) to this JSON lines file",
+)
+@click.option(
+    "--strict/--lax",
+    default=False,
+    help="Reject (or not) events of unknown types (lax by default)",
+)
+@click.option(
+    "-c",
+    "--chunksize",
+    type=int,
+    default=DEFAULT_FILTER_CHUNK_SIZE,
+    help="Validate events by chunks of size #",
+)
+def validate(invalid, strict, chunksize):
+    """Validate JSON events read from the standard input against Open edX
+    event schemas (only valid events are written to the standard output)"""
+
+    validator = Validator(strict=strict)
+    events = (line.rstrip("\n") for line in sys.stdin if not line.isspace())
+    with open(invalid, "a") if invalid else nullcontext() as invalid_file:
+        for batch in iter_chunks(events, chunksize):
+            valid_events, invalid_events = validator.validate_batch(batch)
+            for event in valid_events:
+                click.echo(event)
+            if invalid_file is None:
+                continue
+            for event, error in invalid_events:
+                invalid_file.write(json.dumps({"event": event, "error": error}) + "\n")
+
+    for event_type, stats in sorted(
+        validator.stats.items(), key=lambda item: str(item[0])
+    ):
+        logger.info(
+            "%s: %d valid, %d invalid events (%.0f events/s)",
+            event_type,
+            stats["valid"],
+            stats["invalid"],
+            (stats["valid"] + stats["invalid"]) / stats["duration"]
+            if stats["duration"]
+            else 0,
+        )
+
+
 @click.argument("archive", required=False)
 @backends_options(backends=BACKENDS)
 @click.option(
@@ -145,14 +653,23 @@ def extract(parser, chunksize):
     default=DEFAULT_BACKEND_CHUNCK_SIZE,
     help="Get events by chunks of size #",
 )
-def fetch(backend, archive, chunk_size, **options):
+@click.option(
+    "-z",
+    "--decompress",
+    default=False,
+    is_flag=True,
+    help="Decompress fetched archives (gzip, bz2, xz or zstd)",
+)
+def fetch(backend, archive, chunk_size, decompress, **options):
     """Fetch an archive or records from a configured backend"""
 
     logger.info(
-        "Fetching data from the configured %s backend (archive: %s | chunk size: %s)",
+        "Fetching data from the configured %s backend "
+        "(archive: %s | chunk size: %s | decompress: %s)",
         backend,
         archive,
         chunk_size,
+        decompress,
     )
     logger.debug("Backend parameters: %s", options)
 
@@ -161,7 +678,7 @@ def fetch(backend, archive, chunk_size, **options):
     backend_type = get_backend_type(backend_class)
 
     if backend_type == BackendTypes.STORAGE:
-        backend.read(archive, chunk_size=chunk_size)
+        backend.read(archive, chunk_size=chunk_size, decompress=decompress)
     elif backend_type == BackendTypes.DATABASE:
         backend.get(chunk_size=chunk_size)
     elif backend_type is None:
@@ -215,7 +732,54 @@ def push(backend, archive, chunk_size, force, **options):
     default=False,
     help="Get archives detailled output (JSON)",
 )
-def list_(details, new, backend, **options):
+@click.option(
+    "-p", "--prefix", default=None, help="List archives starting with a prefix"
+)
+@click.option(
+    "-g",
+    "--glob",
+    "pattern",
+    default=None,
+    help="List archives matching a glob pattern",
+)
+@click.option(
+    "--since",
+    type=click.DateTime(),
+    metavar="DATE",
+    default=None,
+    help="List archives modified since a date (fs backend)",
+)
+@click.option(
+    "--until",
+    type=click.DateTime(),
+    metavar="DATE",
+    default=None,
+    help="List archives modified until a date (fs backend)",
+)
+@click.option(
+    "-s",
+    "--sort",
+    type=click.Choice(["name", "-name", "size", "-size", "modified", "-modified"]),
+    default=None,
+    help="Sort archives, in descending order if prefixed by - (fs backend)",
+)
+@click.option(
+    "-l",
+    "--limit",
+    type=click.IntRange(min=0),
+    default=None,
+    help="List # archives at most",
+)
+@click.option(
+    "-o",
+    "--offset",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Skip # first archives",
+)
+def list_(  # pylint: disable=too-many-arguments,too-many-locals
+    details, new, backend, prefix, pattern, since, until, sort, limit, offset, **options
+):
     """List available archives from a configured storage backend"""
 
     logger.info("Listing archives for the configured %s backend", backend)
@@ -225,12 +789,48 @@ def list_(details, new, backend, **options):
     storage = get_instance_from_class(
         get_class_from_name(backend, STORAGE_BACKENDS), **options
     )
-    archives = storage.list(details=details, new=new)
+
+    # Only given filters are passed to the backend (backends raise a
+    # BackendParameterException for unsupported ones)
+    filters = {
+        "prefix": prefix,
+        "pattern": pattern,
+        "since": since,
+        "until": until,
+        "sort": sort,
+        "limit": limit,
+        "offset": offset or None,
+    }
+    filters = {name: value for name, value in filters.items() if value is not None}
 
     counter = 0
-    for archive in archives:
-        click.echo(json.dumps(archive) if details else archive)
-        counter += 1
+    try:
+        for archive in storage.list(details=details, new=new, **filters):
+            click.echo(json.dumps(archive) if details else archive)
+            counter += 1
+    except BackendParameterException as error:
+        raise click.UsageError(str(error)) from error
 
     if counter == 0:
         logger.warning("Configured %s backend contains no archive", backend)
+
+
+@cli.group()
+def history():
+    """Manage backends history"""
+
+
+@history.command()
+@click.option(
+    "-r",
+    "--retention-days",
+    type=click.IntRange(min=0),
+    default=HISTORY_RETENTION_DAYS,
+    help="Compact history entries older than # days",
+)
+def compact(retention_days):
+    """Compact old history entries into sorted arrays of ids per backend
+    command"""
+
+    store = HistoryStore(HISTORY_FILE, LEGACY_HISTORY_FILE, max_entries=0)
+    store.compact(retention_days)
@@ -0,0 +1,473 @@
+"""
+Ralph compressed streams handling.
+"""
+
+import asyncio
+import bz2
+import logging
+import lzma
+import os
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import RawIOBase
+from itertools import islice
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+
+from .defaults import (
+    DEFAULT_DECOMPRESSION_CHUNK_SIZE,
+    DEFAULT_GZIP_PREFETCH_SIZE,
+    DEFAULT_GZIP_SEGMENT_SIZE,
+)
+from .exceptions import DecompressionError
+
+logger = logging.getLogger(__name__)
+
+# Compression formats magic numbers
+MAGIC_NUMBERS = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bz2",
+    b"\xfd7zXZ\x00": "xz",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+MAGIC_NUMBER_MAX_LENGTH = max(len(magic) for magic in MAGIC_NUMBERS)
+
+# A gzip member header starts with the magic number, the deflate compression
+# method and a flag byte whose 3 highest bits are reserved.
+GZIP_MEMBER_HEADER = b"\x1f\x8b\x08"
+
+
+def detect_compression(header):
+    """Return the compression format name given the first bytes of a stream.
+
+    Args:
+        header (bytes): The first bytes of the stream (at least
+            MAGIC_NUMBER_MAX_LENGTH bytes to detect all formats).
+
+    Returns:
+        The compression format name (gzip, bz2, xz or zstd) or None if no
+        known magic number has been found.
+
+    """
+
+    for magic, compression in MAGIC_NUMBERS.items():
+        if header.startswith(magic):
+            return compression
+    return None
+
+
+def _get_zstd_decompressor():
+    """Return a zstd decompression object (requires the zstandard package)."""
+
+    try:
+        # pylint: disable=import-outside-toplevel
+        import zstandard
+    except ImportError as error:
+        msg = "Decompressing zstd streams requires the zstandard package"
+        logger.error(msg)
+        raise DecompressionError(msg) from error
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+DECOMPRESSORS = {
+    "gzip": lambda: zlib.decompressobj(wbits=zlib.MAX_WBITS | 16),
+    "bz2": bz2.BZ2Decompressor,
+    "xz": lambda: lzma.LZMADecompressor(format=lzma.FORMAT_XZ),
+    "zstd": _get_zstd_decompressor,
+}
+
+
+class MultiStreamDecompressor:
+    """Incremental decompressor supporting concatenated streams.
+
+    gzip members, bz2 streams, xz streams and zstd frames can be concatenated
+    in a single file: a new decompressor is started each time the current one
+    reaches the end of its stream.
+    """
+
+    def __init__(self, compression):
+        self._factory = DECOMPRESSORS[compression]
+        self._decompressor = self._factory()
+
+    @property
+    def eof(self):
+        """Whether the last started stream has been fully decompressed."""
+
+        return self._decompressor.eof
+
+    def decompress(self, data):
+        """Decompress data and return uncompressed bytes."""
+
+        chunks = []
+        while data:
+            if self._decompressor.eof:
+                self._decompressor = self._factory()
+            chunks.append(self._decompressor.decompress(data))
+            data = self._decompressor.unused_data if self._decompressor.eof else b""
+        return b"".join(chunks)
+
+
+def iter_file_chunks(stream, chunk_size=DEFAULT_DECOMPRESSION_CHUNK_SIZE):
+    """Yield chunks of (at most) chunk_size bytes read from a binary stream."""
+
+    while chunk := stream.read(chunk_size):
+        yield chunk
+
+
+def iter_decompress(chunks, compression=None):
+    """Decompress a stream of bytes chunks.
+
+    Args:
+        chunks (iterable): Bytes chunks of the compressed stream.
+        compression (string): The compression format name. If None, it is
+            detected from the stream magic number. Uncompressed streams are
+            yielded untouched.
+
+    Yields:
+        chunk: uncompressed bytes chunk
+
+    """
+
+    chunks = iter(chunks)
+    header = b""
+    if compression is None:
+        # Read enough bytes to detect the compression format
+        for chunk in chunks:
+            header += chunk
+            if len(header) >= MAGIC_NUMBER_MAX_LENGTH:
+                break
+        compression = detect_compression(header)
+
+    if compression is None:
+        if header:
+            yield header
+        yield from chunks
+        return
+
+    logger.debug("Decompressing %s stream", compression)
+    decompressor = MultiStreamDecompressor(compression)
+    for chunk in (header, *chunks) if header else chunks:
+        if data := decompressor.decompress(chunk):
+            yield data
+
+    if not decompressor.eof:
+        msg = "Compressed %s stream ended before the end-of-stream marker"
+        logger.error(msg, compression)
+        raise DecompressionError(msg % compression)
+
+
+async def aiter_decompress(chunks, compression=None):
+    """Decompress an asynchronous stream of bytes chunks.
+
+    This is the asynchronous counterpart of `iter_decompress`: chunks are
+    decompressed in the default executor of the running event loop.
+
+    Args:
+        chunks (async iterable): Bytes chunks of the compressed stream.
+        compression (string): The compression format name. If None, it is
+            detected from the stream magic number. Uncompressed streams are
+            yielded untouched.
+
+    Yields:
+        chunk: uncompressed bytes chunk
+
+    """
+
+    chunks = chunks.__aiter__()
+    header = b""
+    if compression is None:
+        # Read enough bytes to detect the compression format
+        async for chunk in chunks:
+            header += chunk
+            if len(header) >= MAGIC_NUMBER_MAX_LENGTH:
+                break
+        compression = detect_compression(header)
+
+    if compression is None:
+        if header:
+            yield header
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    logger.debug("Decompressing %s stream", compression)
+    loop = asyncio.get_running_loop()
+    decompressor = MultiStreamDecompressor(compression)
+    if header and (data := decompressor.decompress(header)):
+        yield data
+    async for chunk in chunks:
+        if data := await loop.run_in_executor(None, decompressor.decompress, chunk):
+            yield data
+
+    if not decompressor.eof:
+        msg = "Compressed %s stream ended before the end-of-stream marker"
+        logger.error(msg, compression)
+        raise DecompressionError(msg % compression)
+
+
+def _is_gzip_member(data):
+    """Return whether data (probably) starts with a gzip member."""
+
+    if not data.startswith(GZIP_MEMBER_HEADER) or data[3] & 0xE0:
+        return False
+    try:
+        zlib.decompressobj(wbits=zlib.MAX_WBITS | 16).decompress(data)
+    except zlib.error:
+        return False
+    return True
+
+
+def find_gzip_members(input_file, segment_size=DEFAULT_GZIP_SEGMENT_SIZE):
+    """Return candidate gzip member offsets splitting the file into segments.
+
+    Candidates are searched for every segment_size bytes. As a member header
+    may also appear in compressed data, candidates need to be confirmed by
+    decompressing the preceding segment up to the candidate offset.
+
+    Args:
+        input_file (string): Path to the gzip file.
+        segment_size (int): The approximate size (in bytes) of a segment.
+
+    Returns:
+        A sorted list of offsets, starting with 0.
+
+    """
+
+    size = os.path.getsize(input_file)
+    offsets = [0]
+    with open(input_file, "rb") as stream:
+        position = segment_size
+        while position < size:
+            stream.seek(position)
+            window = stream.read(segment_size)
+            index = window.find(GZIP_MEMBER_HEADER)
+            while index >= 0:
+                stream.seek(position + index)
+                if _is_gzip_member(stream.read(32 * 1024)):
+                    offsets.append(position + index)
+                    break
+                index = window.find(GZIP_MEMBER_HEADER, index + 1)
+            position = max(position + segment_size, offsets[-1] + segment_size)
+    return offsets
+
+
+class GzipSegment:
+    """Incremental decompression of the [start, end) byte range of a gzip file.
+
+    The range should end on a member boundary. If it does not, members are
+    decompressed up to the end of the file and `overrun` is set.
+    """
+
+    def __init__(
+        self, input_file, start, end=None, chunk_size=DEFAULT_DECOMPRESSION_CHUNK_SIZE
+    ):
+        """Instantiate the segment decompressor.
+
+        Args:
+            input_file (string): Path to the gzip file.
+            start (int): Offset of the first member of the segment.
+            end (int): Offset of the segment end (the end of the file if None).
+            chunk_size (int): The maximum size of compressed and uncompressed
+                chunks.
+
+        """
+
+        self.input_file = input_file
+        self.start = start
+        self.end = end
+        self.chunk_size = chunk_size
+        self.overrun = False
+        self._head = deque()
+        self._chunks = self._decompress()
+
+    def prefetch(self, max_size):
+        """Decompress the first (at least) max_size bytes of the segment."""
+
+        size = 0
+        while size < max_size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._head.append(chunk)
+            size += len(chunk)
+        return self
+
+    def __iter__(self):
+        while self._head:
+            yield self._head.popleft()
+        yield from self._chunks
+
+    def _decompress(self):
+        """Yield uncompressed chunks of (at most) chunk_size bytes."""
+
+        chunk_size = self.chunk_size
+        end = self.end
+        decompressor = None
+        with open(self.input_file, "rb") as stream:
+            stream.seek(self.start)
+            while True:
+                size = (
+                    chunk_size if end is None else min(chunk_size, end - stream.tell())
+                )
+                data = stream.read(size)
+                boundary = decompressor is not None and decompressor.eof
+                if not data and end is not None and not boundary:
+                    logger.debug(
+                        "Offset %d is not a gzip member boundary, decompressing "
+                        "sequentially up to the end of the file",
+                        end,
+                    )
+                    self.overrun = True
+                    end = None
+                    continue
+                if not data:
+                    break
+
+                pending = True
+                while data or pending:
+                    if decompressor is None or decompressor.eof:
+                        decompressor = DECOMPRESSORS["gzip"]()
+                    chunk = decompressor.decompress(data, chunk_size)
+                    if chunk:
+                        yield chunk
+                    # Uncompressed data may be left in zlib buffers
+                    pending = len(chunk) == chunk_size and not decompressor.eof
+                    data = (
+                        decompressor.unused_data
+                        if decompressor.eof
+                        else decompressor.unconsumed_tail
+                    )
+
+        if decompressor is None or not decompressor.eof:
+            msg = "Compressed gzip stream ended before the end-of-stream marker"
+            logger.error(msg)
+            raise DecompressionError(msg)
+
+
+def iter_parallel_gunzip(
+    input_file,
+    jobs,
+    segment_size=DEFAULT_GZIP_SEGMENT_SIZE,
+    chunk_size=DEFAULT_DECOMPRESSION_CHUNK_SIZE,
+    prefetch_size=DEFAULT_GZIP_PREFETCH_SIZE,
+):
+    """Decompress a multi-member gzip file using a pool of threads.
+
+    The file is split on gzip member boundaries into segments whose first
+    prefetch_size uncompressed bytes are decompressed concurrently (zlib
+    releases the GIL), the rest of a segment being decompressed while it is
+    consumed. Segments are yielded in order. If a candidate boundary turns out
+    not to be a member boundary, the rest of the file is decompressed
+    sequentially. Single member files are decompressed sequentially.
+
+    Args:
+        input_file (string): Path to the gzip file.
+        jobs (int): The number of decompression threads.
+        segment_size (int): The approximate size (in bytes) of a segment.
+        chunk_size (int): The maximum size of compressed and uncompressed
+            chunks.
+        prefetch_size (int): The amount of uncompressed bytes decompressed
+            ahead by threads for each segment.
+
+    Yields:
+        chunk: uncompressed bytes chunk
+
+    """
+
+    offsets = find_gzip_members(input_file, segment_size)
+    if len(offsets) == 1:
+        logger.debug("Decompressing %s sequentially", input_file)
+        yield from GzipSegment(input_file, 0, chunk_size=chunk_size)
+        return
+
+    segments = iter(zip(offsets, offsets[1:] + [os.path.getsize(input_file)]))
+    logger.debug("Decompressing %s in %d segments", input_file, len(offsets))
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        while True:
+            # Keep (at most) two segments per thread in flight
+            for start, end in islice(segments, 2 * jobs - len(pending)):
+                segment = GzipSegment(input_file, start, end, chunk_size)
+                pending.append(executor.submit(segment.prefetch, prefetch_size))
+            if not pending:
+                break
+            segment = pending.popleft().result()
+            yield from segment
+            if segment.overrun:
+                # Following segments have been decompressed sequentially
+                break
+
+        for future in pending:
+            future.cancel()
+
+
+class ThreadedReader(RawIOBase):
+    """A raw binary stream reading bytes chunks from a background thread.
+
+    This allows decompression (or any producer of bytes chunks) to overlap with
+    the consumer's processing. Use an `io.BufferedReader` to iterate over
+    lines.
+    """
+
+    def __init__(self, chunks, max_chunks=8):
+        super().__init__()
+        self._queue = Queue(maxsize=max_chunks)
+        self._stop = Event()
+        self._buffer = memoryview(b"")
+        self._eof = False
+        self._thread = Thread(target=self._produce, args=(chunks,), daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        """Put an item in the queue unless the reader has been closed."""
+
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _produce(self, chunks):
+        """Push chunks to the queue followed by None (or the raised error)."""
+
+        try:
+            for chunk in chunks:
+                if not self._put(chunk):
+                    return
+        except Exception as error:  # pylint: disable=broad-except
+            self._put(error)
+            return
+        self._put(None)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._buffer and not self._eof:
+            item = self._queue.get()
+            if isinstance(item, Exception):
+                self._eof = True
+                raise item
+            if item is None:
+                self._eof = True
+            else:
+                self._buffer = memoryview(item)
+
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def close(self):
+        self._stop.set()
+        # Unblock the producer if it is waiting for a free slot
+        try:
+            while True:
+                self._queue.get_nowait()
+        except Empty:
+            pass
+        super().close()
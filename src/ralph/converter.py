@@ -0,0 +1,341 @@
+"""
+Open edX events to xAPI statements converters.
+"""
+
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from uuid import UUID, uuid5
+
+from .defaults import DEFAULT_CONVERTER_PLATFORM_URL, Converters
+from .parsers import iter_chunks
+from .utils import import_string
+
+logger = logging.getLogger(__name__)
+
+# Statements ids are UUIDs derived from raw events (converting an event twice
+# yields the same statement id)
+STATEMENT_ID_NAMESPACE = UUID("b3c9c3a6-84d1-4a5e-9f62-3a7d5b5d0e0f")
+XAPI_VERSION = "1.0.3"
+
+VIDEO_EXTENSION_TIME = "https://w3id.org/xapi/video/extensions/time"
+VIDEO_EXTENSION_TIME_FROM = "https://w3id.org/xapi/video/extensions/time-from"
+VIDEO_EXTENSION_TIME_TO = "https://w3id.org/xapi/video/extensions/time-to"
+
+
+class BaseConverter(ABC):
+    """Convert events of an Open edX event type to xAPI statements.
+
+    Static parts of statements (verb, object definition, context) are built
+    once per converter and shared by all converted statements.
+    """
+
+    event_type = None
+    verb_id = None
+    object_type = None
+
+    def __init__(self, platform_url=DEFAULT_CONVERTER_PLATFORM_URL):
+        """Instantiate the converter and compile its statement template.
+
+        Args:
+            platform_url (string): URL of the Open edX platform events have
+                been emitted by (used to build actors and objects IRIs).
+
+        """
+
+        self.platform_url = platform_url.rstrip("/")
+        self.verb = {
+            "id": self.verb_id,
+            "display": {"en-US": self.verb_id.rsplit("/", 1)[1]},
+        }
+        self.object_definition = {"type": self.object_type}
+        self.context = {"platform": self.platform_url}
+        # Contexts are shared by statements of a course
+        self._course_contexts = {}
+
+    def get_actor(self, event):
+        """Return the statement actor of the event."""
+
+        return {
+            "objectType": "Agent",
+            "account": {
+                "homePage": self.platform_url,
+                "name": event.get("username") or "anonymous",
+            },
+        }
+
+    def get_context(self, event):
+        """Return the statement context of the event."""
+
+        context = event.get("context") or {}
+        course_id = context.get("course_id")
+        if not course_id:
+            return self.context
+        if course_id not in self._course_contexts:
+            self._course_contexts[course_id] = {
+                **self.context,
+                "contextActivities": {
+                    "parent": [
+                        {
+                            "id": f"{self.platform_url}/course/{course_id}",
+                            "objectType": "Activity",
+                            "definition": {
+                                "type": "http://adlnet.gov/expapi/activities/course"
+                            },
+                        }
+                    ]
+                },
+            }
+        return self._course_contexts[course_id]
+
+    @abstractmethod
+    def get_object(self, event):
+        """Return the statement object of the event."""
+
+    def get_result(self, event):
+        """Return the statement result of the event (if any)."""
+        # pylint: disable=no-self-use,unused-argument
+
+        return None
+
+    def convert(self, event, raw_event):
+        """Convert a decoded event to an xAPI statement.
+
+        Args:
+            event (dict): The decoded event.
+            raw_event (string): The raw JSON event (the statement id is
+                derived from it).
+
+        Returns:
+            The xAPI statement (dict).
+
+        """
+
+        statement = {
+            "id": str(uuid5(STATEMENT_ID_NAMESPACE, raw_event)),
+            "actor": self.get_actor(event),
+            "verb": self.verb,
+            "object": self.get_object(event),
+            "context": self.get_context(event),
+            "timestamp": event["time"],
+            "version": XAPI_VERSION,
+        }
+        # Base converters have no result, subclasses may override get_result
+        result = self.get_result(event)  # pylint: disable=assignment-from-none
+        if result is not None:
+            statement["result"] = result
+        return statement
+
+
+class PageCloseConverter(BaseConverter):
+    """Convert page_close browser events (the learner left a page)."""
+
+    event_type = "page_close"
+    verb_id = "http://adlnet.gov/expapi/verbs/terminated"
+    object_type = "http://activitystrea.ms/schema/1.0/page"
+
+    def get_object(self, event):
+        return {
+            "id": event["page"],
+            "objectType": "Activity",
+            "definition": self.object_definition,
+        }
+
+
+class BaseVideoConverter(BaseConverter):
+    """Convert video browser events (their `event` member is a JSON string
+    describing the video and the playback time)."""
+
+    object_type = "https://w3id.org/xapi/video/activity-type/video"
+
+    def convert(self, event, raw_event):
+        # The `event` member is decoded once for all statement parts
+        if isinstance(event["event"], str):
+            event = {**event, "event": json.loads(event["event"])}
+        return super().convert(event, raw_event)
+
+    def get_object(self, event):
+        return {
+            "id": f"{self.platform_url}/xblock/{event['event']['id']}",
+            "objectType": "Activity",
+            "definition": self.object_definition,
+        }
+
+    def get_result(self, event):
+        time = event["event"].get("currentTime")
+        if time is None:
+            return None
+        return {"extensions": {VIDEO_EXTENSION_TIME: time}}
+
+
+class PlayVideoConverter(BaseVideoConverter):
+    """Convert play_video browser events."""
+
+    event_type = "play_video"
+    verb_id = "https://w3id.org/xapi/video/verbs/played"
+
+
+class PauseVideoConverter(BaseVideoConverter):
+    """Convert pause_video browser events."""
+
+    event_type = "pause_video"
+    verb_id = "https://w3id.org/xapi/video/verbs/paused"
+
+
+class SeekVideoConverter(BaseVideoConverter):
+    """Convert seek_video browser events."""
+
+    event_type = "seek_video"
+    verb_id = "https://w3id.org/xapi/video/verbs/seeked"
+
+    def get_result(self, event):
+        return {
+            "extensions": {
+                VIDEO_EXTENSION_TIME_FROM: event["event"].get("old_time"),
+                VIDEO_EXTENSION_TIME_TO: event["event"].get("new_time"),
+            }
+        }
+
+
+class ProblemCheckConverter(BaseConverter):
+    """Convert problem_check server events (the learner submitted an answer)."""
+
+    event_type = "problem_check"
+    verb_id = "http://adlnet.gov/expapi/verbs/answered"
+    object_type = "http://adlnet.gov/expapi/activities/question"
+
+    def get_object(self, event):
+        problem_id = event["event"]["problem_id"]
+        return {
+            "id": f"{self.platform_url}/xblock/{problem_id}",
+            "objectType": "Activity",
+            "definition": self.object_definition,
+        }
+
+    def get_result(self, event):
+        grade, max_grade = event["event"].get("grade"), event["event"].get("max_grade")
+        if grade is None or not max_grade:
+            return None
+        return {
+            "score": {"raw": grade, "min": 0, "max": max_grade},
+            "success": event["event"].get("success") == "correct",
+        }
+
+
+class EnrollmentActivatedConverter(BaseConverter):
+    """Convert edx.course.enrollment.activated server events."""
+
+    event_type = "edx.course.enrollment.activated"
+    verb_id = "http://adlnet.gov/expapi/verbs/registered"
+    object_type = "http://adlnet.gov/expapi/activities/course"
+
+    def get_object(self, event):
+        return {
+            "id": f"{self.platform_url}/course/{event['event']['course_id']}",
+            "objectType": "Activity",
+            "definition": self.object_definition,
+        }
+
+
+class XAPIConverter:
+    """Convert Open edX events to xAPI statements.
+
+    Converters (see `ralph.defaults.Converters`) are instantiated once and
+    resolved by event type in a dispatch table. Events without a converter are
+    skipped and events that cannot be converted are logged and counted as
+    failed.
+    """
+
+    def __init__(self, platform_url=DEFAULT_CONVERTER_PLATFORM_URL):
+        """Instantiate registered converters.
+
+        Args:
+            platform_url (string): URL of the Open edX platform events have
+                been emitted by.
+
+        """
+
+        self.platform_url = platform_url
+        self.converters = {}
+        for converter in Converters:
+            converter_class = import_string(converter.value)
+            self.converters[converter_class.event_type] = converter_class(platform_url)
+        self.skipped = 0
+        self.failed = 0
+
+    def convert_batch(self, events):
+        """Convert a batch of raw JSON events.
+
+        Returns:
+            A tuple of JSON xAPI statements, the number of skipped events and
+            the number of events that failed to be converted.
+
+        """
+
+        converters = self.converters
+        statements = []
+        skipped = failed = 0
+        for raw_event in events:
+            try:
+                event = json.loads(raw_event)
+                converter = converters.get(event.get("event_type"))
+                if converter is None:
+                    skipped += 1
+                    continue
+                statements.append(json.dumps(converter.convert(event, raw_event)))
+            except (AttributeError, KeyError, TypeError, ValueError) as error:
+                logger.error("Cannot convert event %s: %s", raw_event, repr(error))
+                failed += 1
+        return statements, skipped, failed
+
+    def __call__(self, events, chunksize, jobs=1):
+        """Yield JSON xAPI statements converted from a stream of raw events.
+
+        Args:
+            events (iterable): Raw JSON events.
+            chunksize (int): The amount of events to convert at a time.
+            jobs (int): The number of processes converting batches (batches
+                order is kept).
+
+        """
+
+        batches = iter_chunks(events, chunksize)
+        if jobs == 1:
+            results = map(self.convert_batch, batches)
+            yield from self._collect(results)
+            return
+
+        # Only a few batches per process are pending to bound memory usage
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            pending = deque()
+            for batch in batches:
+                pending.append(
+                    executor.submit(_convert_batch, self.platform_url, batch)
+                )
+                if len(pending) >= 2 * jobs:
+                    yield from self._collect([pending.popleft().result()])
+            yield from self._collect(future.result() for future in pending)
+
+    def _collect(self, results):
+        """Yield converted statements, counting skipped and failed events."""
+
+        for statements, skipped, failed in results:
+            self.skipped += skipped
+            self.failed += failed
+            yield from statements
+
+
+@lru_cache(maxsize=None)
+def get_converter(platform_url):
+    """Return the converter of a platform (instantiated once per process)."""
+
+    return XAPIConverter(platform_url)
+
+
+def _convert_batch(platform_url, events):
+    """Convert a batch of raw events (worker process)."""
+
+    return get_converter(platform_url).convert_batch(events)
@@ -0,0 +1,426 @@
+"""
+Ralph events deduplication.
+
+Events are identified by a digest of their content (or of a configured field)
+stored in a persistent index: a memory-mapped bloom filter answering most
+lookups of new events without probing the memory-mapped digests set holding
+exact digests. Both files live in the application directory so that
+duplicates are detected across runs without loading the index in memory.
+"""
+
+import fcntl
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+from hashlib import blake2b
+from pathlib import Path
+
+from .defaults import (
+    DEDUPE_INDEX_DIR,
+    DEFAULT_DEDUPE_CAPACITY,
+    DEFAULT_DEDUPE_ERROR_RATE,
+)
+from .predicates import MISSING, get_field_getter
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SIZE = 16
+EMPTY_DIGEST = bytes(DIGEST_SIZE)
+
+
+def get_digest(value):
+    """Return the digest of a JSON serializable value."""
+
+    digest = blake2b(
+        json.dumps(value, sort_keys=True, separators=(",", ":")).encode(),
+        digest_size=DIGEST_SIZE,
+    ).digest()
+    # The null digest marks empty slots of digests sets
+    return digest if digest != EMPTY_DIGEST else b"\x01" * DIGEST_SIZE
+
+
+class MappedFile:
+    """A file with a fixed-size header memory-mapped for reading and writing.
+
+    Subclasses define the file magic bytes, the header struct format and the
+    offset of data following them.
+    """
+
+    magic = None
+    header = None
+    offset = None
+
+    def __init__(self, path, size):
+        """Open the file, creating it with the given size if it does not exist.
+
+        Args:
+            path (Path): Path to the file.
+            size (int): Size of the file (in bytes) to create.
+
+        Raises:
+            ValueError: if an existing file is not of the expected type.
+
+        """
+
+        self.path = Path(path)
+        if not self.path.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("wb") as mapped_file:
+                # Sparse file: pages are allocated when written
+                mapped_file.truncate(size)
+
+        with self.path.open("r+b") as mapped_file:
+            self.buffer = mmap.mmap(mapped_file.fileno(), 0)
+        magic = self.buffer[: len(self.magic)]
+        if magic not in (self.magic, bytes(len(self.magic))):
+            self.buffer.close()
+            msg = "Invalid index file: %s"
+            logger.error(msg, self.path)
+            raise ValueError(msg % self.path)
+
+    def read_header(self):
+        """Return header values (after the magic bytes)."""
+
+        return struct.unpack_from(self.header, self.buffer, len(self.magic))
+
+    def write_header(self, *values):
+        """Write header values (after the magic bytes)."""
+
+        self.buffer[: len(self.magic)] = self.magic
+        struct.pack_into(self.header, self.buffer, len(self.magic), *values)
+
+    def flush(self):
+        """Flush changes to the file."""
+
+        self.buffer.flush()
+
+    def close(self):
+        """Flush changes and unmap the file."""
+
+        if not self.buffer.closed:
+            self.buffer.flush()
+            self.buffer.close()
+
+
+class BloomFilter(MappedFile):
+    """A memory-mapped bloom filter of digests."""
+
+    magic = b"RLPHBLM1"
+    header = "<QQ"
+    offset = len(magic) + struct.calcsize(header)
+
+    def __init__(self, path, capacity, error_rate=DEFAULT_DEDUPE_ERROR_RATE):
+        """Open (or create) the bloom filter.
+
+        Args:
+            path (Path): Path to the bloom filter file.
+            capacity (int): Number of digests the filter is sized for (only
+                used to create the filter).
+            error_rate (float): False positive rate of the filter at capacity
+                (only used to create the filter).
+
+        """
+
+        bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        bits = max(bits, 64)
+        super().__init__(path, self.offset + math.ceil(bits / 8))
+
+        self.bits, self.hashes = self.read_header()
+        if not self.bits:
+            self.bits = bits
+            self.hashes = max(1, round(bits / capacity * math.log(2)))
+            self.write_header(self.bits, self.hashes)
+
+    def _positions(self, digest):
+        """Return bit positions of a digest (double hashing)."""
+
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        bits = self.bits
+        return [(first + idx * second) % bits for idx in range(self.hashes)]
+
+    def __contains__(self, digest):
+        buffer, offset = self.buffer, self.offset
+        for position in self._positions(digest):
+            if not buffer[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, digest):
+        """Add a digest to the filter.
+
+        Returns:
+            True if the digest may already have been added (all its bits were
+            set).
+
+        """
+
+        buffer, offset = self.buffer, self.offset
+        found = True
+        for position in self._positions(digest):
+            byte, bit = offset + (position >> 3), 1 << (position & 7)
+            if not buffer[byte] & bit:
+                buffer[byte] |= bit
+                found = False
+        return found
+
+
+class DigestSet(MappedFile):
+    """A memory-mapped open addressing hash set of digests."""
+
+    magic = b"RLPHSET1"
+    header = "<QQ"
+    offset = len(magic) + struct.calcsize(header)
+    max_load = 0.5
+
+    def __init__(self, path, capacity):
+        """Open (or create) the digests set.
+
+        Args:
+            path (Path): Path to the digests set file.
+            capacity (int): Number of digests the set is sized for (only used
+                to create the set).
+
+        """
+
+        slots = 2 ** math.ceil(math.log2(max(capacity / self.max_load, 8)))
+        super().__init__(path, self.offset + slots * DIGEST_SIZE)
+
+        self.slots, self.count = self.read_header()
+        if not self.slots:
+            self.slots = slots
+            self.write_header(self.slots, self.count)
+
+    @property
+    def capacity(self):
+        """Number of digests the set can hold before growing."""
+
+        return int(self.slots * self.max_load)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for start in range(self.offset, len(self.buffer), DIGEST_SIZE):
+            digest = self._read(start)
+            if digest != EMPTY_DIGEST:
+                yield digest
+
+    def _read(self, start):
+        """Return the digest stored in the slot at this offset."""
+
+        end = start + DIGEST_SIZE
+        return self.buffer[start:end]
+
+    def _find(self, digest):
+        """Return the offset of the digest slot (or of the empty slot it
+        should be stored in)."""
+
+        offset, slots = self.offset, self.slots
+        slot = int.from_bytes(digest[:8], "little") & (slots - 1)
+        while True:
+            start = offset + slot * DIGEST_SIZE
+            if self._read(start) in (digest, EMPTY_DIGEST):
+                return start
+            slot = (slot + 1) & (slots - 1)
+
+    def __contains__(self, digest):
+        return self._read(self._find(digest)) == digest
+
+    def add(self, digest):
+        """Add a digest to the set (it should not be full).
+
+        Returns:
+            True if the digest was not in the set.
+
+        """
+
+        start = self._find(digest)
+        if self._read(start) == digest:
+            return False
+        end = start + DIGEST_SIZE
+        self.buffer[start:end] = digest
+        self.count += 1
+        self.write_header(self.slots, self.count)
+        return True
+
+
+class DedupeIndex:
+    """A persistent index of seen event digests.
+
+    The index grows when its digests set is full: digests are moved to a set
+    (and a bloom filter) twice as large, swapped atomically with previous
+    ones.
+
+    An exclusive advisory lock of the index directory is held while the index
+    is open: concurrent processes using the same index wait for each other
+    instead of overwriting digests added by others.
+    """
+
+    def __init__(
+        self,
+        directory=DEDUPE_INDEX_DIR,
+        capacity=DEFAULT_DEDUPE_CAPACITY,
+        error_rate=DEFAULT_DEDUPE_ERROR_RATE,
+    ):
+        """Open (or create) the index.
+
+        Args:
+            directory (string): Path to the directory index files are stored
+                in.
+            capacity (int): Initial number of digests the index is sized for.
+            error_rate (float): False positive rate of the bloom filter (false
+                positives are resolved by the exact digests set).
+
+        """
+
+        self.directory = Path(directory)
+        self.error_rate = error_rate
+        self._lock_file = self._lock()
+        try:
+            self.digests = DigestSet(self.directory / "digests.bin", capacity)
+            self.bloom = BloomFilter(
+                self.directory / "bloom.bin", self.digests.capacity, error_rate
+            )
+        except ValueError:
+            self._unlock()
+            raise
+
+    def _lock(self):
+        """Acquire the exclusive lock of the index directory."""
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lock_file = (self.directory / "index.lock").open("a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info("Waiting for the deduplication index lock: %s", self.directory)
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def _unlock(self):
+        """Release the lock of the index directory."""
+
+        if not self._lock_file.closed:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.digests)
+
+    def __contains__(self, digest):
+        return digest in self.bloom and digest in self.digests
+
+    def add(self, digest):
+        """Add a digest to the index.
+
+        Returns:
+            True if the digest was not in the index.
+
+        """
+
+        if len(self.digests) >= self.digests.capacity:
+            self._grow()
+        if self.bloom.add(digest):
+            # Probable duplicate: check the exact digests set
+            return self.digests.add(digest)
+        self.digests.add(digest)
+        return True
+
+    def _grow(self):
+        """Move digests to a set and a bloom filter twice as large."""
+
+        capacity = self.digests.capacity * 2
+        logger.info("Growing deduplication index to %d digests", capacity)
+
+        paths = {
+            name: (self.directory / f"{name}.bin", self.directory / f"{name}.bin.tmp")
+            for name in ("digests", "bloom")
+        }
+        for _, temporary in paths.values():
+            if temporary.exists():
+                temporary.unlink()
+        digests = DigestSet(paths["digests"][1], capacity)
+        bloom = BloomFilter(paths["bloom"][1], digests.capacity, self.error_rate)
+        for digest in self.digests:
+            digests.add(digest)
+            bloom.add(digest)
+
+        self.digests.close()
+        self.bloom.close()
+        digests.close()
+        bloom.close()
+        # The bloom filter is replaced first: an interrupted growth leaves a
+        # larger bloom filter (with the same digests) and the previous set
+        for path, temporary in (paths["bloom"], paths["digests"]):
+            os.replace(temporary, path)
+        self.digests = DigestSet(paths["digests"][0], capacity)
+        self.bloom = BloomFilter(paths["bloom"][0], capacity, self.error_rate)
+
+    def flush(self):
+        """Flush index changes to disk."""
+
+        self.digests.flush()
+        self.bloom.flush()
+
+    def close(self):
+        """Flush index changes, close index files and release the lock."""
+
+        self.digests.close()
+        self.bloom.close()
+        self._unlock()
+
+
+class Deduplicator:
+    """Drop events already seen (in this run or in previous ones).
+
+    Calling the deduplicator with a batch of decoded events returns events
+    that are not in the index and adds them to it (it can be used as a filter
+    of a `ralph.filters.FilterPipeline`).
+    """
+
+    def __init__(self, index, key=None):
+        """Instantiate the deduplicator.
+
+        Args:
+            index (DedupeIndex): The index of seen events digests.
+            key (string): The (dotted) path of the event field identifying
+                events. Events are identified by their whole content if not
+                set or if they miss this field.
+
+        """
+
+        self.index = index
+        self.key = key
+        self.duplicates = 0
+        self._getter = (
+            get_field_getter(tuple(key.split("."))) if key else lambda event: MISSING
+        )
+
+    def __call__(self, events):
+        """Return events of the batch that have not been seen yet."""
+
+        kept = []
+        for event in events:
+            if self.index.add(self.get_digest(event)):
+                kept.append(event)
+            else:
+                self.duplicates += 1
+        return kept
+
+    def get_digest(self, event):
+        """Return the digest identifying a decoded event."""
+
+        value = self._getter(event)
+        if value is not MISSING:
+            return get_digest({self.key: value})
+        return get_digest(event)
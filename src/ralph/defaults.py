@@ -19,6 +19,45 @@ class DatabaseBackends(Enum):
     ES = "ralph.backends.database.es.ESDatabase"
 
 
+class Converters(Enum):
+    """Enumerate active xAPI converters.
+
+    Adding an entry to this enum will make events of its type convertible.
+    Converter values are dotted paths to `ralph.converter.BaseConverter`
+    subclasses, each converting events of a single event type.
+    """
+
+    ENROLLMENT_ACTIVATED = "ralph.converter.EnrollmentActivatedConverter"
+    PAGE_CLOSE = "ralph.converter.PageCloseConverter"
+    PAUSE_VIDEO = "ralph.converter.PauseVideoConverter"
+    PLAY_VIDEO = "ralph.converter.PlayVideoConverter"
+    PROBLEM_CHECK = "ralph.converter.ProblemCheckConverter"
+    SEEK_VIDEO = "ralph.converter.SeekVideoConverter"
+
+
+class Filters(Enum):
+    """Enumerate active events filters.
+
+    Adding an entry to this enum will make it available to the CLI. Filter
+    values are dotted paths to callables taking a batch of decoded events and
+    returning kept events.
+    """
+
+    ANONYMOUS = "ralph.filters.anonymous"
+    PSEUDONYMIZE = "ralph.filters.pseudonymize"
+
+
+class Formatters(Enum):
+    """Enumerate active output formatters modules.
+
+    Adding an entry to this enum will make it available to the CLI.
+    """
+
+    NDJSON = "ralph.formatter.NDJSONFormatter"
+    ARROW = "ralph.formatter.ArrowFormatter"
+    PARQUET = "ralph.formatter.ParquetFormatter"
+
+
 class Parsers(Enum):
     """Enumerate active parsers modules.
 
@@ -28,6 +67,22 @@ class Parsers(Enum):
     GELF = "ralph.parsers.GELFParser"
 
 
+class ParserEngines(Enum):
+    """Enumerate JSON decoding engines available to parsers.
+
+    Adding an entry to this enum will make it available to the CLI. Engine
+    values are dotted paths to a callable decoding a JSON document, except for
+    the pandas engine that relies on `pandas.read_json` to decode chunks of
+    records at once. Optional engines (orjson, msgspec) require their package
+    to be installed (see the `fast` extra).
+    """
+
+    PANDAS = "pandas.read_json"
+    JSON = "json.loads"
+    ORJSON = "orjson.loads"
+    MSGSPEC = "msgspec.json.decode"
+
+
 class StorageBackends(Enum):
     """Enumerate active storage backend modules.
 
@@ -95,11 +150,59 @@ CONFIG_FILE = APP_DIR / "config.yml"
 CONFIG = load_config(CONFIG_FILE)
 ENVVAR_PREFIX = "RALPH"
 DEFAULT_GELF_PARSER_CHUNCK_SIZE = config("RALPH_DEFAULT_GELF_PARSER_CHUNCK_SIZE", 5000)
+DEFAULT_GELF_PARSER_ENGINE = config("RALPH_DEFAULT_GELF_PARSER_ENGINE", "json")
+DEFAULT_PARSER_SHARD_SIZE = int(
+    config("RALPH_DEFAULT_PARSER_SHARD_SIZE", 16 * 1024 ** 2)
+)
+DEFAULT_DECOMPRESSION_CHUNK_SIZE = int(
+    config("RALPH_DEFAULT_DECOMPRESSION_CHUNK_SIZE", 1024 ** 2)
+)
+DEFAULT_GZIP_SEGMENT_SIZE = int(config("RALPH_DEFAULT_GZIP_SEGMENT_SIZE", 1024 ** 2))
+DEFAULT_GZIP_PREFETCH_SIZE = int(
+    config("RALPH_DEFAULT_GZIP_PREFETCH_SIZE", 8 * 1024 ** 2)
+)
+DEFAULT_FILTER_CHUNK_SIZE = int(config("RALPH_DEFAULT_FILTER_CHUNK_SIZE", 5000))
+DEFAULT_SAMPLING_KEY = config("RALPH_DEFAULT_SAMPLING_KEY", "username")
+PSEUDONYMIZATION_KEY = config("RALPH_PSEUDONYMIZATION_KEY", None)
+PSEUDONYMIZED_FIELDS = config(
+    "RALPH_PSEUDONYMIZED_FIELDS", "username,context.user_id,ip"
+)
+DEFAULT_PSEUDONYMIZATION_CACHE_SIZE = int(
+    config("RALPH_DEFAULT_PSEUDONYMIZATION_CACHE_SIZE", 100000)
+)
+DEFAULT_FORMATTER_BATCH_SIZE = int(config("RALPH_DEFAULT_FORMATTER_BATCH_SIZE", 10000))
 DEFAULT_BACKEND_CHUNCK_SIZE = config("RALPH_DEFAULT_BACKEND_CHUNCK_SIZE", 500)
+DEFAULT_ROUTER_BATCH_SIZE = int(config("RALPH_DEFAULT_ROUTER_BATCH_SIZE", 1000))
+DEFAULT_ROUTER_QUEUE_SIZE = int(config("RALPH_DEFAULT_ROUTER_QUEUE_SIZE", 16))
+DEFAULT_CONVERTER_PLATFORM_URL = config(
+    "RALPH_DEFAULT_CONVERTER_PLATFORM_URL", "http://localhost:8000"
+)
+DEFAULT_CONVERTER_CHUNK_SIZE = int(config("RALPH_DEFAULT_CONVERTER_CHUNK_SIZE", 1000))
 FS_STORAGE_DEFAULT_PATH = Path(
     config("RALPH_FS_STORAGE_DEFAULT_PATH", APP_DIR / "archives")
 )
-HISTORY_FILE = Path(config("RALPH_HISTORY_FILE", APP_DIR / "history.json"))
+DEFAULT_FS_READ_BUFFER_SIZE = int(
+    config("RALPH_DEFAULT_FS_READ_BUFFER_SIZE", 1024 ** 2)
+)
+DEFAULT_FS_WRITE_BUFFER_SIZE = int(
+    config("RALPH_DEFAULT_FS_WRITE_BUFFER_SIZE", 1024 ** 2)
+)
+LDP_STORAGE_READ_RETRIES = int(config("RALPH_LDP_STORAGE_READ_RETRIES", 5))
+LDP_STORAGE_READ_RETRY_DELAY = float(config("RALPH_LDP_STORAGE_READ_RETRY_DELAY", 1))
+LDP_STORAGE_CONNECT_TIMEOUT = float(config("RALPH_LDP_STORAGE_CONNECT_TIMEOUT", 10))
+LDP_STORAGE_READ_TIMEOUT = float(config("RALPH_LDP_STORAGE_READ_TIMEOUT", 60))
+# Either none, file (sync written files) or full (sync files and directories)
+FS_STORAGE_DEFAULT_FSYNC = config("RALPH_FS_STORAGE_DEFAULT_FSYNC", "file")
+HISTORY_FILE = Path(config("RALPH_HISTORY_FILE", APP_DIR / "history.jsonl"))
+# JSON history file of previous releases (migrated to HISTORY_FILE)
+LEGACY_HISTORY_FILE = APP_DIR / "history.json"
+HISTORY_RETENTION_DAYS = int(config("RALPH_HISTORY_RETENTION_DAYS", 90))
+HISTORY_MAX_ENTRIES = int(config("RALPH_HISTORY_MAX_ENTRIES", 10000))
+CHECKPOINTS_DIR = Path(config("RALPH_CHECKPOINTS_DIR", APP_DIR / "checkpoints"))
+DEFAULT_CHECKPOINT_INTERVAL = float(config("RALPH_DEFAULT_CHECKPOINT_INTERVAL", 10))
+DEDUPE_INDEX_DIR = Path(config("RALPH_DEDUPE_INDEX_DIR", APP_DIR / "dedupe"))
+DEFAULT_DEDUPE_CAPACITY = int(config("RALPH_DEFAULT_DEDUPE_CAPACITY", 1000000))
+DEFAULT_DEDUPE_ERROR_RATE = float(config("RALPH_DEFAULT_DEDUPE_ERROR_RATE", 0.001))
 LOGGING_CONFIG = config("RALPH_LOGGING", DEFAULT_LOGGING_CONFIG)
 SENTRY_DSN = config("RALPH_SENTRY_DSN", None)
 EXECUTION_ENVIRONMENT = config("RALPH_EXECUTION_ENVIRONMENT", "development")
@@ -11,9 +11,17 @@ class ConfigurationException(Exception):
     """Raised when the configuration is not valid"""
 
 
+class DecompressionError(Exception):
+    """Raised when a compressed stream cannot be decompressed"""
+
+
 class EventKeyError(Exception):
     """Raised when an expected event key has not been found."""
 
 
+class PredicateSyntaxError(Exception):
+    """Raised when a predicate expression cannot be parsed"""
+
+
 class UnsupportedBackendException(Exception):
     """Raised when trying to use an unsupported backend type"""
@@ -1,22 +1,213 @@
 """
 Ralph tracking logs filters.
 """
-from .exceptions import EventKeyError
+
+import hmac
+import json
+import logging
+from functools import lru_cache
+from hashlib import sha256
+
+import pandas as pd
+
+from .defaults import (
+    DEFAULT_FILTER_CHUNK_SIZE,
+    DEFAULT_PSEUDONYMIZATION_CACHE_SIZE,
+    PSEUDONYMIZATION_KEY,
+    PSEUDONYMIZED_FIELDS,
+)
+from .exceptions import ConfigurationException, EventKeyError
+from .parsers import iter_chunks
+from .utils import import_string
+
+logger = logging.getLogger(__name__)
 
 
 def anonymous(events):
     """Remove anonymous events.
 
     Args:
-        events (DataFrame): events to filter
+        events (DataFrame or list): events to filter (a DataFrame or a batch
+            of decoded events).
 
     Returns:
-        Filtered pandas DataFrame.
+        Filtered pandas DataFrame (or list of events).
 
     """
 
+    if not isinstance(events, pd.DataFrame):
+        # Events without username (or that are not objects) are kept, as
+        # DataFrame rows with a missing username
+        return [
+            event
+            for event in events
+            if not isinstance(event, dict) or event.get("username") != ""
+        ]
+
     if events.get("username", None) is None:
         raise EventKeyError(
             "Cannot filter anonymous filters without 'username' column."
         )
     return events.loc[lambda df: df["username"] != "", :]
+
+
+class Pseudonymizer:
+    """Replace identifying event fields with keyed HMAC-SHA256 pseudonyms.
+
+    Pseudonyms of identifiers are memoized in a LRU cache: learners appearing
+    in many events are only hashed once. Empty or null identifiers (e.g.
+    anonymous events usernames) are left unchanged.
+    """
+
+    def __init__(self, key, fields, cache_size=DEFAULT_PSEUDONYMIZATION_CACHE_SIZE):
+        """Instantiate the pseudonymizer.
+
+        Args:
+            key (string or bytes): The secret HMAC key.
+            fields (list): (Dotted) paths of the event fields to pseudonymize.
+            cache_size (int): The maximum number of memoized pseudonyms.
+
+        """
+
+        self.fields = fields
+        # Fields paths tree, e.g. {"username": None, "context": {"user_id": None}}
+        self._tree = {}
+        for field in fields:
+            *parents, name = field.split(".")
+            node = self._tree
+            for parent in parents:
+                node = node.setdefault(parent, {})
+            node[name] = None
+        # The keyed HMAC state is computed once and copied for each value
+        self._hmac = hmac.new(
+            key.encode() if isinstance(key, str) else key, digestmod=sha256
+        )
+        self.get_pseudonym = lru_cache(maxsize=cache_size)(self._get_pseudonym)
+
+    def _get_pseudonym(self, value):
+        """Return the pseudonym of an identifier."""
+
+        digest = self._hmac.copy()
+        digest.update(str(value).encode())
+        return digest.hexdigest()
+
+    def __call__(self, events):
+        """Return the batch of events with pseudonymized fields.
+
+        Events with pseudonymized fields are new event objects (updated
+        nested objects are copied), other events are returned unchanged.
+        """
+
+        tree = self._tree
+        return [self._pseudonymize(event, tree) for event in events]
+
+    def pseudonymize(self, event):
+        """Return the event with pseudonymized fields."""
+
+        return self._pseudonymize(event, self._tree)
+
+    def _pseudonymize(self, obj, tree):
+        """Return a copy of the object with pseudonymized fields of the tree
+        (or the object itself if it has no field to pseudonymize)."""
+
+        if not isinstance(obj, dict):
+            return obj
+        updated = None
+        for key, subtree in tree.items():
+            value = obj.get(key)
+            if value is None or value == "":
+                continue
+            if subtree is None:
+                pseudonym = self.get_pseudonym(value)
+            else:
+                pseudonym = self._pseudonymize(value, subtree)
+                if pseudonym is value:
+                    continue
+            if updated is None:
+                updated = dict(obj)
+            updated[key] = pseudonym
+        return obj if updated is None else updated
+
+
+@lru_cache(maxsize=None)
+def get_pseudonymizer(key, fields):
+    """Return the pseudonymizer of the given settings (memoized)."""
+
+    if not key:
+        msg = "The pseudonymize filter requires the RALPH_PSEUDONYMIZATION_KEY setting"
+        logger.error(msg)
+        raise ConfigurationException(msg)
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    return Pseudonymizer(key, [field.strip() for field in fields])
+
+
+def pseudonymize(events):
+    """Replace identifying fields of events with keyed HMAC pseudonyms.
+
+    The HMAC key and pseudonymized fields are configured with the
+    RALPH_PSEUDONYMIZATION_KEY and RALPH_PSEUDONYMIZED_FIELDS settings.
+
+    Args:
+        events (list): A batch of decoded events.
+
+    Returns:
+        The batch of pseudonymized events.
+
+    Raises:
+        ConfigurationException: if the HMAC key is not configured.
+
+    """
+
+    fields = PSEUDONYMIZED_FIELDS
+    if isinstance(fields, list):
+        fields = tuple(fields)
+    return get_pseudonymizer(PSEUDONYMIZATION_KEY, fields)(events)
+
+
+class FilterPipeline:
+    """Apply a sequence of filters to a stream of raw JSON events.
+
+    Events are decoded and filtered by batches: each filter is called once
+    per batch with the list of events kept by previous filters. Kept events
+    that have not been modified by filters are yielded as their raw JSON
+    string (they are not encoded again): filters modifying events should
+    return new event objects instead of updating them in place.
+    """
+
+    def __init__(self, filters, chunksize=DEFAULT_FILTER_CHUNK_SIZE):
+        """Instantiate the pipeline.
+
+        Args:
+            filters (list): Filters dotted paths (see `ralph.defaults.Filters`)
+                or callables taking a list of decoded events and returning
+                kept events.
+            chunksize (int): The amount of events to filter at a time.
+
+        """
+
+        self.filters = [
+            import_string(filter_) if isinstance(filter_, str) else filter_
+            for filter_ in filters
+        ]
+        self.chunksize = chunksize
+
+    def filter_batch(self, batch):
+        """Filter a batch of raw JSON events and return kept events."""
+
+        # Decoded events are referenced until the end of the batch so that
+        # their id cannot be reused by events created by filters
+        decoded = [json.loads(event) for event in batch]
+        raw_events = {id(event): raw for raw, event in zip(batch, decoded)}
+        events = decoded
+        for filter_ in self.filters:
+            events = filter_(events)
+        return [raw_events.get(id(event)) or json.dumps(event) for event in events]
+
+    def __call__(self, events):
+        """Yield kept events of a stream of raw JSON events."""
+
+        for batch in iter_chunks(events, self.chunksize):
+            kept = self.filter_batch(batch)
+            logger.debug("Kept %d/%d events", len(kept), len(batch))
+            yield from kept
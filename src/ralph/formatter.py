@@ -0,0 +1,221 @@
+"""
+Ralph events output formatters.
+"""
+
+import json
+import logging
+import sys
+from abc import ABC, abstractmethod
+
+import click
+
+from .defaults import DEFAULT_FORMATTER_BATCH_SIZE
+from .parsers import iter_chunks
+
+logger = logging.getLogger(__name__)
+
+# Open edX events fields flattened into columns (column name, path, type)
+EDX_FLATTENED_FIELDS = (
+    ("event_type", ("event_type",), "string"),
+    ("event_source", ("event_source",), "string"),
+    ("time", ("time",), "string"),
+    ("username", ("username",), "string"),
+    ("ip", ("ip",), "string"),
+    ("agent", ("agent",), "string"),
+    ("host", ("host",), "string"),
+    ("referer", ("referer",), "string"),
+    ("accept_language", ("accept_language",), "string"),
+    ("page", ("page",), "string"),
+    ("session", ("session",), "string"),
+    ("context_course_id", ("context", "course_id"), "string"),
+    ("context_org_id", ("context", "org_id"), "string"),
+    ("context_user_id", ("context", "user_id"), "int64"),
+    ("context_path", ("context", "path"), "string"),
+)
+RAW_EVENT_COLUMN = "raw"
+
+
+def get_field(event, path):
+    """Get the value of a (nested) event field or None if it is missing."""
+
+    value = event
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _as_string(value):
+    """Cast a field value to a string column value."""
+
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def _as_int(value):
+    """Cast a field value to an integer column value."""
+
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+class BaseFormatter(ABC):
+    """Base events output formatter."""
+
+    name = "base"
+
+    def __init__(
+        self, output=None, batch_size=DEFAULT_FORMATTER_BATCH_SIZE, append=False
+    ):
+        """Instantiate the formatter.
+
+        Args:
+            output (string): Path to the output file. Events are written to
+                the standard output if not set.
+            batch_size (int): The amount of events to format at a time.
+            append (boolean): Append events to the existing output file
+                instead of overwriting it.
+
+        """
+
+        self.output = output
+        self.batch_size = batch_size
+        self.append = append
+
+    @abstractmethod
+    def write(self, events):
+        """Format and write events (raw JSON strings)."""
+
+    def flush(self):
+        """Flush events written so far to the output."""
+
+
+class NDJSONFormatter(BaseFormatter):
+    """Newline-delimited JSON formatter (events are written untouched)."""
+
+    name = "ndjson"
+
+    def __init__(
+        self, output=None, batch_size=DEFAULT_FORMATTER_BATCH_SIZE, append=False
+    ):
+        super().__init__(output=output, batch_size=batch_size, append=append)
+        self._stream = None
+
+    def write(self, events):
+        """Write one event per line."""
+
+        if self.output is None:
+            for event in events:
+                click.echo(event)
+            return
+
+        with open(self.output, "a" if self.append else "w") as output:
+            self._stream = output
+            for event in events:
+                output.write(f"{event}\n")
+        self._stream = None
+
+    def flush(self):
+        """Flush the output file (events echoed to stdout are not buffered)."""
+
+        if self._stream is not None:
+            self._stream.flush()
+
+
+class ArrowFormatter(BaseFormatter):
+    """Apache Arrow IPC formatter.
+
+    Events are written as record batches where common Open edX fields are
+    flattened into columns, the raw event being kept in the `raw` column.
+    Events are written using the Arrow IPC streaming format to the standard
+    output or the (memory-mappable) Arrow IPC file format to an output file.
+    """
+
+    name = "arrow"
+
+    def __init__(
+        self, output=None, batch_size=DEFAULT_FORMATTER_BATCH_SIZE, append=False
+    ):
+        if append:
+            msg = "The %s formatter cannot append events to an existing output"
+            logger.error(msg, self.name)
+            raise ValueError(msg % self.name)
+        super().__init__(output=output, batch_size=batch_size)
+
+        try:
+            # pylint: disable=import-outside-toplevel
+            import pyarrow
+        except ImportError as error:
+            msg = "The %s formatter requires the pyarrow package to be installed"
+            logger.error(msg, self.name)
+            raise ImportError(msg % self.name) from error
+
+        self.pa = pyarrow  # pylint: disable=invalid-name
+        self.schema = pyarrow.schema(
+            [
+                (column, getattr(pyarrow, column_type)())
+                for column, _, column_type in EDX_FLATTENED_FIELDS
+            ]
+            + [(RAW_EVENT_COLUMN, pyarrow.string())]
+        )
+
+    def to_record_batch(self, events):
+        """Convert a list of raw events to an Arrow record batch."""
+
+        decoded = [json.loads(event) for event in events]
+        arrays = []
+        for _, path, column_type in EDX_FLATTENED_FIELDS:
+            cast = _as_int if column_type == "int64" else _as_string
+            arrays.append(
+                self.pa.array(
+                    [cast(get_field(event, path)) for event in decoded],
+                    type=getattr(self.pa, column_type)(),
+                )
+            )
+        arrays.append(self.pa.array(events, type=self.pa.string()))
+        return self.pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def _open_writer(self, sink):
+        """Open an Arrow IPC writer."""
+
+        if self.output is None:
+            return self.pa.ipc.new_stream(sink, self.schema)
+        return self.pa.ipc.new_file(sink, self.schema)
+
+    def write(self, events):
+        """Write events by record batches of batch_size events."""
+
+        sink = sys.stdout.buffer if self.output is None else self.output
+        with self._open_writer(sink) as writer:
+            for batch in iter_chunks(events, self.batch_size):
+                writer.write_batch(self.to_record_batch(batch))
+
+
+class ParquetFormatter(ArrowFormatter):
+    """Apache Parquet formatter (requires an output file)."""
+
+    name = "parquet"
+
+    def __init__(
+        self, output=None, batch_size=DEFAULT_FORMATTER_BATCH_SIZE, append=False
+    ):
+        if output is None:
+            msg = "The %s formatter requires an output file"
+            logger.error(msg, self.name)
+            raise ValueError(msg % self.name)
+        super().__init__(output=output, batch_size=batch_size, append=append)
+
+    def _open_writer(self, sink):
+        """Open a Parquet writer."""
+        # pylint: disable=import-outside-toplevel
+
+        import pyarrow.parquet
+
+        return pyarrow.parquet.ParquetWriter(sink, self.schema)
@@ -0,0 +1,392 @@
+"""
+Ralph backends history store.
+
+The history is an append-only JSON lines file: recording an entry appends a
+single line to it instead of rewriting the whole history. Entries are loaded
+once and indexed by backend, command and id.
+
+Entries older than the retention period are compacted into a single line per
+backend command holding the sorted array of their ids: ids remain known (e.g.
+to list new archives) while their details are dropped.
+
+Concurrent processes (or threads) may update the same history: updates hold
+an exclusive advisory lock on a lock file next to the history file, and
+rewrites (compactions, migrations) re-read the history under this lock before
+replacing it atomically.
+"""
+
+import datetime
+import fcntl
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from .defaults import (
+    HISTORY_FILE,
+    HISTORY_MAX_ENTRIES,
+    HISTORY_RETENTION_DAYS,
+    LEGACY_HISTORY_FILE,
+)
+
+logger = logging.getLogger(__name__)
+
+COMPACTED_IDS = "compacted_ids"
+
+
+def get_entry_datetime(entry):
+    """Return the (timezone aware) datetime of a history entry (its first
+    `*_at` field, e.g. `fetched_at`) or None."""
+
+    for key, value in entry.items():
+        if not key.endswith("_at") or not isinstance(value, str):
+            continue
+        try:
+            date = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            continue
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=datetime.timezone.utc)
+        return date
+    return None
+
+
+def is_compactable(entry, before):
+    """Return True if a history entry should be compacted: it has an id and no
+    date or a date older than the `before` datetime."""
+
+    if not isinstance(entry, dict) or entry.get("id") is None:
+        return False
+    date = get_entry_datetime(entry)
+    return date is None or date < before
+
+
+class HistoryStore:
+    """An append-only history of backends commands (e.g. fetched archives).
+
+    JSON history files (a JSON array of entries) written by previous releases
+    are migrated to the JSON lines format when the history is loaded. The
+    history is compacted automatically when it is loaded with more than
+    `max_entries` detailed entries, some of them being older than the
+    retention period.
+    """
+
+    # Lock state attributes come on top of the history settings and index
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        path=HISTORY_FILE,
+        legacy_path=LEGACY_HISTORY_FILE,
+        retention_days=HISTORY_RETENTION_DAYS,
+        max_entries=HISTORY_MAX_ENTRIES,
+    ):
+        """Instantiate the history store (the history is loaded lazily).
+
+        Args:
+            path (Path): Path to the JSON lines history file.
+            legacy_path (Path): Path to the JSON history file to migrate if
+                the history file does not exist.
+            retention_days (int): The number of days detailed entries are
+                kept for when the history is compacted.
+            max_entries (int): The number of detailed entries above which the
+                history is compacted when loaded (0 disables automatic
+                compaction).
+
+        """
+
+        self.path = Path(path)
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        self.retention_days = retention_days
+        self.max_entries = max_entries
+        self.lock_path = self.path.with_name(f"{self.path.name}.lock")
+        self._entries = None
+        self._index = None
+        self._compacted = None
+        self._thread_lock = threading.RLock()
+        self._lock_file = None
+        self._lock_depth = 0
+
+    @property
+    def entries(self):
+        """Get detailed history entries (in insertion order)."""
+
+        if self._entries is None:
+            self._load()
+        return self._entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def ids(self, backend, command):
+        """Return ids of the history entries of a backend command (e.g. ids of
+        archives fetched from a backend), compacted ones included."""
+
+        if self._index is None:
+            self._load()
+        ids = self._index[(backend, command)].keys()
+        compacted = self._compacted.get((backend, command))
+        return ids | compacted if compacted else ids
+
+    def get(self, backend, command, id_):
+        """Return the latest history entry of a backend command on an id (or
+        None). Compacted entries only have a backend, a command and an id."""
+
+        if self._index is None:
+            self._load()
+        entry = self._index[(backend, command)].get(id_)
+        if entry is None and id_ in self._compacted.get((backend, command), ()):
+            entry = {"backend": backend, "command": command, "id": id_}
+        return entry
+
+    def append(self, entry):
+        """Append an entry to the history.
+
+        The history is not loaded to append an entry (unless it should be
+        migrated first): loaded entries are updated if they have been loaded
+        already.
+        """
+
+        logger.debug("Appending to history file: %s", str(self.path))
+
+        with self.lock():
+            if self._entries is None and self._should_migrate():
+                self._load()
+            with self.path.open("a+b") as history_file:
+                # An interrupted append leaves a truncated last line: the entry
+                # should not be appended to it
+                if history_file.seek(0, os.SEEK_END):
+                    history_file.seek(-1, os.SEEK_END)
+                    if history_file.read(1) != b"\n":
+                        history_file.write(b"\n")
+                history_file.write(json.dumps(entry).encode() + b"\n")
+            if self._entries is not None:
+                self._entries.append(entry)
+                self._add_to_index(entry)
+
+    def rewrite(self, transform):
+        """Replace detailed history entries (compacted ids are kept).
+
+        Entries are transformed as read from the history file under the lock
+        (entries appended by other processes included).
+
+        Args:
+            transform (callable): A function returning the new entries given
+                the current ones.
+
+        """
+
+        logger.debug("Writing history file: %s", str(self.path))
+
+        with self.lock():
+            self._read()
+            self._replace(list(transform(self._entries)))
+
+    def remove(self, selector):
+        """Remove selected entries from the history.
+
+        Entries are selected among the entries of the history file (entries
+        appended by other processes included).
+
+        Args:
+            selector (callable): A function returning True for entries to
+                remove.
+
+        """
+
+        self.rewrite(
+            lambda entries: [entry for entry in entries if not selector(entry)]
+        )
+
+    @contextmanager
+    def lock(self):
+        """Hold an exclusive lock on the history (reentrant).
+
+        The lock is an advisory lock of the lock file: it is held by a single
+        thread of a single process.
+        """
+
+        with self._thread_lock:
+            if not self._lock_depth:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._lock_file = self.lock_path.open("a")
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if not self._lock_depth:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def compact(self, retention_days=None):
+        """Compact history entries older than the retention period.
+
+        Compacted entries ids are merged into sorted arrays of ids per backend
+        command. Entries without an id are kept, entries without a date are
+        compacted.
+
+        Args:
+            retention_days (int): The number of days detailed entries are
+                kept for (defaults to the store retention period).
+
+        Returns:
+            The number of compacted entries.
+
+        """
+
+        before = self._get_retention_limit(retention_days)
+
+        with self.lock():
+            self._read()
+            kept = []
+            compacted = defaultdict(set)
+            for entry in self._entries:
+                if not is_compactable(entry, before):
+                    kept.append(entry)
+                    continue
+                key = (entry.get("backend"), entry.get("command"))
+                compacted[key].add(entry["id"])
+
+            count = len(self._entries) - len(kept)
+            if not count:
+                logger.debug("No history entries to compact")
+                return count
+            logger.info("Compacting %d history entries (%d kept)", count, len(kept))
+            for key, ids in compacted.items():
+                self._compacted[key] = self._compacted.get(key, frozenset()) | ids
+            self._replace(kept)
+        return count
+
+    def _load(self):
+        """Load (and migrate or compact if needed) the history file."""
+
+        if self._read():
+            with self.lock():
+                # The history may have been migrated by another process
+                if self._read():
+                    logger.info("Migrating history file to %s", str(self.path))
+                    self._write(self._entries)
+            self._build_index()
+
+        # Detailed entries within the retention period are not compacted: the
+        # history is not rewritten on each load if none of them is older
+        if self.max_entries and len(self._entries) > self.max_entries:
+            before = self._get_retention_limit()
+            if any(is_compactable(entry, before) for entry in self._entries):
+                self.compact()
+
+    def _get_retention_limit(self, retention_days=None):
+        """Return the datetime detailed entries older than should be compacted
+        (`retention_days` defaults to the store retention period)."""
+
+        if retention_days is None:
+            retention_days = self.retention_days
+        return datetime.datetime.now(tz=datetime.timezone.utc) - datetime.timedelta(
+            days=retention_days
+        )
+
+    def _should_migrate(self):
+        """Whether the history is stored in a JSON history file (the legacy
+        history file if the history file does not exist)."""
+
+        if not self.path.exists():
+            return self.legacy_path is not None and self.legacy_path.exists()
+        with self.path.open("rb") as history_file:
+            return history_file.read(64).lstrip().startswith(b"[")
+
+    def _read(self):
+        """Read the history file (or the legacy history file if it does not
+        exist).
+
+        Returns:
+            True if the history has been read from a JSON history file (that
+            should be migrated).
+
+        """
+
+        logger.debug("Loading history file: %s", str(self.path))
+
+        self._compacted = {}
+        if not self.path.exists():
+            self._entries = []
+            if self.legacy_path is not None and self.legacy_path.exists():
+                with self.legacy_path.open() as legacy_file:
+                    self._entries = json.load(legacy_file)
+                return True
+            self._build_index()
+            return False
+
+        with self.path.open() as history_file:
+            content = history_file.read()
+        if content.lstrip().startswith("["):
+            self._entries = json.loads(content)
+            return True
+
+        self._entries = []
+        for number, line in enumerate(content.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # An interrupted append leaves a truncated last line
+                logger.warning(
+                    "Skipping invalid history entry (%s:%d)", str(self.path), number
+                )
+                continue
+            if isinstance(entry, dict) and COMPACTED_IDS in entry:
+                key = (entry.get("backend"), entry.get("command"))
+                self._compacted[key] = frozenset(entry[COMPACTED_IDS])
+                continue
+            self._entries.append(entry)
+        self._build_index()
+        return False
+
+    def _replace(self, entries):
+        """Replace detailed history entries (the lock should be held)."""
+
+        self._write(entries)
+        self._entries = entries
+        self._build_index()
+
+    def _write(self, entries):
+        """Write compacted ids and entries to a temporary file replacing the
+        history file (the lock should be held)."""
+
+        temporary = self.path.with_name(f"{self.path.name}.tmp")
+        with temporary.open("w") as history_file:
+            for (backend, command), ids in self._compacted.items():
+                compacted = {
+                    "backend": backend,
+                    "command": command,
+                    COMPACTED_IDS: sorted(ids),
+                }
+                history_file.write(json.dumps(compacted) + "\n")
+            for entry in entries:
+                history_file.write(json.dumps(entry) + "\n")
+            history_file.flush()
+            os.fsync(history_file.fileno())
+        os.replace(temporary, self.path)
+
+    def _build_index(self):
+        """Index history entries by backend, command and id."""
+
+        self._index = defaultdict(dict)
+        for entry in self._entries:
+            self._add_to_index(entry)
+
+    def _add_to_index(self, entry):
+        """Add an entry to the index."""
+
+        if isinstance(entry, dict) and entry.get("id") is not None:
+            key = (entry.get("backend"), entry.get("command"))
+            self._index[key][entry.get("id")] = entry
@@ -2,21 +2,131 @@
 Ralph tracking logs parsers.
 """
 
+import asyncio
+import json
 import logging
+import math
+import mmap
+import os
+import re
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from copy import copy
+from functools import lru_cache
+from io import BufferedReader, BytesIO
+from itertools import islice
+from json.decoder import scanstring
 from pathlib import Path
 
 import pandas as pd
 
-from .defaults import DEFAULT_GELF_PARSER_CHUNCK_SIZE
+from .compression import (
+    MAGIC_NUMBER_MAX_LENGTH,
+    ThreadedReader,
+    aiter_decompress,
+    detect_compression,
+    iter_decompress,
+    iter_file_chunks,
+    iter_parallel_gunzip,
+)
+from .defaults import (
+    DEFAULT_DECOMPRESSION_CHUNK_SIZE,
+    DEFAULT_GELF_PARSER_CHUNCK_SIZE,
+    DEFAULT_GELF_PARSER_ENGINE,
+    DEFAULT_PARSER_SHARD_SIZE,
+    ParserEngines,
+)
+from .utils import import_string
 
 logger = logging.getLogger(__name__)
 
+# JSON engines decoding bytes-like objects (such as memoryview)
+BUFFER_ENGINES = (ParserEngines.ORJSON, ParserEngines.MSGSPEC)
+
+# Bytes considered as whitespaces by bytes.isspace (blank lines are skipped)
+WHITESPACE = frozenset(b" \t\n\r\x0b\x0c")
+
+# GELF short_message raw extraction
+SHORT_MESSAGE_KEY = '"short_message":'
+SHORT_MESSAGE_KEY_PREFIXES = "{, \t\r\n"
+JSON_WHITESPACES = " \t\r\n"
+JSON_WHITESPACE = re.compile(f"[{JSON_WHITESPACES}]*")
+JSON_SCANNER = json.JSONDecoder().scan_once
+
+# Errors raised by JSON engines while decoding malformed GELF lines (invalid
+# JSON, missing short_message member or non-object record, the latter raising
+# an AttributeError with pandas)
+MALFORMED_LINE_ERRORS = (AttributeError, KeyError, TypeError, ValueError)
+
+
+class Quarantine:
+    """Sink of malformed lines skipped by tolerant parsers.
+
+    Each malformed line is recorded with its input name, its byte offset in
+    the (uncompressed) input and the decoding error. Records are appended to a
+    JSON lines file if a path is given or kept in memory otherwise.
+    """
+
+    def __init__(self, path=None):
+        """Instantiate the quarantine sink.
+
+        Args:
+            path (string): Path to the JSON lines file malformed lines are
+                appended to.
+
+        """
+
+        self.path = path
+        self.count = 0
+        self.records = []
+        self._file = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_file"] = None
+        return state
+
+    def add(self, input_file, offset, line, error):
+        """Record a malformed line."""
+
+        if not isinstance(line, str):
+            line = bytes(line).decode("utf-8", errors="replace")
+        self.write(
+            {
+                "input": str(getattr(input_file, "name", input_file)),
+                "offset": offset,
+                "error": f"{type(error).__name__}: {error}",
+                "line": line.rstrip("\r\n"),
+            }
+        )
+
+    def write(self, record):
+        """Write a malformed line record to the sink."""
+
+        self.count += 1
+        if self.path is None:
+            self.records.append(record)
+            return
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record) + "\n")
+
+    def close(self):
+        """Close the quarantine file (if opened)."""
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
 
 class BaseParser(ABC):
     """Base tracking logs parser."""
 
     name = "base"
+    # Sink of malformed lines for tolerant parsers (strict if None)
+    quarantine = None
 
     @abstractmethod
     def parse(self, input_file, chunksize=1):
@@ -31,6 +141,529 @@ class BaseParser(ABC):
 
         """
 
+    def parse_parallel(  # pylint: disable=too-many-arguments
+        self,
+        input_file,
+        jobs,
+        ordered=True,
+        chunksize=1,
+        shard_size=DEFAULT_PARSER_SHARD_SIZE,
+    ):
+        """Parse a log file by shards in a pool of processes.
+
+        The input file is split into byte ranges aligned on line boundaries,
+        each range being parsed by a worker process. Compressed files cannot be
+        split: they are decompressed using a pool of threads (multi-member
+        gzip files) and parsed sequentially.
+
+        Args:
+            input_file (string): Path to the log file to parse.
+            jobs (int): The number of worker processes.
+            ordered (boolean): Yield events in the input file order. Otherwise,
+                events are yielded shard by shard as soon as they are parsed.
+            chunksize (int): The amount of log records to process at a time.
+            shard_size (int): The maximum size (in bytes) of a shard.
+
+        Yields:
+            event: raw event as extracted from its container
+
+        """
+
+        if is_compressed(input_file):
+            logger.warning("Compressed input cannot be sharded, parsing sequentially")
+            with open_input(input_file, jobs=jobs) as stream:
+                yield from self.parse(stream, chunksize=chunksize)
+            return
+
+        # Make sure that each worker gets at least one shard
+        shard_size = min(
+            int(shard_size), math.ceil(os.path.getsize(input_file) / jobs) or 1
+        )
+        logger.info(
+            "Parsing %s using %d jobs (shard size: %d)", input_file, jobs, shard_size
+        )
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            pending = deque()
+            for start, end in get_shards(input_file, shard_size):
+                pending.append(
+                    executor.submit(
+                        _parse_shard, self, input_file, start, end, chunksize
+                    )
+                )
+                # Limit the number of shards parsed ahead of the consumer
+                if len(pending) >= 2 * jobs:
+                    for future in _pop_completed(pending, ordered):
+                        yield from self._collect(future.result())
+            while pending:
+                for future in _pop_completed(pending, ordered):
+                    yield from self._collect(future.result())
+
+    def parse_lines(self, lines, input_file=None):
+        """Parse a batch of raw lines.
+
+        Args:
+            lines (list): (offset, line) tuples, lines being bytes-like objects.
+            input_file (string): Name of the input lines have been read from.
+
+        Returns:
+            The list of events extracted from lines.
+
+        """
+        # pylint: disable=unused-argument
+
+        return list(self.parse(BytesIO(b"".join(line for _, line in lines))))
+
+    async def aparse(self, stream, chunksize=1, executor=None):
+        """Parse logs read from an asynchronous byte stream.
+
+        Lines are read (and decompressed if needed) without blocking the event
+        loop, and parsed by batches of chunksize lines in the executor. A batch
+        is parsed while the next one is being read.
+
+        Args:
+            stream: An asynchronous byte stream with a `read` coroutine (such
+                as `asyncio.StreamReader`) or an asynchronous iterable of
+                bytes chunks.
+            chunksize (int): The amount of log records to process at a time.
+            executor (Executor): The executor batches are parsed in (thread
+                or process pool). Defaults to the event loop's default
+                executor.
+
+        Yields:
+            event: raw event as extracted from its container
+
+        """
+
+        loop = asyncio.get_running_loop()
+        input_file = str(getattr(stream, "name", stream))
+        pending = None
+        batch = []
+
+        async def submit(lines):
+            """Parse lines in the executor and return the previous batch events"""
+
+            nonlocal pending
+            events = await pending if pending is not None else ([], [])
+            pending = loop.run_in_executor(
+                executor, _parse_batch, self, lines, input_file
+            )
+            return self._collect(events)
+
+        async for lines in aiter_lines(stream):
+            batch.extend(lines)
+            if len(batch) < chunksize:
+                continue
+            size = len(batch) - len(batch) % chunksize
+            for chunk in iter_chunks(batch[:size], chunksize):
+                for event in await submit(chunk):
+                    yield event
+            batch = batch[size:]
+
+        if batch:
+            for event in await submit(batch):
+                yield event
+        if pending is not None:
+            for event in self._collect(await pending):
+                yield event
+
+    def _collect(self, result):
+        """Return events parsed by a worker, quarantining malformed lines."""
+
+        events, malformed = result
+        for record in malformed:
+            self.quarantine.write(record)
+        return events
+
+
+def _peek_compression(stream):
+    """Detect the compression format of a peekable (or seekable) binary stream."""
+
+    if hasattr(stream, "peek"):
+        return detect_compression(stream.peek(MAGIC_NUMBER_MAX_LENGTH))
+
+    position = stream.tell()
+    header = stream.read(MAGIC_NUMBER_MAX_LENGTH)
+    stream.seek(position)
+    return detect_compression(header)
+
+
+@contextmanager
+def open_input(input_file, jobs=1):
+    """Open the input file to parse as a binary stream.
+
+    Compressed inputs (gzip, bz2, xz or zstd) are detected using their magic
+    number and decompressed in a background thread, overlapping with parsing.
+
+    Args:
+        input_file (string or file object): Path to the file to open or an
+            already opened file object (text streams are read through their
+            underlying binary buffer).
+        jobs (int): The number of threads used to decompress multi-member
+            gzip files (path inputs only).
+
+    Yields:
+        stream: a binary file object iterating over (uncompressed) input lines
+
+    """
+
+    if isinstance(input_file, (str, Path)):
+        with open(input_file, "rb") as stream:
+            compression = _peek_compression(stream)
+            if compression is None:
+                yield stream
+                return
+            if compression == "gzip" and jobs > 1:
+                chunks = iter_parallel_gunzip(input_file, jobs)
+            else:
+                chunks = iter_decompress(iter_file_chunks(stream), compression)
+            with BufferedReader(ThreadedReader(chunks)) as reader:
+                yield reader
+        return
+
+    stream = getattr(input_file, "buffer", input_file)
+    if not hasattr(stream, "peek") and not stream.seekable():
+        stream = BufferedReader(stream)
+    compression = _peek_compression(stream)
+    if compression is None:
+        yield stream
+        return
+    chunks = iter_decompress(iter_file_chunks(stream), compression)
+    with BufferedReader(ThreadedReader(chunks)) as reader:
+        yield reader
+
+
+def _mmap(stream):
+    """Memory-map an uncompressed file opened in binary mode.
+
+    Returns:
+        The read-only mapping or None if the file cannot be mapped.
+
+    """
+
+    # Only files opened by the io module are backed by an OS file descriptor
+    # that can be mapped.
+    if not isinstance(stream, BufferedReader) or _peek_compression(stream):
+        return None
+    try:
+        mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # Empty files and special files (pipes, devices) cannot be mapped
+        return None
+    if hasattr(mmap, "MADV_SEQUENTIAL"):
+        mapped.madvise(mmap.MADV_SEQUENTIAL)
+    return mapped
+
+
+def iter_mapped_lines(mapped, buffers=False, offsets=False, start=0):
+    """Yield non-blank lines of a memory-mapped file.
+
+    Line boundaries are searched directly in the mapped buffer.
+
+    Args:
+        mapped (mmap): The memory-mapped file.
+        buffers (boolean): Yield lines as memoryview slices of the mapping
+            (without copy) instead of bytes.
+        offsets (boolean): Yield (offset, line) tuples instead of lines.
+        start (int): The offset of the first line to yield.
+
+    """
+
+    view = memoryview(mapped) if buffers else mapped
+    find = mapped.find
+    size = len(mapped)
+    while start < size:
+        end = find(b"\n", start) + 1 or size
+        # Only lines starting with a whitespace are copied to be checked
+        if mapped[start] not in WHITESPACE or not mapped[start:end].isspace():
+            yield (start, view[start:end]) if offsets else view[start:end]
+        start = end
+
+
+def iter_stream_lines(stream, offsets=False, start=0):
+    """Yield non-blank lines of a binary stream.
+
+    Args:
+        stream (file object): The binary stream to read.
+        offsets (boolean): Yield (offset, line) tuples instead of lines.
+        start (int): The offset of the first line to yield. Non-seekable
+            streams (e.g. decompressed inputs) are read up to this offset.
+
+    """
+
+    if start and stream.seekable():
+        stream.seek(start)
+    elif start:
+        remaining = start
+        chunk_size = DEFAULT_DECOMPRESSION_CHUNK_SIZE
+        while remaining and (data := stream.read(min(remaining, chunk_size))):
+            remaining -= len(data)
+
+    if not offsets:
+        yield from (line for line in stream if not line.isspace())
+        return
+
+    offset = start
+    for line in stream:
+        if not line.isspace():
+            yield offset, line
+        offset += len(line)
+
+
+async def aiter_lines(stream, chunk_size=DEFAULT_DECOMPRESSION_CHUNK_SIZE):
+    """Read non-blank lines of an asynchronous byte stream.
+
+    Compressed streams are detected and decompressed on the fly.
+
+    Args:
+        stream: An asynchronous byte stream with a `read` coroutine or an
+            asynchronous iterable of bytes chunks.
+        chunk_size (int): The amount of bytes to read at a time.
+
+    Yields:
+        lines: a list of (offset, line) tuples per chunk read from the stream,
+            offsets being relative to the uncompressed stream.
+
+    """
+
+    async def iter_stream_chunks():
+        """Yield bytes chunks read from the stream"""
+
+        if hasattr(stream, "read"):
+            while chunk := await stream.read(chunk_size):
+                yield chunk
+            return
+        async for chunk in stream:
+            yield chunk
+
+    offset = 0
+    rest = b""
+    async for data in aiter_decompress(iter_stream_chunks()):
+        data = rest + data
+        lines = []
+        start = 0
+        while end := data.find(b"\n", start) + 1:
+            if data[start] not in WHITESPACE or not data[start:end].isspace():
+                lines.append((offset + start, data[start:end]))
+            start = end
+        offset += start
+        rest = data[start:]
+        if lines:
+            yield lines
+
+    if rest and not rest.isspace():
+        yield [(offset, rest)]
+
+
+@contextmanager
+def open_lines(input_file, buffers=False, offsets=False, start=0):
+    """Open the input file to parse and iterate over its non-blank lines.
+
+    Uncompressed regular files are memory-mapped, other inputs are read using
+    `open_input`.
+
+    Args:
+        input_file (string or file object): Path to the file to open or an
+            already opened file object.
+        buffers (boolean): Yield lines of memory-mapped files as memoryview
+            objects, for JSON engines decoding any bytes-like object.
+        offsets (boolean): Iterate over (offset, line) tuples, offset being
+            the line position (in bytes) in the (uncompressed) input.
+        start (int): The offset (in bytes) of the first line to iterate over.
+
+    Yields:
+        lines: an iterator over input lines
+
+    """
+
+    mapped = None
+    if isinstance(input_file, (str, Path)):
+        with open(input_file, "rb") as stream:
+            mapped = _mmap(stream)
+
+    if mapped is None:
+        with open_input(input_file) as stream:
+            yield iter_stream_lines(stream, offsets=offsets, start=start)
+        return
+
+    try:
+        yield iter_mapped_lines(mapped, buffers=buffers, offsets=offsets, start=start)
+    finally:
+        try:
+            mapped.close()
+        except BufferError:
+            # Lines are still referenced by the consumer: the mapping will be
+            # closed once garbage collected.
+            pass
+
+
+def is_compressed(input_file):
+    """Return whether the input file path points to a compressed file."""
+
+    with open(input_file, "rb") as stream:
+        return _peek_compression(stream) is not None
+
+
+def get_shards(input_file, shard_size):
+    """Yield (start, end) byte ranges of the input file aligned on lines.
+
+    Args:
+        input_file (string): Path to the file to split.
+        shard_size (int): The approximate size (in bytes) of a range. Ranges
+            are extended to the end of their last line.
+
+    """
+
+    size = os.path.getsize(input_file)
+    with open(input_file, "rb") as stream:
+        start = 0
+        while start < size:
+            end = start + shard_size
+            if end < size:
+                # Move to the end of the line containing the last byte of the
+                # range
+                stream.seek(end - 1)
+                stream.readline()
+                end = stream.tell()
+            end = min(end, size)
+            yield start, end
+            start = end
+
+
+def _parse_shard(parser, input_file, start, end, chunksize):
+    """Parse the [start, end) byte range of the input file (worker process).
+
+    Returns:
+        A tuple of parsed events and malformed line records (with offsets
+        relative to the input file) for tolerant parsers.
+
+    """
+
+    with open(input_file, "rb") as stream:
+        stream.seek(start)
+        data = stream.read(end - start)
+
+    if parser.quarantine is None:
+        return list(parser.parse(BytesIO(data), chunksize=chunksize)), []
+
+    # Collect malformed lines in memory, they are written by the main process
+    parser.quarantine = Quarantine()
+    events = list(parser.parse(BytesIO(data), chunksize=chunksize))
+    for record in parser.quarantine.records:
+        record.update(input=str(input_file), offset=record["offset"] + start)
+    return events, parser.quarantine.records
+
+
+def _parse_batch(parser, lines, input_file):
+    """Parse a batch of lines read from an asynchronous stream (executor).
+
+    Returns:
+        A tuple of parsed events and malformed line records for tolerant
+        parsers.
+
+    """
+
+    if parser.quarantine is None:
+        return parser.parse_lines(lines, input_file), []
+
+    # Batches may be parsed concurrently by threads sharing the parser:
+    # malformed lines are collected by a copy of it.
+    parser = copy(parser)
+    parser.quarantine = Quarantine()
+    return parser.parse_lines(lines, input_file), parser.quarantine.records
+
+
+def _pop_completed(pending, ordered):
+    """Remove and return completed futures from the pending queue.
+
+    In ordered mode, wait for the oldest submitted future only.
+    """
+
+    if ordered:
+        future = pending.popleft()
+        future.result()
+        return [future]
+
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        pending.remove(future)
+    return done
+
+
+def iter_chunks(iterable, chunksize):
+    """Yield lists of (at most) chunksize items from the iterable."""
+
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, chunksize)):
+        yield chunk
+
+
+def extract_short_message(line):
+    """Extract the short_message string value of a raw GELF line.
+
+    The value is searched for and unescaped (using the C-accelerated JSON
+    string scanner) without decoding members preceding it. Following members
+    are decoded to make sure that the record has not been truncated.
+
+    Args:
+        line (bytes or string): A GELF record (a JSON object).
+
+    Returns:
+        The short_message string or None for unusual lines (missing or
+        repeated key, non-string value, unexpected layout, malformed or
+        truncated record) that require a full JSON decoding.
+
+    """
+
+    try:
+        line = line.decode("utf-8") if isinstance(line, bytes) else line
+    except UnicodeDecodeError:
+        return None
+
+    key = line.find(SHORT_MESSAGE_KEY)
+    if (
+        not line.startswith("{")
+        or key < 0
+        or line[key - 1] not in SHORT_MESSAGE_KEY_PREFIXES
+    ):
+        return None
+
+    start = JSON_WHITESPACE.match(line, key + len(SHORT_MESSAGE_KEY)).end()
+    if not line.startswith('"', start):
+        return None
+
+    # Members following the value are decoded to make sure that the record is
+    # well formed (truncated records are left to the JSON engine)
+    try:
+        value, end = scanstring(line, start + 1)
+        tail = line[end:].strip(JSON_WHITESPACES)
+        if tail != "}":
+            tail = "{" + tail[1:] if tail.startswith(",") else ""
+            members, end = JSON_SCANNER(tail, 0)
+            if end != len(tail) or not members or "short_message" in members:
+                return None
+    except (StopIteration, ValueError):
+        return None
+    return value
+
+
+@lru_cache(maxsize=None)
+def get_msgspec_short_message_decoder():
+    """Return a msgspec decoder only decoding the short_message GELF member.
+
+    Other members of the GELF record are skipped without being decoded.
+    """
+    # pylint: disable=import-outside-toplevel
+
+    import msgspec
+
+    class ShortMessage(msgspec.Struct):
+        """GELF record restricted to its short_message member"""
+
+        short_message: str
+
+    return msgspec.json.Decoder(ShortMessage), msgspec.ValidationError
+
 
 class GELFParser(BaseParser):
     """GELF formatted logs parser.
@@ -41,12 +674,69 @@ class GELFParser(BaseParser):
 
     name = "gelf"
 
+    def __init__(
+        self,
+        engine=DEFAULT_GELF_PARSER_ENGINE,
+        fast_path=True,
+        quarantine=None,
+        predicate=None,
+    ):
+        """Instantiate the parser with the JSON engine used to decode records.
+
+        Args:
+            engine (string): Name of the JSON decoding engine (see
+                `ralph.defaults.ParserEngines`). The pandas engine decodes
+                records by DataFrame chunks, while other engines stream the
+                input line by line with a constant memory footprint.
+            fast_path (boolean): Only decode the short_message member of GELF
+                records. With the json engine, the short_message value is
+                extracted from raw lines, the JSON engine being only used for
+                unusual lines. With the msgspec engine, other members are
+                skipped by the decoder. The orjson engine always decodes whole
+                records (it is faster than a pure Python extraction).
+            quarantine (Quarantine): Skip malformed lines (invalid JSON or
+                missing short_message member) and record them in this sink
+                instead of raising an error.
+            predicate (Predicate): Only yield events matching this predicate
+                (see `ralph.predicates.Predicate`). Raw lines not containing
+                the predicate literals are skipped before being decoded.
+
+        """
+
+        self.fast_path = fast_path
+        self.quarantine = quarantine
+        self.predicate = predicate
+        self._raw_literals = ()
+        if predicate is not None:
+            # Events are JSON strings wrapped in the short_message member
+            self._raw_literals = tuple(
+                literal.encode() for literal in predicate.get_raw_literals(depth=1)
+            )
+
+        try:
+            self.engine = ParserEngines[engine.upper()]
+        except KeyError as error:
+            msg = "Unsupported GELF parser engine: %s"
+            logger.error(msg, engine)
+            raise ValueError(msg % engine) from error
+
+        self._loads = None
+        if self.engine != ParserEngines.PANDAS:
+            try:
+                self._loads = import_string(self.engine.value)
+            except ImportError as error:
+                msg = "The %s engine requires the %s package to be installed"
+                logger.error(msg, engine, self.engine.value.split(".")[0])
+                raise ImportError(
+                    msg % (engine, self.engine.value.split(".")[0])
+                ) from error
+
     def parse(self, input_file, chunksize=DEFAULT_GELF_PARSER_CHUNCK_SIZE):
         """Parse GELF formatted logs (one json string event per row).
 
         Args:
             input_file (string): Path to the log file to parse (could be
-                gunzipped).
+                compressed using gzip, bz2, xz or zstd).
             chunksize (int): The amount of log records to process at a time. A
                 value between 3.000 and 10.000 seems to be a reasonnable choice
                 to parse 1.5M records in a few minutes (typically 2 or 3
@@ -56,14 +746,184 @@ class GELFParser(BaseParser):
             event: events raw short_message string
 
         """
-        logger.info("Parsing: %s", input_file)
+        logger.info("Parsing: %s (engine: %s)", input_file, self.engine.name.lower())
 
         if isinstance(input_file, str) and not Path(input_file).exists():
             msg = "Input GELF log file '%s' does not exist"
             logger.error(msg, input_file)
             raise OSError(msg % (input_file))
 
-        chunks = pd.read_json(input_file, lines=True, chunksize=chunksize)
-        for chunk in chunks:
-            for event in chunk["short_message"].values:
-                yield event
+        if self.quarantine is not None or self.predicate is not None:
+            for _, events in self._iter_decoded_chunks(input_file, chunksize):
+                yield from events
+            return
+
+        if self.engine == ParserEngines.PANDAS:
+            with open_input(input_file) as stream:
+                chunks = pd.read_json(stream, lines=True, chunksize=chunksize)
+                for chunk in chunks:
+                    for event in chunk["short_message"].values:
+                        yield event
+            return
+
+        buffers = self.engine in BUFFER_ENGINES
+        with open_lines(input_file, buffers=buffers) as lines:
+            for chunk in iter_chunks(lines, chunksize):
+                yield from self._decode(chunk)
+
+    def parse_chunks(
+        self, input_file, chunksize=DEFAULT_GELF_PARSER_CHUNCK_SIZE, start=0
+    ):
+        """Parse GELF formatted logs by chunks, tracking input positions.
+
+        Args:
+            input_file (string): Path to the log file to parse (could be
+                compressed using gzip, bz2, xz or zstd).
+            chunksize (int): The amount of log records to process at a time.
+            start (int): The byte offset (in the uncompressed input) to start
+                parsing from. It should point to the start of a line.
+
+        Yields:
+            (offset, events): the byte offset following the last line of the
+                chunk and the list of events (raw short_message strings)
+                extracted from the chunk.
+
+        """
+        logger.info(
+            "Parsing: %s from offset %d (engine: %s)",
+            input_file,
+            start,
+            self.engine.name.lower(),
+        )
+
+        if isinstance(input_file, str) and not Path(input_file).exists():
+            msg = "Input GELF log file '%s' does not exist"
+            logger.error(msg, input_file)
+            raise OSError(msg % (input_file))
+
+        yield from self._iter_decoded_chunks(input_file, chunksize, start)
+
+    def _iter_decoded_chunks(self, input_file, chunksize, start=0):
+        """Decode lines by chunks and yield (offset, events) tuples."""
+
+        count = self.quarantine.count if self.quarantine is not None else 0
+        # Raw lines are searched for predicate literals as bytes
+        buffers = self.engine in BUFFER_ENGINES and self.predicate is None
+        with open_lines(
+            input_file, buffers=buffers, offsets=True, start=start
+        ) as lines:
+            for chunk in iter_chunks(lines, chunksize):
+                offset, line = chunk[-1]
+                yield offset + len(line), self.parse_lines(chunk, input_file)
+
+        if self.quarantine is not None and (skipped := self.quarantine.count - count):
+            logger.warning("Skipped %d malformed lines in %s", skipped, input_file)
+
+    def parse_lines(self, lines, input_file=None):
+        """Parse a batch of raw GELF lines.
+
+        In tolerant mode, if the batch fails to decode, its lines are decoded
+        one by one to quarantine malformed ones only.
+
+        If the parser has a predicate, lines missing one of its literals are
+        skipped without being decoded and decoded events are evaluated.
+
+        Args:
+            lines (list): (offset, line) tuples, lines being bytes-like objects.
+            input_file (string): Name of the input lines have been read from.
+
+        Returns:
+            The list of events raw short_message strings.
+
+        """
+
+        if self._raw_literals:
+            literals = self._raw_literals
+            lines = [
+                (offset, line)
+                for offset, line in lines
+                if all(literal in line for literal in literals)
+            ]
+            if not lines:
+                return []
+
+        try:
+            events = self._decode([line for _, line in lines])
+        except MALFORMED_LINE_ERRORS:
+            if self.quarantine is None:
+                raise
+
+            events = []
+            for offset, line in lines:
+                try:
+                    events.extend(self._decode([line]))
+                except MALFORMED_LINE_ERRORS as error:
+                    self.quarantine.add(input_file, offset, line, error)
+
+        if self.predicate is None:
+            return events
+        return self._select(events)
+
+    def _select(self, events):
+        """Return events matching the parser predicate."""
+
+        loads = self._loads or json.loads
+        evaluate = self.predicate.evaluate
+        selected = []
+        for event in events:
+            try:
+                decoded = loads(event)
+            except (TypeError, ValueError):
+                # Events that are not valid JSON documents cannot match
+                continue
+            if isinstance(decoded, dict) and evaluate(decoded):
+                selected.append(event)
+        return selected
+
+    async def aparse(
+        self, stream, chunksize=DEFAULT_GELF_PARSER_CHUNCK_SIZE, executor=None
+    ):
+        """Parse GELF formatted logs read from an asynchronous byte stream.
+
+        Args:
+            stream: An asynchronous byte stream with a `read` coroutine (such
+                as `asyncio.StreamReader`) or an asynchronous iterable of
+                bytes chunks (could be compressed using gzip, bz2, xz or
+                zstd).
+            chunksize (int): The amount of log records to decode at a time in
+                the executor.
+            executor (Executor): The executor records are decoded in. Use a
+                process pool to decode several streams in parallel.
+
+        Yields:
+            event: events raw short_message string
+
+        """
+        logger.info("Parsing: %s (engine: %s)", stream, self.engine.name.lower())
+
+        async for event in super().aparse(stream, chunksize, executor):
+            yield event
+
+    def _decode(self, lines):
+        """Return the short_message of each GELF line."""
+
+        if self.engine == ParserEngines.PANDAS:
+            records = pd.read_json(BytesIO(b"".join(lines)), lines=True)
+            return list(records["short_message"].values)
+
+        loads = self._loads
+        if not self.fast_path or self.engine == ParserEngines.ORJSON:
+            return [loads(line)["short_message"] for line in lines]
+
+        if self.engine == ParserEngines.JSON:
+            extract = extract_short_message
+            return [extract(line) or loads(line)["short_message"] for line in lines]
+
+        decoder, validation_error = get_msgspec_short_message_decoder()
+        events = []
+        for line in lines:
+            try:
+                events.append(decoder.decode(line).short_message)
+            except validation_error:
+                events.append(loads(line)["short_message"])
+        return events
@@ -0,0 +1,328 @@
+"""
+Ralph events predicate expressions.
+
+Predicates select events using a small expression language, e.g.:
+
+    event_type startswith "problem_" and context.course_id == "course-v1:a+b+c"
+
+Comparisons (`==`, `!=`, `<`, `<=`, `>`, `>=`, `startswith`, `endswith`,
+`contains` and `in`) apply to (dotted) event field paths and JSON values (bare
+words are strings) and can be combined with `and`, `or`, `not` and
+parentheses. A comparison on a missing field is false.
+"""
+
+import json
+import logging
+import operator
+import re
+
+from .exceptions import PredicateSyntaxError
+
+logger = logging.getLogger(__name__)
+
+TOKENS = re.compile(
+    r"""\s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*")
+        |(?P<operator>==|!=|<=|>=|<|>)
+        |(?P<punctuation>[(),])
+        |(?P<word>[^\s()",=!<>]+)
+    )""",
+    re.VERBOSE,
+)
+KEYWORDS = {"and", "or", "not"}
+WORD_OPERATORS = {"startswith", "endswith", "contains", "in"}
+CONSTANTS = {"true": True, "false": False, "null": None}
+NUMBER = re.compile(r"-?\d+(\.\d+)?([eE][+-]?\d+)?$")
+
+# Literals are only used to pre-filter raw events if they have a single JSON
+# representation (no character that could be escaped by a JSON encoder)
+SAFE_LITERAL = re.compile(r"^[\x20-\x7e]+$")
+UNSAFE_LITERAL_CHARS = set('"\\/')
+
+
+def _contains(value, operand):
+    """Whether a string or a list value contains the operand."""
+
+    return isinstance(value, (str, list)) and operand in value
+
+
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "startswith": lambda value, operand: isinstance(value, str)
+    and value.startswith(operand),
+    "endswith": lambda value, operand: isinstance(value, str)
+    and value.endswith(operand),
+    "contains": _contains,
+    "in": lambda value, operand: value in operand,
+}
+
+MISSING = object()
+
+
+def _is_safe_literal(literal):
+    """Whether a literal string has a single JSON representation."""
+
+    return bool(SAFE_LITERAL.match(literal)) and not (
+        UNSAFE_LITERAL_CHARS & set(literal)
+    )
+
+
+def get_field_getter(path):
+    """Return a function getting a (nested) field value of an event.
+
+    The function returns the MISSING sentinel if the field does not exist.
+    """
+
+    if len(path) == 1:
+        key = path[0]
+        return lambda event: (
+            event.get(key, MISSING) if isinstance(event, dict) else MISSING
+        )
+
+    def getter(event):
+        for key in path:
+            if not isinstance(event, dict):
+                return MISSING
+            event = event.get(key, MISSING)
+        return event
+
+    return getter
+
+
+def compile_comparison(path, operator_name, operand):
+    """Compile a comparison into a closure evaluating it on an event."""
+
+    getter = get_field_getter(path)
+    compare = OPERATORS[operator_name]
+
+    def comparison(event):
+        value = getter(event)
+        if value is MISSING:
+            return False
+        try:
+            return compare(value, operand)
+        except TypeError:
+            return False
+
+    return comparison
+
+
+def get_comparison_literals(path, operator_name, operand):
+    """Return strings that must appear in a raw JSON event matching the
+    comparison."""
+
+    literals = set()
+    if _is_safe_literal(path[-1]):
+        literals.add(json.dumps(path[-1]))
+    if not isinstance(operand, str) or not _is_safe_literal(operand):
+        return frozenset(literals)
+
+    encoded = json.dumps(operand)
+    literal = {
+        "==": encoded,
+        "startswith": encoded[:-1],
+        "endswith": encoded[1:],
+        "contains": encoded[1:-1],
+    }.get(operator_name)
+    if literal:
+        literals.add(literal)
+    return frozenset(literals)
+
+
+class Predicate:
+    """A compiled predicate expression.
+
+    The expression is compiled once into a closure evaluating it on decoded
+    events. Calling the predicate with a batch of events returns matching
+    events (it can be used as a filter of a `ralph.filters.FilterPipeline`).
+    """
+
+    def __init__(self, expression):
+        """Compile the predicate expression.
+
+        Args:
+            expression (string): The predicate expression.
+
+        Raises:
+            PredicateSyntaxError: if the expression is not valid.
+
+        """
+
+        self.expression = expression
+        self.fields = set()
+        self._tokens = self._tokenize(expression)
+        self._position = 0
+        self.evaluate, self.literals = self._parse_or()
+        if self._position < len(self._tokens):
+            self._error("Unexpected token '%s'", self._tokens[self._position][1])
+        del self._tokens
+
+    def __getstate__(self):
+        # Closures cannot be pickled: the predicate is compiled again
+        return {"expression": self.expression}
+
+    def __setstate__(self, state):
+        self.__init__(state["expression"])
+
+    def __call__(self, events):
+        """Return events of the batch matching the predicate."""
+
+        evaluate = self.evaluate
+        return [event for event in events if evaluate(event)]
+
+    def __repr__(self):
+        return f"Predicate({self.expression!r})"
+
+    def get_raw_literals(self, depth=0):
+        """Return strings that must appear in raw events matching the
+        predicate.
+
+        Args:
+            depth (int): The number of times raw events have been encoded as
+                a JSON string (e.g. 1 for events wrapped in GELF records).
+
+        """
+
+        literals = self.literals
+        for _ in range(depth):
+            literals = frozenset(json.dumps(literal)[1:-1] for literal in literals)
+        return literals
+
+    def _error(self, msg, *args):
+        """Log and raise a syntax error."""
+
+        msg = f"Invalid predicate expression '%s': {msg}"
+        logger.error(msg, self.expression, *args)
+        raise PredicateSyntaxError(msg % (self.expression, *args))
+
+    def _tokenize(self, expression):
+        """Split the expression into (kind, value) tokens."""
+
+        tokens = []
+        position = 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = TOKENS.match(expression, position)
+            if match is None:
+                position = len(expression) - len(expression[position:].lstrip())
+                self._error("Unexpected character at position %d", position)
+            tokens.append((match.lastgroup, match.group(match.lastgroup)))
+            position = match.end()
+        return tokens
+
+    def _peek(self):
+        """Return the current token value (or None at the end)."""
+
+        if self._position < len(self._tokens):
+            return self._tokens[self._position][1]
+        return None
+
+    def _next(self):
+        """Consume and return the current token."""
+
+        if self._position >= len(self._tokens):
+            self._error("Unexpected end of expression")
+        token = self._tokens[self._position]
+        self._position += 1
+        return token
+
+    def _parse_or(self):
+        """or_expression := and_expression ("or" and_expression)*"""
+
+        operands = [self._parse_and()]
+        while self._peek() == "or":
+            self._next()
+            operands.append(self._parse_and())
+        if len(operands) == 1:
+            return operands[0]
+
+        functions = tuple(function for function, _ in operands)
+        # Literals required by all operands are required by the disjunction
+        literals = frozenset.intersection(*(literals for _, literals in operands))
+        return lambda event: any(function(event) for function in functions), literals
+
+    def _parse_and(self):
+        """and_expression := not_expression ("and" not_expression)*"""
+
+        operands = [self._parse_not()]
+        while self._peek() == "and":
+            self._next()
+            operands.append(self._parse_not())
+        if len(operands) == 1:
+            return operands[0]
+
+        functions = tuple(function for function, _ in operands)
+        literals = frozenset.union(*(literals for _, literals in operands))
+        return lambda event: all(function(event) for function in functions), literals
+
+    def _parse_not(self):
+        """not_expression := "not" not_expression | atom"""
+
+        if self._peek() == "not":
+            self._next()
+            function, _ = self._parse_not()
+            return lambda event: not function(event), frozenset()
+        return self._parse_atom()
+
+    def _parse_atom(self):
+        """atom := "(" or_expression ")" | field operator value"""
+
+        kind, value = self._next()
+        if value == "(" and kind == "punctuation":
+            atom = self._parse_or()
+            if self._next()[1] != ")":
+                self._error("Missing closing parenthesis")
+            return atom
+
+        if kind != "word" or value in KEYWORDS or NUMBER.match(value):
+            self._error("Expected a field name, got '%s'", value)
+        path = tuple(value.split("."))
+        self.fields.add(path)
+
+        kind, operator_name = self._next()
+        if operator_name not in OPERATORS or kind not in ("operator", "word"):
+            self._error("Unsupported operator '%s'", operator_name)
+
+        if operator_name == "in":
+            operand = self._parse_values()
+        else:
+            operand = self._parse_value()
+
+        return (
+            compile_comparison(path, operator_name, operand),
+            get_comparison_literals(path, operator_name, operand),
+        )
+
+    def _parse_values(self):
+        """values := "(" value ("," value)* ")" """
+
+        if self._next()[1] != "(":
+            self._error("Expected a parenthesized list of values")
+        values = [self._parse_value()]
+        while (separator := self._next()[1]) == ",":
+            values.append(self._parse_value())
+        if separator != ")":
+            self._error("Missing closing parenthesis")
+        return tuple(values)
+
+    def _parse_value(self):
+        """value := JSON string | number | true | false | null | bare word"""
+
+        kind, value = self._next()
+        if kind == "string":
+            try:
+                return json.loads(value)
+            except ValueError:
+                self._error("Invalid string %s", value)
+        if kind != "word" or value in KEYWORDS:
+            self._error("Expected a value, got '%s'", value)
+        if value in CONSTANTS:
+            return CONSTANTS[value]
+        if NUMBER.match(value):
+            return json.loads(value)
+        return value
@@ -0,0 +1,276 @@
+"""
+Ralph events routing.
+
+A router reads a stream of JSON events once and fans it out to several
+routes: each route has an optional predicate selecting its events and a sink
+backend writing them. Sinks write concurrently, each one in a thread reading
+events from a bounded queue.
+"""
+
+import json
+import logging
+import threading
+from queue import Queue
+
+import yaml
+
+from .backends import BackendTypes
+from .defaults import (
+    DEFAULT_BACKEND_CHUNCK_SIZE,
+    DEFAULT_ROUTER_BATCH_SIZE,
+    DEFAULT_ROUTER_QUEUE_SIZE,
+    DatabaseBackends,
+    StorageBackends,
+)
+from .exceptions import ConfigurationException, PredicateSyntaxError
+from .predicates import Predicate
+from .utils import get_backend_type, get_class_from_name, get_instance_from_class
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = [backend.value for backend in DatabaseBackends] + [
+    backend.value for backend in StorageBackends
+]
+# Marks the end of a queued stream
+END = None
+
+
+class QueueStream:
+    """A readable text stream of lines received by batches from a queue.
+
+    The stream can either be read by chunks (`read`) or iterated by lines.
+    """
+
+    def __init__(self, queue):
+        """Instantiate the stream reading line batches from the queue."""
+
+        self._queue = queue
+        self._buffer = ""
+        self._exhausted = False
+
+    def _get_batch(self):
+        """Return the next batch of lines (or None at the end of the stream)."""
+
+        if self._exhausted:
+            return None
+        batch = self._queue.get()
+        if batch is END:
+            self._exhausted = True
+        return batch
+
+    def __iter__(self):
+        while (batch := self._get_batch()) is not None:
+            yield from batch
+
+    def read(self, size=-1):
+        """Read at most size characters (until the end of the stream if size
+        is negative)."""
+
+        while size < 0 or len(self._buffer) < size:
+            batch = self._get_batch()
+            if batch is None:
+                break
+            self._buffer += "".join(batch)
+        if size < 0:
+            size = len(self._buffer)
+        chunk = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return chunk
+
+    def drain(self):
+        """Consume remaining batches (so that the queue never blocks writers)."""
+
+        while self._get_batch() is not None:
+            pass
+
+
+class Route:
+    """A route writing events matching a predicate to a backend."""
+
+    def __init__(self, name, backend, where=None, archive=None, **options):
+        """Instantiate the route and its backend.
+
+        Args:
+            name (string): The route name.
+            backend (string): The backend name (e.g. `es` or `fs`).
+            where (string): The predicate expression selecting events of the
+                route (see `ralph.predicates`). All events are routed if not
+                set.
+            archive (string): The archive name events are written to (storage
+                backends only).
+            **options: Backend parameters, prefixed with the backend name
+                (e.g. `es_index`) as command line options are.
+
+        Raises:
+            ConfigurationException: if the route is not valid.
+
+        """
+
+        self.name = name
+        self.archive = archive
+        self.events = 0
+
+        try:
+            self.predicate = Predicate(where) if where is not None else None
+            backend_class = get_class_from_name(backend, BACKENDS)
+        except (ImportError, PredicateSyntaxError) as error:
+            msg = "Invalid route %s: %s"
+            logger.error(msg, name, error)
+            raise ConfigurationException(msg % (name, error)) from error
+
+        self.backend_type = get_backend_type(backend_class)
+        if self.backend_type == BackendTypes.STORAGE and not archive:
+            msg = "Invalid route %s: storage backends require an archive name"
+            logger.error(msg, name)
+            raise ConfigurationException(msg % name)
+        self.backend = get_instance_from_class(backend_class, **options)
+
+    def __repr__(self):
+        return f"Route({self.name!r})"
+
+    def write(self, stream, chunk_size=DEFAULT_BACKEND_CHUNCK_SIZE, overwrite=False):
+        """Write the stream of events to the route backend."""
+
+        if self.backend_type == BackendTypes.STORAGE:
+            self.backend.write(self.archive, overwrite=overwrite, stream=stream)
+        else:
+            self.backend.put(chunk_size=chunk_size, stream=stream)
+
+
+def load_routes(path):
+    """Load routes defined in a YAML file.
+
+    Routes are defined by name in a `routes` mapping, e.g.:
+
+        routes:
+          videos:
+            where: event_type endswith _video
+            backend: es
+            es_index: videos
+          all:
+            backend: fs
+            archive: events.jsonl
+
+    Raises:
+        ConfigurationException: if routes are not valid.
+
+    """
+
+    try:
+        with open(path) as routes_file:
+            routes = yaml.safe_load(routes_file)["routes"]
+        return [Route(name, **route) for name, route in routes.items()]
+    except (AttributeError, KeyError, TypeError, yaml.YAMLError) as error:
+        msg = "Routes file %s is not valid: %s"
+        logger.error(msg, path, error)
+        raise ConfigurationException(msg % (path, error)) from error
+
+
+class Router:
+    """Route a stream of JSON events to several backends in a single pass."""
+
+    def __init__(
+        self,
+        routes,
+        chunk_size=DEFAULT_BACKEND_CHUNCK_SIZE,
+        overwrite=False,
+        batch_size=DEFAULT_ROUTER_BATCH_SIZE,
+        queue_size=DEFAULT_ROUTER_QUEUE_SIZE,
+    ):  # pylint: disable=too-many-arguments
+        """Instantiate the router.
+
+        Args:
+            routes (list): Routes to fan events out to.
+            chunk_size (int): The amount of events written at a time to
+                database backends.
+            overwrite (boolean): Overwrite existing archives of storage
+                backends.
+            batch_size (int): The amount of events sent at a time to sinks.
+            queue_size (int): The maximum amount of pending batches per sink
+                (the router waits for slower sinks).
+
+        """
+
+        self.routes = routes
+        self.chunk_size = chunk_size
+        self.overwrite = overwrite
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+
+    def _sink(self, route, stream, errors):
+        """Write the route stream to its backend (sink thread)."""
+
+        try:
+            route.write(stream, chunk_size=self.chunk_size, overwrite=self.overwrite)
+        except Exception as error:  # pylint: disable=broad-except
+            logger.exception("Route %s failed", route.name)
+            errors[route.name] = error
+        finally:
+            stream.drain()
+
+    def _dispatch(self, events, routes):
+        """Append each event to the batches of the routes selecting it."""
+
+        decode = any(evaluate is not None for _, evaluate, _, _ in routes)
+        for line in events:
+            if not line or line.isspace():
+                continue
+            line = line.rstrip("\n") + "\n"
+            event = json.loads(line) if decode else None
+            if not isinstance(event, dict):
+                event = None
+            for route, evaluate, queue, batch in routes:
+                if evaluate is not None and (event is None or not evaluate(event)):
+                    continue
+                batch.append(line)
+                route.events += 1
+                if len(batch) >= self.batch_size:
+                    queue.put(batch[:])
+                    batch.clear()
+
+    def route(self, events):
+        """Route a stream of raw JSON events.
+
+        Events are decoded once (if a route has a predicate) and each route
+        predicate is evaluated once per event.
+
+        Args:
+            events (iterable): Raw JSON events (lines).
+
+        Raises:
+            Exception: The error of the first failed route (once all sinks
+                ended).
+
+        """
+
+        queues = [Queue(maxsize=self.queue_size) for _ in self.routes]
+        errors = {}
+        threads = [
+            threading.Thread(
+                target=self._sink,
+                args=(route, QueueStream(queue), errors),
+                name=f"ralph-route-{route.name}",
+            )
+            for route, queue in zip(self.routes, queues)
+        ]
+        for thread in threads:
+            thread.start()
+
+        routes = [
+            (route, route.predicate.evaluate if route.predicate else None, queue, [])
+            for route, queue in zip(self.routes, queues)
+        ]
+        try:
+            self._dispatch(events, routes)
+        finally:
+            for _, _, queue, batch in routes:
+                if batch:
+                    queue.put(batch)
+                queue.put(END)
+            for thread in threads:
+                thread.join()
+
+        for route in self.routes:
+            if route.name in errors:
+                raise errors[route.name]
+        return {route.name: route.events for route in self.routes}
@@ -0,0 +1,156 @@
+"""
+Ralph events sampling.
+
+Samplers select a representative subset of an (unbounded) events stream in
+constant memory:
+
+* `HashSampler` keeps a fraction of events depending on the hash of an event
+  field, so that events sharing the same field value (e.g. the same learner)
+  are all kept or all dropped, whatever the stream they belong to.
+* `ReservoirSampler` keeps a fixed-size uniform random sample of a stream.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import random
+from itertools import islice
+
+from .defaults import DEFAULT_SAMPLING_KEY
+from .predicates import MISSING, get_field_getter
+
+logger = logging.getLogger(__name__)
+
+# Hash values are mapped to [0, 1) using their first 8 bytes
+HASH_SIZE = 8
+HASH_RANGE = 2 ** (HASH_SIZE * 8)
+
+
+class HashSampler:
+    """Deterministic sampling keyed on an event field hash.
+
+    Calling the sampler with a batch of decoded events returns kept events (it
+    can be used as a filter of a `ralph.filters.FilterPipeline`). An event is
+    kept if the hash of its key field value (salted with the seed) falls into
+    the sampling rate, events missing the key field are hashed as a null
+    value.
+    """
+
+    def __init__(self, rate, key=DEFAULT_SAMPLING_KEY, seed=""):
+        """Instantiate the sampler.
+
+        Args:
+            rate (float): The fraction of key values to keep (between 0 and 1).
+            key (string): The (dotted) path of the event field to hash.
+            seed (string): Change the seed to sample another subset of key
+                values.
+
+        Raises:
+            ValueError: if the rate is not between 0 and 1.
+
+        """
+
+        if not 0 <= rate <= 1:
+            msg = "Sampling rate should be between 0 and 1, not %s"
+            logger.error(msg, rate)
+            raise ValueError(msg % rate)
+
+        self.rate = rate
+        self.key = key
+        self.seed = seed
+        self._threshold = int(rate * HASH_RANGE)
+        self._getter = get_field_getter(tuple(key.split(".")))
+        self._salt = hashlib.blake2b(seed.encode(), digest_size=16).digest()
+
+    def __getstate__(self):
+        # The field getter closure cannot be pickled
+        return {"rate": self.rate, "key": self.key, "seed": self.seed}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __call__(self, events):
+        """Return events of the batch that are part of the sample."""
+
+        return [event for event in events if self.keeps(event)]
+
+    def keeps(self, event):
+        """Whether the decoded event is part of the sample."""
+
+        value = self._getter(event)
+        return self.hash(None if value is MISSING else value) < self._threshold
+
+    def hash(self, value):
+        """Return the integer hash of a key value in [0, HASH_RANGE)."""
+
+        digest = hashlib.blake2b(
+            json.dumps(value, sort_keys=True).encode(),
+            digest_size=HASH_SIZE,
+            salt=self._salt,
+        ).digest()
+        return int.from_bytes(digest, "big")
+
+
+class ReservoirSampler:
+    """Fixed-size uniform random sampling of a stream.
+
+    The reservoir is filled using Li's "Algorithm L": the number of events to
+    skip before the next replacement is drawn at random, so that the cost is
+    proportional to the sample size (not the stream length) apart from
+    iterating over the stream. Events are not decoded.
+    """
+
+    def __init__(self, size, seed=None):
+        """Instantiate the sampler.
+
+        Args:
+            size (int): The number of events to sample.
+            seed: The random generator seed (same seed and stream, same
+                sample).
+
+        Raises:
+            ValueError: if the size is not positive.
+
+        """
+
+        if size < 1:
+            msg = "Reservoir size should be positive, not %s"
+            logger.error(msg, size)
+            raise ValueError(msg % size)
+
+        self.size = size
+        self.seed = seed
+
+    def __call__(self, events):
+        """Yield sampled events once the events stream is exhausted."""
+
+        yield from self.sample(events)
+
+    def sample(self, events):
+        """Return a list of sampled events (in no particular order)."""
+
+        # Sampling is not cryptographic and should be reproducible given a seed
+        rng = random.Random(self.seed)  # nosec
+        events = iter(events)
+        reservoir = list(islice(events, self.size))
+        if len(reservoir) < self.size:
+            return reservoir
+
+        weight = math.exp(math.log(self._uniform(rng)) / self.size)
+        while True:
+            skip = math.floor(math.log(self._uniform(rng)) / math.log1p(-weight))
+            event = next(islice(events, skip, None), MISSING)
+            if event is MISSING:
+                return reservoir
+            reservoir[rng.randrange(self.size)] = event
+            weight *= math.exp(math.log(self._uniform(rng)) / self.size)
+
+    @staticmethod
+    def _uniform(rng):
+        """Return a random float in the (0, 1) open interval."""
+
+        while True:
+            value = rng.random()
+            if value:
+                return value
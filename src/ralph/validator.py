@@ -0,0 +1,275 @@
+"""
+Ralph events schema validation.
+
+Event schemas map (dotted) field paths to value specifications:
+
+* a type (or a tuple of types) the value should be an instance of,
+* a set of allowed values,
+* `JSONString(schema)`: an object (or a JSON string encoding it) matching a
+  nested schema,
+* `optional(spec)`: the field may be missing or null.
+
+Schemas are compiled once per event type into a validation closure.
+"""
+
+import json
+import logging
+import time
+from collections import defaultdict
+
+from .predicates import MISSING, get_field_getter
+
+logger = logging.getLogger(__name__)
+
+
+class OptionalField:
+    """Specification of a field that may be missing or null."""
+
+    def __init__(self, spec):
+        self.spec = spec
+
+
+def optional(spec):
+    """Mark a field specification as optional."""
+
+    return OptionalField(spec)
+
+
+class JSONString:
+    """Specification of an object (possibly encoded as a JSON string) matching
+    a nested schema."""
+
+    def __init__(self, schema):
+        self.schema = schema
+
+
+NUMBER = (int, float)
+
+UNKNOWN_EVENT_TYPE = "<unknown>"
+
+BASE_SCHEMA = {
+    "username": str,
+    "event_type": str,
+    "event_source": {"browser", "server", "mobile"},
+    "time": str,
+    "context": dict,
+    "event": (str, dict),
+    "ip": optional(str),
+    "agent": optional(str),
+    "host": optional(str),
+    "page": optional(str),
+    "session": optional(str),
+}
+
+VIDEO_SCHEMA = {
+    "event_source": {"browser", "mobile"},
+    "event": JSONString({"id": str, "code": optional(str)}),
+}
+
+EVENT_SCHEMAS = {
+    "page_close": {"event_source": {"browser"}, "page": str},
+    "play_video": {
+        **VIDEO_SCHEMA,
+        "event": JSONString({"id": str, "currentTime": optional(NUMBER)}),
+    },
+    "pause_video": {
+        **VIDEO_SCHEMA,
+        "event": JSONString({"id": str, "currentTime": optional(NUMBER)}),
+    },
+    "stop_video": {
+        **VIDEO_SCHEMA,
+        "event": JSONString({"id": str, "currentTime": optional(NUMBER)}),
+    },
+    "seek_video": {
+        **VIDEO_SCHEMA,
+        "event": JSONString(
+            {"id": str, "old_time": NUMBER, "new_time": NUMBER, "type": optional(str)}
+        ),
+    },
+    "problem_check": {
+        "event_source": {"server"},
+        "context.course_id": str,
+        "event": JSONString(
+            {
+                "problem_id": str,
+                "grade": optional(NUMBER),
+                "max_grade": optional(NUMBER),
+                "success": optional({"correct", "incorrect"}),
+            }
+        ),
+    },
+    "edx.course.enrollment.activated": {
+        "event_source": {"server"},
+        "event": JSONString({"course_id": str, "user_id": optional(int)}),
+    },
+}
+
+
+def compile_value(path, spec):
+    """Compile a value specification into a function returning an error
+    message for invalid values (or None)."""
+
+    if isinstance(spec, JSONString):
+        validate = compile_schema(spec.schema, prefix=f"{path}.")
+
+        def check_object(value):
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    return f"{path} should be a JSON string"
+            if not isinstance(value, dict):
+                return f"{path} should be an object"
+            return validate(value)
+
+        return check_object
+
+    if isinstance(spec, (set, frozenset)):
+        allowed = frozenset(spec)
+        message = f"{path} should be one of {', '.join(sorted(map(str, allowed)))}"
+        return lambda value: None if value in allowed else message
+
+    types = spec if isinstance(spec, tuple) else (spec,)
+    message = (
+        f"{path} should be of type {' or '.join(type_.__name__ for type_ in types)}"
+    )
+    return lambda value: None if isinstance(value, types) else message
+
+
+def compile_field(path, spec, prefix=""):
+    """Compile a field specification into a function returning an error
+    message for invalid events (or None)."""
+
+    getter = get_field_getter(tuple(path.split(".")))
+    is_optional = isinstance(spec, OptionalField)
+    check_value = compile_value(f"{prefix}{path}", spec.spec if is_optional else spec)
+    missing = f"{prefix}{path} is missing"
+
+    def check(event):
+        value = getter(event)
+        if value is MISSING or (value is None and is_optional):
+            return None if is_optional else missing
+        return check_value(value)
+
+    return check
+
+
+def compile_schema(schema, prefix=""):
+    """Compile a schema into a function returning the first error message of
+    invalid events (or None)."""
+
+    checks = tuple(compile_field(path, spec, prefix) for path, spec in schema.items())
+
+    def validate(event):
+        for check in checks:
+            error = check(event)
+            if error is not None:
+                return error
+        return None
+
+    return validate
+
+
+def reject_unknown_event_type(event):
+    """Return the error message of events of an unknown type (strict mode)."""
+
+    return f"Unknown event type {event.get('event_type')}"
+
+
+class Validator:
+    """Validate batches of raw JSON events against event type schemas.
+
+    Validators are compiled once per event type (the base schema merged with
+    the event type schema) and cached. Events of unknown types share a single
+    validator and are recorded under the `UNKNOWN_EVENT_TYPE` key. Per event
+    type counts of valid and invalid events and validation durations are
+    recorded in `stats`.
+    """
+
+    def __init__(self, schemas=None, base_schema=None, strict=False):
+        """Instantiate the validator.
+
+        Args:
+            schemas (dict): Schemas by event type (`EVENT_SCHEMAS` by
+                default).
+            base_schema (dict): Schema of all events (`BASE_SCHEMA` by
+                default).
+            strict (boolean): Consider events of an unknown type invalid
+                (they are validated against the base schema otherwise).
+
+        """
+
+        self.schemas = EVENT_SCHEMAS if schemas is None else schemas
+        self.base_schema = BASE_SCHEMA if base_schema is None else base_schema
+        self.strict = strict
+        self.stats = defaultdict(lambda: {"valid": 0, "invalid": 0, "duration": 0.0})
+        self._validators = {}
+
+    def get_validator(self, event_type):
+        """Return the compiled validator of an event type (cached)."""
+
+        if event_type not in self.schemas:
+            event_type = UNKNOWN_EVENT_TYPE
+        validator = self._validators.get(event_type)
+        if validator is not None:
+            return validator
+
+        if event_type != UNKNOWN_EVENT_TYPE:
+            validator = compile_schema({**self.base_schema, **self.schemas[event_type]})
+        elif self.strict:
+            validator = reject_unknown_event_type
+        else:
+            validator = compile_schema(self.base_schema)
+        self._validators[event_type] = validator
+        return validator
+
+    def validate_batch(self, events):
+        """Validate a batch of raw JSON events.
+
+        Events are grouped by event type to be validated by the same compiled
+        validator at once.
+
+        Returns:
+            A tuple of the list of valid raw events and the list of
+            (raw event, error message) tuples of invalid events (both in
+            input order).
+
+        """
+
+        errors = [None] * len(events)
+        groups = defaultdict(list)
+        for idx, raw_event in enumerate(events):
+            try:
+                event = json.loads(raw_event)
+            except ValueError:
+                event = None
+            if not isinstance(event, dict):
+                errors[idx] = "Event should be a JSON object"
+                self.stats[None]["invalid"] += 1
+                continue
+            event_type = event.get("event_type")
+            if not isinstance(event_type, str) or event_type not in self.schemas:
+                event_type = UNKNOWN_EVENT_TYPE
+            groups[event_type].append((idx, event))
+
+        for event_type, group in groups.items():
+            start = time.perf_counter()
+            validate = self.get_validator(event_type)
+            invalid = 0
+            for idx, event in group:
+                error = validate(event)
+                if error is not None:
+                    errors[idx] = error
+                    invalid += 1
+            stats = self.stats[event_type]
+            stats["duration"] += time.perf_counter() - start
+            stats["valid"] += len(group) - invalid
+            stats["invalid"] += invalid
+
+        valid, invalid = [], []
+        for raw_event, error in zip(events, errors):
+            if error is None:
+                valid.append(raw_event)
+            else:
+                invalid.append((raw_event, error))
+        return valid, invalid
@@ -11,16 +11,29 @@ def test_abstract_interface_with_implemented_abstract_method():
 
         name = "good"
 
-        def list(self, details=False, new=False):
+        def list(  # pylint: disable=too-many-arguments
+            self,
+            details=False,
+            new=False,
+            prefix=None,
+            pattern=None,
+            limit=None,
+            offset=0,
+            since=None,
+            until=None,
+            sort=None,
+        ):
             """Fake list"""
 
         def url(self, name):
             """Fake url"""
 
-        def read(self, name, chunk_size=0):
+        def read(  # pylint: disable=too-many-arguments
+            self, name, chunk_size=4096, decompress=False, offset=0, length=None
+        ):
             """Fake read"""
 
-        def write(self, name, chunk_size=4096, overwrite=False):
+        def write(self, name, chunk_size=4096, overwrite=False, stream=None):
             """Fake write"""
 
     GoodStorage()
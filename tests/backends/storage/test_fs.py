@@ -1,12 +1,19 @@
 """Tests for Ralph fs storage backend"""
 
+import datetime
+import errno
+import gzip
+import io
+import os
 from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import pytest
 
-from ralph.backends.storage.fs import FSStorage
+from ralph.backends.storage.fs import FSStorage, copy_file, sendfile
 from ralph.defaults import APP_DIR, FS_STORAGE_DEFAULT_PATH
+from ralph.exceptions import BackendParameterException, ConfigurationException
 
 
 # pylint: disable=invalid-name
@@ -108,3 +115,262 @@ def test_fs_list(fs):
         for archive in detail_list
     )
     assert len(simple_list) == 2
+
+
+# pylint: disable=invalid-name
+# pylint: disable=unused-argument
+def test_fs_list_filters(fs):
+    """Test archives listing in FSStorage with filters and pagination"""
+
+    fs.create_dir(APP_DIR)
+
+    path = "test_fs/"
+    storage = FSStorage(path)
+
+    names = ["b.gz", "a.gz", "c.log", "d.gz"]
+    for idx, name in enumerate(names):
+        fs.create_file(path + name, contents="x" * (idx + 1))
+        os.utime(path + name, (0, 86400 * (idx + 1)))
+    fs.create_dir(path + "e.gz")
+
+    assert sorted(storage.list()) == ["a.gz", "b.gz", "c.log", "d.gz"]
+    assert list(storage.list(sort="name")) == ["a.gz", "b.gz", "c.log", "d.gz"]
+    assert list(storage.list(sort="-size")) == ["d.gz", "c.log", "a.gz", "b.gz"]
+    assert list(storage.list(sort="modified", limit=2)) == ["b.gz", "a.gz"]
+    assert list(storage.list(sort="modified", offset=3, limit=2)) == ["d.gz"]
+    assert list(storage.list(sort="name", pattern="*.gz", offset=1)) == [
+        "b.gz",
+        "d.gz",
+    ]
+    assert list(storage.list(prefix="c")) == ["c.log"]
+    assert not list(storage.list(limit=0))
+
+    since = datetime.datetime(1970, 1, 2, 12)
+    until = datetime.datetime(1970, 1, 4, tzinfo=datetime.timezone.utc)
+    assert sorted(storage.list(since=since)) == ["a.gz", "c.log", "d.gz"]
+    assert sorted(storage.list(since=since, until=until)) == ["a.gz", "c.log"]
+    assert list(storage.list(details=True, prefix="a")) == [
+        {
+            "filename": "a.gz",
+            "size": 2,
+            "modified_at": "1970-01-03T00:00:00+00:00",
+        }
+    ]
+
+    # Fetched archives are not new anymore
+    storage.read("a.gz")
+    assert sorted(storage.list(new=True, pattern="*.gz")) == ["b.gz", "d.gz"]
+
+
+def test_fs_read(fs, capsysbinary):
+    """Test archive reading in FSStorage with or without decompression"""
+
+    fs.create_dir(APP_DIR)
+
+    path = "test_fs/"
+    storage = FSStorage(path)
+
+    content = b'{"foo": "bar"}\n' * 10
+    compressed = gzip.compress(content)
+    fs.create_file(path + "archive.gz", contents=compressed)
+
+    storage.read("archive.gz", chunk_size=5)
+    assert capsysbinary.readouterr().out == compressed
+
+    storage.read("archive.gz", chunk_size=5, decompress=True)
+    assert capsysbinary.readouterr().out == content
+
+    # Uncompressed archives are left untouched
+    fs.create_file(path + "archive", contents=content)
+    storage.read("archive", decompress=True)
+    assert capsysbinary.readouterr().out == content
+
+
+def test_fs_read_range(fs, capsysbinary):
+    """Test reading a range of an archive in FSStorage"""
+
+    fs.create_dir(APP_DIR)
+
+    path = "test_fs/"
+    storage = FSStorage(path)
+    content = bytes(range(256)) * 10
+    fs.create_file(path + "archive", contents=content)
+
+    storage.read("archive", offset=10, length=20)
+    assert capsysbinary.readouterr().out == content[10:30]
+    storage.read("archive", offset=2500)
+    assert capsysbinary.readouterr().out == content[2500:]
+    storage.read("archive", offset=2550, length=20)
+    assert capsysbinary.readouterr().out == content[2550:]
+    storage.read("archive", length=0)
+    assert capsysbinary.readouterr().out == b""
+
+    # Partial reads are not recorded in the history
+    assert not storage.history
+
+    with pytest.raises(BackendParameterException, match="Cannot decompress a range"):
+        storage.read("archive", decompress=True, length=10)
+    with pytest.raises(BackendParameterException, match="Invalid archive range"):
+        storage.read("archive", offset=-1)
+
+
+def test_fs_write(fs):
+    """Test archives writing in FSStorage"""
+
+    fs.create_dir(APP_DIR)
+
+    path = "test_fs/"
+    storage = FSStorage(path)
+
+    # Binary content is written untouched
+    content = gzip.compress(b'{"foo": "bar"}\n' * 10)
+    storage.write("archive.gz", chunk_size=5, stream=io.BytesIO(content))
+    assert Path(path, "archive.gz").read_bytes() == content
+
+    # Text streams are UTF-8 encoded
+    storage.write("archive", stream=io.StringIO("café\n"))
+    assert Path(path, "archive").read_bytes() == "café\n".encode()
+
+    with pytest.raises(FileExistsError, match="overwrite is not allowed"):
+        storage.write("archive", stream=io.StringIO("foo"))
+    storage.write("archive", overwrite=True, stream=io.StringIO("foo"))
+    assert Path(path, "archive").read_text() == "foo"
+
+    assert sorted(storage.list()) == ["archive", "archive.gz"]
+    assert [entry["id"] for entry in storage.history] == [
+        "archive.gz",
+        "archive",
+        "archive",
+    ]
+
+
+def test_fs_write_without_hard_links(fs, monkeypatch):
+    """Test archives are written on file systems not supporting hard links"""
+
+    fs.create_dir(APP_DIR)
+
+    def mock_link(source, destination):
+        """Mock hard links failing on an unsupported file system"""
+        raise OSError(errno.EPERM, "Operation not permitted")
+
+    monkeypatch.setattr(os, "link", mock_link)
+    path = "test_fs/"
+    storage = FSStorage(path)
+
+    storage.write("archive", stream=io.BytesIO(b"foo"))
+    assert Path(path, "archive").read_bytes() == b"foo"
+    assert not [name for name in os.listdir(path) if name.endswith(".tmp")]
+
+    with pytest.raises(FileExistsError, match="overwrite is not allowed"):
+        storage.write("archive", stream=io.BytesIO(b"bar"))
+    assert Path(path, "archive").read_bytes() == b"foo"
+    assert os.listdir(path) == ["archive"]
+
+
+def test_fs_write_interrupted(fs):
+    """Test interrupted writes leave no partial archive"""
+
+    fs.create_dir(APP_DIR)
+
+    path = "test_fs/"
+    storage = FSStorage(path)
+
+    class InterruptedStream(io.BytesIO):
+        """A stream interrupted after its first chunk"""
+
+        def read(self, size=-1):
+            if self.tell():
+                raise KeyboardInterrupt
+            return super().read(10)
+
+    with pytest.raises(KeyboardInterrupt):
+        storage.write("archive", stream=InterruptedStream(b"foo" * 10))
+
+    assert not list(Path(path).iterdir())
+    assert not storage.history
+
+    # Temporary files of writes in progress are not listed
+    fs.create_file(path + ".archive.123.tmp", contents="foo")
+    assert not list(storage.list())
+
+
+def test_fs_write_fsync(fs, monkeypatch):
+    """Test written archives are synced depending on the fsync policy"""
+
+    fs.create_dir(APP_DIR)
+    synced = []
+    monkeypatch.setattr(os, "fsync", synced.append)
+
+    for fsync, expected in (("none", 0), ("file", 1), ("full", 2)):
+        synced.clear()
+        FSStorage("test_fs/", fsync=fsync).write(fsync, stream=io.BytesIO(b"foo"))
+        assert len(synced) == expected
+        assert Path("test_fs", fsync).read_bytes() == b"foo"
+
+    with pytest.raises(ConfigurationException, match="Invalid fsync policy foo"):
+        FSStorage("test_fs/", fsync="foo")
+
+
+def test_fs_copy_file(tmp_path):
+    """Test archives are copied with sendfile to files and pipes"""
+
+    content = os.urandom(3 * 1024 ** 2 + 7)
+    archive = tmp_path / "archive"
+    archive.write_bytes(content)
+
+    output = tmp_path / "output"
+    with archive.open("rb") as file, output.open("wb") as stream:
+        stream.write(b"header")
+        file.read(7)
+        assert sendfile(file, stream)
+        assert file.read() == b""
+    assert output.read_bytes() == b"header" + content[7:]
+
+    read_fd, write_fd = os.pipe()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with open(read_fd, "rb") as pipe:
+            piped = executor.submit(pipe.read)
+            with archive.open("rb") as file, open(write_fd, "wb") as stream:
+                copy_file(file, stream)
+            assert piped.result() == content
+
+    # Streams without file descriptor fall back to buffered copies
+    stream = io.BytesIO()
+    with archive.open("rb") as file:
+        assert not sendfile(file, stream)
+        copy_file(file, stream, buffer_size=1000)
+    assert stream.getvalue() == content
+
+    # Ranges of files can be copied
+    end = 10 + 2 * 1024 ** 2
+    for buffer_size in (1000, 10 ** 7):
+        stream = io.BytesIO()
+        with archive.open("rb") as file:
+            file.seek(10)
+            copy_file(file, stream, buffer_size=buffer_size, length=end - 10)
+            assert file.tell() == end
+        assert stream.getvalue() == content[10:end]
+
+    with archive.open("rb") as file, output.open("wb") as stream:
+        assert sendfile(file, stream, length=1000)
+    assert output.read_bytes() == content[:1000]
+
+
+def test_fs_copy_file_sendfile_unsupported(tmp_path, monkeypatch):
+    """Test the copy falls back to buffered copies if sendfile fails"""
+
+    content = b"foo" * 1000
+    archive = tmp_path / "archive"
+    archive.write_bytes(content)
+
+    def mock_sendfile(out_fd, in_fd, offset, count):
+        """Mock sendfile copying a few bytes before failing"""
+        if offset:
+            raise OSError(errno.EINVAL, "Invalid argument")
+        return os.write(out_fd, content[:10])
+
+    monkeypatch.setattr(os, "sendfile", mock_sendfile)
+    output = tmp_path / "output"
+    with archive.open("rb") as file, output.open("wb") as stream:
+        copy_file(file, stream)
+    assert output.read_bytes() == content
@@ -192,6 +192,13 @@ def test_list_method(monkeypatch):
         "72e82041-7245-4ef1-b876-01964c6a8c50",
     ]
 
+    # Modification dates filters and sorting are not supported
+    with pytest.raises(
+        BackendParameterException,
+        match="The ldp backend does not support the sort filter",
+    ):
+        list(storage.list(sort="name"))
+
 
 def test_list_method_history_management(monkeypatch, fs):
     """Test the LDPStorage list method with an history"""
@@ -357,12 +364,15 @@ def test_read_method(monkeypatch, fs):
             "retrievalDelay": 0,
             "retrievalState": "sealed",
             "sha256": "645d8e21e6fdb8aa7ffc507acf091ada39dbdc9ce612d06df8dcf67cb29a45ca",
-            "size": 67906662,
+            "size": archive_path.stat().st_size,
         }
 
     class MockRequestsResponse:
         """A basic mock for a requests response"""
 
+        status_code = 200
+        headers = {}
+
         def __enter__(self):
             return self
 
@@ -380,10 +390,11 @@ def test_read_method(monkeypatch, fs):
         def raise_for_status(self):
             """Do nothing for now"""
 
-    def mock_requests_get(url, stream=True):
+    def mock_requests_get(url, stream=True, headers=None, timeout=None):
         """Mock requests get requests"""
         # pylint: disable=unused-argument
 
+        assert timeout == (10, 60)
         return MockRequestsResponse()
 
     # Freeze the datetime.datetime.now() value
@@ -435,7 +446,7 @@ def test_read_method(monkeypatch, fs):
             "command": "fetch",
             "id": "5d5c4c93-04a4-42c5-9860-f51fa4044aa1",
             "filename": "2020-06-16.gz",
-            "size": 67906662,
+            "size": archive_path.stat().st_size,
             "fetched_at": freezed_now.isoformat(),
         }
     ]
@@ -445,6 +456,264 @@ def test_read_method(monkeypatch, fs):
         assert json.loads(output.read()) == archive_content
 
 
+def test_read_method_resumes_interrupted_downloads(monkeypatch, fs):
+    """Test the LDPStorage read method resumes interrupted downloads"""
+    # pylint: disable=invalid-name
+
+    data = os.urandom(1000).hex().encode()
+    content = gzip.compress(data)
+    requests_headers = []
+
+    class MockRequestsResponse:
+        """A response interrupted after 100 bytes (honoring range requests)"""
+
+        def __init__(self, headers):
+            self.start = 0
+            self.end = len(content)
+            self.status_code = 200
+            if headers and headers["Range"] != "bytes=50-79":
+                self.status_code = 206
+                start, end = headers["Range"].replace("bytes=", "").split("-")
+                self.start = int(start)
+                self.end = int(end) + 1 if end else len(content)
+            self.headers = {"Content-Length": str(self.end - self.start)}
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+        def iter_content(self, chunk_size):
+            """Yield content chunks and fail after 100 bytes"""
+
+            for start in range(self.start, self.end, chunk_size):
+                if start >= self.start + 100:
+                    raise requests.exceptions.ChunkedEncodingError("Broken")
+                end = min(start + chunk_size, self.end)
+                yield content[start:end]
+
+        def raise_for_status(self):
+            """Do nothing for now"""
+
+    def mock_requests_get(url, stream=True, headers=None, timeout=None):
+        """Mock requests get requests"""
+        # pylint: disable=unused-argument
+
+        requests_headers.append(headers)
+        return MockRequestsResponse(headers)
+
+    class MockStdout:
+        """A simple mock for sys.stdout.buffer"""
+
+        buffer = BytesIO()
+
+    storage = LDPStorage(
+        endpoint="ovh-eu",
+        application_key="fake_key",
+        application_secret="fake_secret",
+        consumer_key="another_fake_key",
+        service_name="ldp_fake",
+        stream_id="bbf2d9fb-b092-4003-958b-1262dc902a1c",
+    )
+    monkeypatch.setattr(storage, "url", lambda name: "https://example.org/archive")
+    monkeypatch.setattr(storage, "_details", lambda name: {"filename": name})
+    monkeypatch.setattr(requests, "get", mock_requests_get)
+    monkeypatch.setattr(sys, "stdout", MockStdout)
+    monkeypatch.setattr("time.sleep", lambda delay: None)
+    fs.create_dir(str(APP_DIR))
+
+    # Downloads are resumed from the last streamed byte
+    storage.read(name="archive", chunk_size=30, decompress=True)
+    assert MockStdout.buffer.getvalue() == data
+    assert requests_headers[:3] == [
+        None,
+        {"Range": f"bytes=120-{len(content) - 1}"},
+        {"Range": f"bytes=240-{len(content) - 1}"},
+    ]
+    assert len(requests_headers) == -(-len(content) // 120)
+    assert [entry["id"] for entry in storage.history] == ["archive"]
+
+    # Ranges of archives can be read (without being recorded in the history)
+    MockStdout.buffer = BytesIO()
+    requests_headers.clear()
+    storage.read(name="archive", chunk_size=30, offset=10, length=200)
+    assert MockStdout.buffer.getvalue() == content[10:210]
+    assert requests_headers == [{"Range": "bytes=10-209"}, {"Range": "bytes=130-209"}]
+    assert len(storage.history) == 1
+
+    # Servers may ignore range requests
+    MockStdout.buffer = BytesIO()
+    storage.read(name="archive", chunk_size=30, offset=50, length=30)
+    assert MockStdout.buffer.getvalue() == content[50:80]
+
+    with pytest.raises(BackendParameterException, match="Cannot decompress a range"):
+        storage.read(name="archive", decompress=True, offset=10)
+
+    # Downloads are aborted after too many failures in a row
+    def mock_failing_requests_get(url, stream=True, headers=None, timeout=None):
+        """Mock failing requests get requests"""
+        # pylint: disable=unused-argument
+
+        raise requests.exceptions.ConnectionError("Connection refused")
+
+    monkeypatch.setattr(requests, "get", mock_failing_requests_get)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        storage.read(name="archive")
+
+
+def test_read_method_resumes_short_downloads(monkeypatch, fs):
+    """Test the LDPStorage read method resumes downloads closed early"""
+    # pylint: disable=invalid-name,unused-argument
+
+    content = gzip.compress(os.urandom(500))
+    requests_options = []
+
+    class MockRequestsResponse:
+        """A response closed without error after 100 bytes"""
+
+        status_code = 206
+
+        def __init__(self, headers):
+            start, end = headers["Range"].replace("bytes=", "").split("-")
+            self.start = int(start)
+            self.end = int(end) + 1
+            self.headers = {"Content-Length": str(self.end - self.start)}
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+        def iter_content(self, chunk_size):
+            """Yield at most 100 content bytes"""
+
+            start, stop = self.start, min(self.start + 100, self.end)
+            yield content[start:stop]
+
+        def raise_for_status(self):
+            """Do nothing for now"""
+
+    def mock_requests_get(url, stream=True, headers=None, timeout=None):
+        """Mock requests get requests"""
+
+        requests_options.append((headers, timeout))
+        return MockRequestsResponse(headers)
+
+    class MockStdout:
+        """A simple mock for sys.stdout.buffer"""
+
+        buffer = BytesIO()
+
+    storage = LDPStorage(
+        endpoint="ovh-eu",
+        application_key="fake_key",
+        application_secret="fake_secret",
+        consumer_key="another_fake_key",
+        service_name="ldp_fake",
+        stream_id="bbf2d9fb-b092-4003-958b-1262dc902a1c",
+    )
+    monkeypatch.setattr(storage, "url", lambda name: "https://example.org/archive")
+    monkeypatch.setattr(
+        storage, "_details", lambda name: {"filename": name, "size": len(content)}
+    )
+    monkeypatch.setattr(requests, "get", mock_requests_get)
+    monkeypatch.setattr(sys, "stdout", MockStdout)
+    monkeypatch.setattr("time.sleep", lambda delay: None)
+    fs.create_dir(str(APP_DIR))
+
+    # Delivered bytes are compared to the archive size
+    storage.read(name="archive", chunk_size=30)
+    assert MockStdout.buffer.getvalue() == content
+    assert requests_options[:2] == [
+        ({"Range": f"bytes=0-{len(content) - 1}"}, (10, 60)),
+        ({"Range": f"bytes=100-{len(content) - 1}"}, (10, 60)),
+    ]
+    assert len(requests_options) == -(-len(content) // 100)
+    assert [entry["size"] for entry in storage.history] == [len(content)]
+
+
+def test_read_method_retries_server_errors(monkeypatch, fs):
+    """Test the LDPStorage read method retries server errors"""
+    # pylint: disable=invalid-name,unused-argument
+
+    content = gzip.compress(os.urandom(100))
+    status_codes = []
+
+    class MockRequestsResponse:
+        """A response with a status code (the whole content if successful)"""
+
+        def __init__(self, status_code):
+            self.status_code = status_code
+            self.headers = {"Content-Length": str(len(content))}
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+        def iter_content(self, chunk_size):
+            """Yield the whole content"""
+            # pylint: disable=no-self-use
+
+            yield content
+
+        def raise_for_status(self):
+            """Raise an HTTPError for error responses"""
+
+            if self.status_code >= 400:
+                raise requests.exceptions.HTTPError(
+                    f"{self.status_code} Error", response=self
+                )
+
+    def mock_requests_get(url, stream=True, headers=None, timeout=None):
+        """Mock requests get requests responding with queued status codes"""
+
+        return MockRequestsResponse(status_codes.pop(0))
+
+    class MockStdout:
+        """A simple mock for sys.stdout.buffer"""
+
+        buffer = BytesIO()
+
+    storage = LDPStorage(
+        endpoint="ovh-eu",
+        application_key="fake_key",
+        application_secret="fake_secret",
+        consumer_key="another_fake_key",
+        service_name="ldp_fake",
+        stream_id="bbf2d9fb-b092-4003-958b-1262dc902a1c",
+    )
+    monkeypatch.setattr(storage, "url", lambda name: "https://example.org/archive")
+    monkeypatch.setattr(
+        storage, "_details", lambda name: {"filename": name, "size": len(content)}
+    )
+    monkeypatch.setattr(requests, "get", mock_requests_get)
+    monkeypatch.setattr(sys, "stdout", MockStdout)
+    monkeypatch.setattr("time.sleep", lambda delay: None)
+    fs.create_dir(str(APP_DIR))
+
+    # Server errors are retried
+    status_codes.extend([503, 206])
+    storage.read(name="archive")
+    assert MockStdout.buffer.getvalue() == content
+    assert not status_codes
+
+    # Client errors are not
+    status_codes.extend([404, 206])
+    with pytest.raises(requests.exceptions.HTTPError, match="404 Error"):
+        storage.read(name="archive")
+    assert status_codes == [206]
+
+    # Server errors abort the download after too many failures in a row
+    status_codes[:] = [503] * 7
+    with pytest.raises(requests.exceptions.HTTPError, match="503 Error"):
+        storage.read(name="archive")
+    assert status_codes == [503]
+
+
 def test_write_method_with_details():
     """Test the LDPStorage write method"""
 
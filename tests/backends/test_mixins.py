@@ -14,7 +14,7 @@ def test_history_mixin_empty_history(fs):
     history = HistoryMixin()
 
     # Property has not been cached yet.
-    assert not hasattr(history, "_history")
+    assert not hasattr(history, "_history_store")
 
     # History file or even the APP_DIR are not supposed to exist before trying
     # to access the history for the first time.
@@ -28,8 +28,8 @@ def test_history_mixin_empty_history(fs):
     assert not os.path.exists(str(HISTORY_FILE))
 
     # Cached property should be effective now.
-    assert hasattr(history, "_history")
-    assert history._history == history.history
+    assert hasattr(history, "_history_store")
+    assert history._history_store.entries == history.history
 
 
 def test_history_mixin_with_history(fs):
@@ -65,11 +65,28 @@ def test_history_mixin_write_history(fs):
     history.write_history(events)
     assert os.path.exists(str(APP_DIR))
     assert os.path.exists(str(HISTORY_FILE))
-    assert HISTORY_FILE.read_text() == json.dumps(events)
-    assert history._history == events
+    assert HISTORY_FILE.read_text() == '{"event": "foo"}\n'
     assert history.history == events
 
 
+def test_history_mixin_write_history_keeps_concurrent_appends(fs):
+    """Test the write_history method keeps entries appended by others"""
+    # pylint: disable=invalid-name
+
+    fs.create_dir(str(APP_DIR))
+    history = HistoryMixin()
+    history.write_history([{"event": "foo"}, {"event": "bar"}])
+    assert history.history == [{"event": "foo"}, {"event": "bar"}]
+
+    # Another process appends an entry once the history has been loaded
+    HistoryMixin().append_to_history({"event": "baz"})
+
+    history.write_history([{"event": "bar"}, {"event": "lol"}])
+    expected = [{"event": "bar"}, {"event": "lol"}, {"event": "baz"}]
+    assert history.history == expected
+    assert HistoryMixin().history == expected
+
+
 def test_history_mixin_clean_history(fs):
     """Test the clean_history method of the HistoryMixin"""
     # pylint: disable=invalid-name
@@ -111,6 +128,26 @@ def test_history_mixin_append_to_history(fs):
     # Append new event
     history.append_to_history({"event": "bar"})
     expected = [{"event": "foo"}, {"event": "bar"}]
-    assert HISTORY_FILE.read_text() == json.dumps(expected)
-    assert history._history == expected
+    assert HISTORY_FILE.read_text() == '{"event": "foo"}\n{"event": "bar"}\n'
     assert history.history == expected
+
+
+def test_history_mixin_get_history_ids(fs):
+    """Test the get_history_ids method of the HistoryMixin"""
+    # pylint: disable=invalid-name
+
+    history = HistoryMixin()
+    history.name = "fs"
+
+    # Add history events
+    events = [
+        {"backend": "fs", "command": "fetch", "id": "foo"},
+        {"backend": "ldp", "command": "fetch", "id": "bar"},
+        {"backend": "fs", "command": "push", "id": "baz"},
+        {"backend": "fs", "command": "fetch", "id": "lol"},
+    ]
+    fs.create_file(HISTORY_FILE, contents=json.dumps(events))
+
+    assert set(history.get_history_ids("fetch")) == {"foo", "lol"}
+    assert set(history.get_history_ids("push")) == {"baz"}
+    assert not history.get_history_ids("delete")
@@ -0,0 +1,97 @@
+"""
+Tests for the ralph.checkpoint module.
+"""
+import os
+
+from ralph.checkpoint import Checkpoint
+
+
+def test_checkpoint_save_and_load(tmp_path):
+    """Test checkpoints persistence."""
+
+    input_file = tmp_path / "input.log"
+    input_file.write_bytes(b"foo\nbar\n")
+    directory = tmp_path / "checkpoints"
+
+    checkpoint = Checkpoint(str(input_file), directory=directory).load()
+    assert (checkpoint.offset, checkpoint.events, checkpoint.completed) == (0, 0, False)
+    assert not checkpoint.loaded
+
+    checkpoint.advance(4, 1)
+    checkpoint.save()
+    assert [path.name for path in directory.iterdir()] == [checkpoint.path.name]
+
+    checkpoint = Checkpoint(str(input_file), directory=directory).load()
+    assert (checkpoint.offset, checkpoint.events, checkpoint.completed) == (4, 1, False)
+    assert checkpoint.loaded
+
+    checkpoint.advance(8, 1)
+    checkpoint.save(completed=True)
+    checkpoint = Checkpoint(str(input_file), directory=directory).load()
+    assert (checkpoint.offset, checkpoint.events, checkpoint.completed) == (8, 2, True)
+
+    # Checkpoints of distinct outputs are independent
+    output = tmp_path / "output"
+    output.write_bytes(b"")
+    checkpoint = Checkpoint(str(input_file), output=str(output), directory=directory)
+    assert checkpoint.load().offset == 0
+    checkpoint.save()
+    assert len(list(directory.iterdir())) == 2
+
+    checkpoint.discard()
+    checkpoint = Checkpoint(str(input_file), directory=directory).load()
+    assert checkpoint.offset == 8
+    checkpoint.discard()
+    assert not list(directory.iterdir())
+
+
+def test_checkpoint_load_changed_or_corrupted(tmp_path):
+    """Test that stale or corrupted checkpoints are ignored."""
+
+    input_file = tmp_path / "input.log"
+    input_file.write_bytes(b"foo\nbar\n")
+    directory = tmp_path / "checkpoints"
+
+    checkpoint = Checkpoint(str(input_file), directory=directory)
+    checkpoint.advance(4, 1)
+    checkpoint.save()
+
+    input_file.write_bytes(b"foo\nbar\nbaz\n")
+    assert Checkpoint(str(input_file), directory=directory).load().offset == 0
+
+    checkpoint.path.write_text("{")
+    assert Checkpoint(str(input_file), directory=directory).load().offset == 0
+
+
+def test_checkpoint_rollback_output(tmp_path):
+    """Test the output truncation to its size at the last checkpoint."""
+
+    input_file = tmp_path / "input.log"
+    input_file.write_bytes(b"foo\nbar\n")
+    output = tmp_path / "output"
+    output.write_bytes(b"foo\n")
+    directory = tmp_path / "checkpoints"
+
+    checkpoint = Checkpoint(str(input_file), output=str(output), directory=directory)
+    checkpoint.advance(4, 1)
+    checkpoint.save()
+
+    # Events written after the checkpoint are discarded
+    with output.open("ab") as stream:
+        stream.write(b"bar\n")
+    checkpoint = Checkpoint(
+        str(input_file), output=str(output), directory=directory
+    ).load()
+    assert checkpoint.output_size == 4
+    checkpoint.rollback_output()
+    assert output.read_bytes() == b"foo\n"
+
+    # Checkpoints of another output are not rolled back
+    other = tmp_path / "other"
+    other.write_bytes(b"foo\nbar\n")
+    checkpoint = Checkpoint(
+        str(input_file), output=str(other), directory=directory
+    ).load()
+    assert checkpoint.output_size is None
+    checkpoint.rollback_output()
+    assert os.path.getsize(other) == 8
@@ -12,7 +12,13 @@ from elasticsearch.helpers import bulk, scan
 from ralph.backends.storage.fs import FSStorage
 from ralph.backends.storage.ldp import LDPStorage
 from ralph.cli import cli
-from ralph.defaults import APP_DIR, FS_STORAGE_DEFAULT_PATH
+from ralph.defaults import (
+    APP_DIR,
+    CHECKPOINTS_DIR,
+    FS_STORAGE_DEFAULT_PATH,
+    HISTORY_FILE,
+)
+from ralph.parsers import GELFParser
 
 from tests.fixtures.backends import ES_TEST_HOSTS, ES_TEST_INDEX
 
@@ -41,9 +47,39 @@ def test_extract_command_usage():
     assert result.exit_code == 0
     assert (
         "Options:\n"
-        "  -p, --parser [gelf]      Container format parser used to extract events\n"
-        "                           [required]\n\n"
-        "  -c, --chunksize INTEGER  Parse events by chunks of size #\n"
+        "  -p, --parser [gelf]             Container format parser used to extract "
+        "events\n"
+        "                                  [required]\n\n"
+        "  -c, --chunksize INTEGER         Parse events by chunks of size #\n"
+        "  -e, --engine [pandas|json|orjson|msgspec]\n"
+        "                                  JSON engine used to decode container "
+        "records\n"
+        "  --fast-path / --no-fast-path    Extract events from raw records without\n"
+        "                                  decoding them (if possible)\n\n"
+        "  -j, --jobs INTEGER RANGE        Parse input files using # processes\n"
+        "  -w, --where EXPR                Only extract events matching this "
+        "predicate\n"
+        "                                  expression (e.g. 'event_type startswith\n"
+        '                                  "problem_"\')\n\n'
+        "  --ordered / --unordered         Keep (or not) events order when parsing "
+        "with\n"
+        "                                  multiple jobs\n\n"
+        "  --tolerant / --strict           Skip malformed records instead of "
+        "aborting\n"
+        "                                  (strict by default)\n\n"
+        "  -q, --quarantine FILE           Append skipped malformed records to "
+        "this JSON\n"
+        "                                  lines file (implies --tolerant)\n\n"
+        "  -f, --format [ndjson|arrow|parquet]\n"
+        "                                  Output format of extracted events\n"
+        "  -o, --output FILE               Write events to this file instead of "
+        "the\n"
+        "                                  standard output\n\n"
+        "  --resume                        Checkpoint extraction progress and "
+        "resume from\n"
+        "                                  the last checkpoint of input files "
+        "(events are\n"
+        "                                  appended to the --output file)\n"
     ) in result.output
 
     result = runner.invoke(cli, ["extract"])
@@ -65,6 +101,409 @@ def test_extract_command_with_gelf_parser(gelf_logger):
         assert '{"username": "foo"}' in result.output
 
 
+@pytest.mark.parametrize("engine", ["pandas", "json", "json --no-fast-path"])
+def test_extract_command_with_engine_option(gelf_logger, engine):
+    """Test the extract command using various JSON engines"""
+
+    gelf_logger.info('{"username": "foo"}')
+    gelf_logger.info('{"username": "bar"}')
+
+    runner = CliRunner()
+    with Path(gelf_logger.handlers[0].stream.name).open() as log_file:
+        gelf_content = log_file.read()
+        result = runner.invoke(
+            cli, ["extract", "-p", "gelf", "-e", *engine.split()], input=gelf_content
+        )
+        assert result.exit_code == 0
+        assert '{"username": "foo"}\n{"username": "bar"}\n' in result.output
+
+
+def test_extract_command_with_jobs(gelf_logger):
+    """Test the extract command parsing an input file with multiple jobs"""
+
+    for idx in range(10):
+        gelf_logger.info(f'{{"username": "user_{idx}"}}')
+    log_file_name = gelf_logger.handlers[0].stream.name
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["extract", "-p", "gelf", "-j", "2", log_file_name])
+    assert result.exit_code == 0
+    assert "\n".join(f'{{"username": "user_{idx}"}}' for idx in range(10)) in (
+        result.output
+    )
+
+    # Multiple input files
+    result = runner.invoke(
+        cli, ["extract", "-p", "gelf", "-j", "2", log_file_name, log_file_name]
+    )
+    assert result.exit_code == 0
+    assert result.output.count('{"username": "user_') == 20
+
+    result = runner.invoke(cli, ["extract", "-p", "gelf", log_file_name, log_file_name])
+    assert result.exit_code == 0
+    assert result.output.count('{"username": "user_') == 20
+
+    # Parallel parsing requires input files
+    result = runner.invoke(cli, ["extract", "-p", "gelf", "-j", "2"], input="")
+    assert result.exit_code > 0
+    assert "Parsing with multiple jobs requires input files" in result.output
+
+
+def test_extract_command_with_quarantine(gelf_logger, tmp_path):
+    """Test the extract command skipping malformed records"""
+
+    gelf_logger.info('{"username": "foo"}')
+    log_file_name = gelf_logger.handlers[0].stream.name
+    gelf_logger.handlers[0].stream.write('{"short_message": "truncated\n')
+    gelf_logger.info('{"username": "bar"}')
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["extract", "-p", "gelf", log_file_name])
+    assert result.exit_code > 0
+
+    quarantine = tmp_path / "quarantine.jsonl"
+    for jobs in ("1", "2"):
+        quarantine.unlink(missing_ok=True)
+        result = runner.invoke(
+            cli,
+            ["extract", "-p", "gelf", "-j", jobs, "-q", str(quarantine), log_file_name],
+        )
+        assert result.exit_code == 0
+        assert '{"username": "foo"}\n{"username": "bar"}\n' in result.output
+        assert "Extracted 2 events, skipped 1 malformed records" in result.output
+
+        records = [json.loads(line) for line in quarantine.read_text().splitlines()]
+        assert len(records) == 1
+        assert records[0]["input"] == log_file_name
+        assert records[0]["line"] == '{"short_message": "truncated'
+        with Path(log_file_name).open("rb") as log_file:
+            log_file.seek(records[0]["offset"])
+            assert log_file.readline() == b'{"short_message": "truncated\n'
+
+    # Malformed records are only skipped in tolerant mode without quarantine
+    result = runner.invoke(cli, ["extract", "-p", "gelf", "--tolerant", log_file_name])
+    assert result.exit_code == 0
+    assert '{"username": "foo"}\n{"username": "bar"}\n' in result.output
+
+
+def test_extract_command_with_resume(fs, gelf_logger, monkeypatch):
+    """Test the extract command resuming an interrupted extraction"""
+    # pylint: disable=invalid-name,unused-argument,protected-access
+
+    for idx in range(6):
+        gelf_logger.info(f'{{"username": "user_{idx}"}}')
+    log_file_name = gelf_logger.handlers[0].stream.name
+    expected = "".join(f'{{"username": "user_{idx}"}}\n' for idx in range(6))
+
+    # Save a checkpoint after each chunk and interrupt the extraction while
+    # decoding the third chunk
+    monkeypatch.setattr("ralph.checkpoint.Checkpoint.due", True)
+    decode = GELFParser._decode
+    calls = []
+
+    def mock_decode(self, lines):
+        """Fail while decoding the third chunk"""
+
+        calls.append(lines)
+        if len(calls) == 3:
+            raise MemoryError("Killed")
+        return decode(self, lines)
+
+    monkeypatch.setattr(GELFParser, "_decode", mock_decode)
+
+    runner = CliRunner()
+    command = ["extract", "-p", "gelf", "-c", "2", "--resume", "-o", "events.ndjson"]
+    result = runner.invoke(cli, command + [log_file_name])
+    assert isinstance(result.exception, MemoryError)
+    with Path("events.ndjson").open() as output:
+        assert output.read() == "".join(expected.splitlines(True)[:4])
+
+    # Extractions to another output do not use this checkpoint
+    monkeypatch.setattr(GELFParser, "_decode", decode)
+    other_command = command[:-1] + ["other.ndjson", log_file_name]
+    result = runner.invoke(cli, other_command)
+    assert result.exit_code == 0
+    assert "Resuming extraction of" not in result.output
+    with Path("other.ndjson").open() as output:
+        assert output.read() == expected
+
+    # Resume the extraction from the last checkpoint
+    result = runner.invoke(cli, command + [log_file_name])
+    assert result.exit_code == 0
+    assert "Resuming extraction of" in result.output
+    with Path("events.ndjson").open() as output:
+        assert output.read() == expected
+
+    # Checkpoints are removed once the extraction is complete
+    assert not list(Path(CHECKPOINTS_DIR).iterdir())
+
+    # Running a completed extraction again starts over without duplicates
+    result = runner.invoke(cli, command + [log_file_name])
+    assert result.exit_code == 0
+    assert "Resuming extraction of" not in result.output
+    with Path("events.ndjson").open() as output:
+        assert output.read() == expected
+
+    # Resuming requires input files, an output file and a single job
+    result = runner.invoke(cli, command, input="")
+    assert "Resuming an extraction requires input files" in result.output
+    result = runner.invoke(cli, command[:-2] + [log_file_name])
+    assert "Resuming an extraction requires an output file" in result.output
+    result = runner.invoke(cli, command + ["-j", "2", log_file_name])
+    assert "multiple jobs is not supported" in result.output
+
+    # Arrow outputs cannot be appended
+    result = runner.invoke(cli, command + ["-f", "arrow", log_file_name])
+    assert "cannot append events to an existing output" in result.output
+
+
+def test_filter_command():
+    """Test the filter command"""
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["filter", "--help"])
+    assert result.exit_code == 0
+    assert (
+        "  -f, --filter [anonymous|pseudonymize]\n"
+        "                                  Filter to apply to events (could be "
+        "repeated)\n"
+        "  -w, --where EXPR                Only keep events matching this "
+        "predicate\n"
+        "                                  expression (could be repeated)\n\n"
+        "  -c, --chunksize INTEGER         Filter events by chunks of size #\n"
+    ) in result.output
+
+    result = runner.invoke(cli, ["filter"], input="")
+    assert result.exit_code > 0
+    assert "At least one filter or predicate is required" in result.output
+
+    events = '{"username": "foo"}\n{"username": ""}\n\n{"username": "bar"}\n'
+    result = runner.invoke(cli, ["filter", "-f", "anonymous", "-c", "2"], input=events)
+    assert result.exit_code == 0
+    assert '{"username": "foo"}\n{"username": "bar"}\n' in result.output
+    assert '{"username": ""}' not in result.output
+
+    result = runner.invoke(
+        cli, ["filter", "-f", "anonymous", "-w", "username != bar"], input=events
+    )
+    assert result.exit_code == 0
+    assert result.output.endswith('{"username": "foo"}\n')
+
+    result = runner.invoke(cli, ["filter", "-w", "username =="], input=events)
+    assert result.exit_code > 0
+    assert "Invalid predicate expression 'username =='" in result.output
+
+
+def test_sample_command():
+    """Test the sample command"""
+
+    events = "".join(f'{{"username": "user_{idx % 10}"}}\n' for idx in range(100))
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["sample"], input=events)
+    assert result.exit_code > 0
+    assert "Either a sampling rate or size is required" in result.output
+
+    result = runner.invoke(cli, ["sample", "-r", "0.5", "-c", "7"], input=events)
+    assert result.exit_code == 0
+    sampled = [line for line in result.output.splitlines() if line.startswith("{")]
+    users = set(sampled)
+    assert len(sampled) == 10 * len(users)
+    result = runner.invoke(cli, ["sample", "-r", "0.5", "-s", "foo"], input=events)
+    assert result.exit_code == 0
+
+    result = runner.invoke(cli, ["sample", "-n", "5", "-s", "1"], input=events)
+    assert result.exit_code == 0
+    sampled = [line for line in result.output.splitlines() if line.startswith("{")]
+    assert len(sampled) == 5
+    assert set(sampled) <= set(events.splitlines())
+
+
+def test_dedupe_command(tmp_path):
+    """Test the dedupe command"""
+
+    events = '{"id": 1, "a": 1}\n{"id": 2}\n{"a": 1, "id": 1}\n'
+    command = ["dedupe", "-i", str(tmp_path)]
+
+    runner = CliRunner()
+    result = runner.invoke(cli, command, input=events)
+    assert result.exit_code == 0
+    assert '{"id": 1, "a": 1}\n{"id": 2}\n' in result.output
+    assert '{"a": 1, "id": 1}' not in result.output
+
+    # Seen events are persisted across runs
+    result = runner.invoke(cli, command, input=events + '{"id": 3}\n')
+    assert result.exit_code == 0
+    assert "{" not in result.output.replace('{"id": 3}', "")
+
+    result = runner.invoke(
+        cli, ["dedupe", "-k", "id", "-i", str(tmp_path / "id")], input=events
+    )
+    assert result.exit_code == 0
+    assert "{" not in result.output.replace('{"id": 1, "a": 1}', "").replace(
+        '{"id": 2}', ""
+    )
+
+
+def test_route_command(fs):
+    """Test the route command"""
+    # pylint: disable=invalid-name
+
+    fs.create_file(
+        "routes.yml",
+        contents=(
+            "routes:\n"
+            "  problems:\n"
+            "    where: event_type startswith problem_\n"
+            "    backend: fs\n"
+            "    archive: problems.jsonl\n"
+            "    fs_path: archives\n"
+            "  all:\n"
+            "    backend: fs\n"
+            "    archive: all.jsonl\n"
+            "    fs_path: archives\n"
+        ),
+    )
+    events = '{"event_type": "problem_check"}\n{"event_type": "play_video"}\n'
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["route", "-r", "routes.yml"], input=events)
+    assert result.exit_code == 0
+    assert "Routed 1 events to problems" in result.output
+    with open("archives/problems.jsonl") as archive:
+        assert archive.read() == '{"event_type": "problem_check"}\n'
+    with open("archives/all.jsonl") as archive:
+        assert archive.read() == events
+
+    result = runner.invoke(cli, ["route", "-r", "routes.yml"], input=events)
+    assert result.exit_code > 0
+    result = runner.invoke(cli, ["route", "-r", "routes.yml", "-f"], input=events)
+    assert result.exit_code == 0
+
+
+def test_convert_command():
+    """Test the convert command"""
+
+    events = (
+        '{"username": "foo", "event_type": "pause_video", "time": "2021-01-01", '
+        '"event": "{\\"id\\": \\"video1\\"}"}\n'
+        '{"username": "foo", "event_type": "unknown"}\n'
+    )
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["convert", "-u", "https://lms.example.org"], input=events
+    )
+    assert result.exit_code == 0
+    statements = [
+        json.loads(line) for line in result.output.splitlines() if line.startswith("{")
+    ]
+    assert len(statements) == 1
+    assert statements[0]["verb"]["id"] == "https://w3id.org/xapi/video/verbs/paused"
+    assert statements[0]["object"]["id"] == "https://lms.example.org/xblock/video1"
+    assert "Skipped 1 events without converter" in result.output
+
+    result = runner.invoke(cli, ["convert"], input='{"event_type": "page_close"}\n')
+    assert result.exit_code == 0
+    assert "Failed to convert 1 events" in result.output
+
+
+def test_validate_command(tmp_path):
+    """Test the validate command"""
+
+    valid = (
+        '{"username": "foo", "event_type": "page_close", "event_source": "browser", '
+        '"time": "2021-01-01", "context": {}, "event": "", "page": "https://a.b/c"}'
+    )
+    invalid = '{"username": "foo", "event_type": "page_close"}'
+    side_output = tmp_path / "invalid.jsonl"
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["validate", "-i", str(side_output)], input=f"{valid}\n{invalid}\n"
+    )
+    assert result.exit_code == 0
+    assert valid in result.output
+    assert invalid not in result.output
+    assert "page_close: 1 valid, 1 invalid events" in result.output
+    assert [json.loads(line) for line in side_output.read_text().splitlines()] == [
+        {"event": invalid, "error": "event_source is missing"}
+    ]
+
+    unknown = valid.replace("page_close", "unknown")
+    result = runner.invoke(cli, ["validate"], input=f"{unknown}\n")
+    assert unknown in result.output
+    result = runner.invoke(cli, ["validate", "--strict"], input=f"{unknown}\n")
+    assert "<unknown>: 0 valid, 1 invalid events" in result.output
+
+
+def test_history_compact_command(fs):
+    """Test the history compact command"""
+    # pylint: disable=invalid-name
+
+    entries = [
+        {"backend": "fs", "command": "fetch", "id": "foo", "fetched_at": "2020-01-01"},
+        {"backend": "fs", "command": "fetch", "id": "bar"},
+    ]
+    fs.create_file(HISTORY_FILE, contents=json.dumps(entries))
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["history", "compact", "-r", "30"])
+    assert result.exit_code == 0
+    assert "Compacting 2 history entries (0 kept)" in result.output
+    assert json.loads(HISTORY_FILE.read_text()) == {
+        "backend": "fs",
+        "command": "fetch",
+        "compacted_ids": ["bar", "foo"],
+    }
+
+
+def test_extract_command_with_predicate(gelf_logger):
+    """Test the extract command with a predicate expression"""
+
+    gelf_logger.info('{"username": "foo", "event_type": "problem_check"}')
+    gelf_logger.info('{"username": "bar", "event_type": "play_video"}')
+    gelf_logger.info('{"username": "baz", "event_type": "problem_graded"}')
+    log_file_name = gelf_logger.handlers[0].stream.name
+
+    runner = CliRunner()
+    command = ["extract", "-p", "gelf", "-w", 'event_type startswith "problem_"']
+    for engine in ("pandas", "json"):
+        result = runner.invoke(cli, command + ["-e", engine, log_file_name])
+        assert result.exit_code == 0
+        assert '"username": "foo"' in result.output
+        assert '"username": "bar"' not in result.output
+        assert '"username": "baz"' in result.output
+
+    result = runner.invoke(cli, ["extract", "-p", "gelf", "-w", "(", log_file_name])
+    assert result.exit_code > 0
+    assert "Invalid value for '-w' / '--where'" in result.output
+
+
+def test_extract_command_with_output_format(gelf_logger, tmp_path):
+    """Test the extract command with output format options"""
+
+    pyarrow = pytest.importorskip("pyarrow")
+
+    gelf_logger.info('{"username": "foo", "event_type": "bar"}')
+    log_file_name = gelf_logger.handlers[0].stream.name
+    output = tmp_path / "events.arrow"
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["extract", "-p", "gelf", "-f", "arrow", "-o", str(output), log_file_name]
+    )
+    assert result.exit_code == 0
+    table = pyarrow.ipc.open_file(pyarrow.memory_map(str(output))).read_all()
+    assert table.column("username").to_pylist() == ["foo"]
+    assert table.column("event_type").to_pylist() == ["bar"]
+
+    # The parquet format requires an output file
+    result = runner.invoke(cli, ["extract", "-p", "gelf", "-f", "parquet"], input="")
+    assert result.exit_code > 0
+    assert "The parquet formatter requires an output file" in result.output
+
+
 @cli.command()
 def dummy_verbosity_check():
     """Adding a dummy command to the cli with all logging levels"""
@@ -95,6 +534,7 @@ def test_fetch_command_usage():
     assert (
         "Options:\n"
         "  fs backend: \n"
+        "    --fs-fsync TEXT\n"
         "    --fs-path TEXT\n"
         "  ldp backend: \n"
         "    --ldp-stream-id TEXT\n"
@@ -108,7 +548,10 @@ def test_fetch_command_usage():
         "    --es-index TEXT\n"
         "    --es-hosts TEXT\n"
         "  -b, --backend [es|ldp|fs]       Backend  [required]\n"
-        "  -c, --chunk-size INTEGER        Get events by chunks of size #"
+        "  -c, --chunk-size INTEGER        Get events by chunks of size #\n"
+        "  -z, --decompress                Decompress fetched archives (gzip, bz2, "
+        "xz or\n"
+        "                                  zstd)\n"
     ) in result.output
 
     result = runner.invoke(cli, ["fetch"])
@@ -124,7 +567,7 @@ def test_fetch_command_with_ldp_backend(monkeypatch):
 
     archive_content = {"foo": "bar"}
 
-    def mock_read(this, name, chunk_size=500):
+    def mock_read(this, name, chunk_size=500, decompress=False):
         """Always return the same archive"""
         # pylint: disable=unused-argument
 
@@ -156,7 +599,7 @@ def test_fetch_command_with_fs_backend(fs, monkeypatch):
 
     archive_content = {"foo": "bar"}
 
-    def mock_read(this, name, chunk_size):
+    def mock_read(this, name, chunk_size, decompress):
         """Always return the same archive"""
         # pylint: disable=unused-argument
 
@@ -214,6 +657,7 @@ def test_list_command_usage():
     assert (
         "Options:\n"
         "  fs backend: \n"
+        "    --fs-fsync TEXT\n"
         "    --fs-path TEXT\n"
         "  ldp backend: \n"
         "    --ldp-stream-id TEXT\n"
@@ -225,6 +669,17 @@ def test_list_command_usage():
         "  -b, --backend [ldp|fs]          Backend  [required]\n"
         "  -n, --new / -a, --all           List not fetched (or all) archives\n"
         "  -D, --details / -I, --ids       Get archives detailled output (JSON)\n"
+        "  -p, --prefix TEXT               List archives starting with a prefix\n"
+        "  -g, --glob TEXT                 List archives matching a glob pattern\n"
+        "  --since DATE                    List archives modified since a date (fs\n"
+        "                                  backend)\n\n"
+        "  --until DATE                    List archives modified until a date (fs\n"
+        "                                  backend)\n\n"
+        "  -s, --sort [name|-name|size|-size|modified|-modified]\n"
+        "                                  Sort archives, in descending order if prefixed\n"
+        "                                  by - (fs backend)\n\n"
+        "  -l, --limit INTEGER RANGE       List # archives at most\n"
+        "  -o, --offset INTEGER RANGE      Skip # first archives\n"
     ) in result.output
 
     result = runner.invoke(cli, ["list"])
@@ -306,6 +761,44 @@ def test_list_command_with_ldp_backend(monkeypatch):
     assert "Configured ldp backend contains no archive" in result.output
 
 
+# pylint: disable=invalid-name
+def test_list_command_with_filters(fs):
+    """Test the list command with filters and pagination options"""
+
+    fs.create_dir(str(APP_DIR))
+    for idx, name in enumerate(["2020-01-02.gz", "2020-01-01.gz", "2020-01-03.log"]):
+        fs.create_file(FS_STORAGE_DEFAULT_PATH / name, contents="x" * (idx + 1))
+
+    runner = CliRunner()
+    command = ["list", "-b", "fs", "-s", "name"]
+    result = runner.invoke(cli, command + ["-g", "*.gz"])
+    assert result.exit_code == 0
+    assert "2020-01-01.gz\n2020-01-02.gz\n" in result.output
+    assert "2020-01-03.log" not in result.output
+
+    result = runner.invoke(cli, command + ["-p", "2020-01-0", "-o", "1", "-l", "1"])
+    assert result.exit_code == 0
+    assert "2020-01-02.gz\n" in result.output
+    assert "2020-01-01.gz" not in result.output
+    assert "2020-01-03.log" not in result.output
+
+    result = runner.invoke(cli, ["list", "-b", "fs", "-s", "-size", "-D", "-l", "1"])
+    assert result.exit_code == 0
+    assert '"filename": "2020-01-03.log", "size": 3' in result.output
+
+    result = runner.invoke(
+        cli, command + ["--since", "2000-01-01", "--until", "2000-01-02"]
+    )
+    assert result.exit_code == 0
+    assert "Configured fs backend contains no archive" in result.output
+
+    result = runner.invoke(
+        cli, ["list", "-b", "ldp", "--ldp-endpoint", "ovh-eu", "--since", "2020-01-01"]
+    )
+    assert result.exit_code > 0
+    assert "The ldp backend does not support the since filter" in result.output
+
+
 # pylint: disable=invalid-name
 # pylint: disable=unused-argument
 def test_list_command_with_fs_backend(fs, monkeypatch):
@@ -0,0 +1,221 @@
+"""
+Tests for the ralph.compression module.
+"""
+
+import asyncio
+import bz2
+import gzip
+import lzma
+import random
+from io import BufferedReader, BytesIO
+
+import pytest
+
+from ralph.compression import (
+    GzipSegment,
+    ThreadedReader,
+    aiter_decompress,
+    detect_compression,
+    find_gzip_members,
+    iter_decompress,
+    iter_file_chunks,
+    iter_parallel_gunzip,
+)
+from ralph.exceptions import DecompressionError
+
+
+def test_detect_compression():
+    """Test the compression format detection from magic numbers."""
+
+    assert detect_compression(gzip.compress(b"foo")) == "gzip"
+    assert detect_compression(bz2.compress(b"foo")) == "bz2"
+    assert detect_compression(lzma.compress(b"foo")) == "xz"
+    assert detect_compression(b"\x28\xb5\x2f\xfd\x00\x00") == "zstd"
+    assert detect_compression(b'{"foo": "bar"}') is None
+    assert detect_compression(b"") is None
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, bz2.compress, lzma.compress])
+def test_iter_decompress_multi_stream(compress):
+    """Test the decompression of concatenated streams read by small chunks."""
+
+    data = compress(b"foo\nbar\n") + compress(b"baz\n") + compress(b"lol\n")
+
+    assert (
+        b"".join(iter_decompress(iter_file_chunks(BytesIO(data), 3)))
+        == b"foo\nbar\nbaz\nlol\n"
+    )
+    assert b"".join(iter_decompress([data])) == b"foo\nbar\nbaz\nlol\n"
+
+
+def test_iter_decompress_zstd_frames():
+    """Test the decompression of concatenated zstd frames."""
+
+    zstandard = pytest.importorskip("zstandard")
+
+    compressor = zstandard.ZstdCompressor()
+    data = compressor.compress(b"foo\nbar\n") + compressor.compress(b"baz\n")
+
+    assert (
+        b"".join(iter_decompress(iter_file_chunks(BytesIO(data), 3)))
+        == b"foo\nbar\nbaz\n"
+    )
+
+
+def test_iter_decompress_uncompressed_stream():
+    """Test that uncompressed streams are yielded untouched."""
+
+    assert list(iter_decompress([b"fo", b"o\nbar", b"\n"])) == [
+        b"foo\nbar",
+        b"\n",
+    ]
+    assert list(iter_decompress([])) == []
+
+
+def test_iter_decompress_truncated_stream():
+    """Test the decompression of a truncated stream."""
+
+    data = gzip.compress(b"foo\nbar\n" * 100)
+
+    with pytest.raises(
+        DecompressionError,
+        match="Compressed gzip stream ended before the end-of-stream marker",
+    ):
+        list(iter_decompress([data[:-10]]))
+
+
+def test_aiter_decompress():
+    """Test the decompression of an asynchronous stream of chunks."""
+
+    async def decompress(chunks):
+        """Return the decompressed data"""
+
+        async def iter_chunks():
+            """Yield chunks asynchronously"""
+
+            for chunk in chunks:
+                yield chunk
+
+        return b"".join([chunk async for chunk in aiter_decompress(iter_chunks())])
+
+    data = gzip.compress(b"foo\n") + gzip.compress(b"bar\n")
+    chunks = list(iter_file_chunks(BytesIO(data), 3))
+    assert asyncio.run(decompress(chunks)) == b"foo\nbar\n"
+    assert asyncio.run(decompress([b"fo", b"o\n"])) == b"foo\n"
+    assert asyncio.run(decompress([])) == b""
+
+    with pytest.raises(DecompressionError, match="ended before the end-of-stream"):
+        asyncio.run(decompress(chunks[:-2]))
+
+
+def test_iter_file_chunks():
+    """Test binary stream chunks reading."""
+
+    assert list(iter_file_chunks(BytesIO(b"foobar"), 4)) == [b"foob", b"ar"]
+
+
+def test_find_gzip_members_and_parallel_gunzip(tmp_path):
+    """Test the parallel decompression of a multi-member gzip file."""
+
+    rng = random.Random(42)
+    members = [
+        "".join(f"{rng.random()}\n" for _ in range(500)).encode() for _ in range(10)
+    ]
+    archive = tmp_path / "archive.gz"
+    archive.write_bytes(b"".join(gzip.compress(member) for member in members))
+
+    offsets = find_gzip_members(str(archive), 1024)
+    assert offsets[0] == 0
+    assert len(offsets) == 10
+
+    data = b"".join(iter_parallel_gunzip(str(archive), 3, segment_size=1024))
+    assert data == b"".join(members)
+
+    # Single member files are decompressed sequentially
+    archive.write_bytes(gzip.compress(b"".join(members)))
+    data = b"".join(iter_parallel_gunzip(str(archive), 3, segment_size=1024))
+    assert data == b"".join(members)
+
+
+def test_parallel_gunzip_with_false_member_boundary(monkeypatch, tmp_path):
+    """Test the sequential fallback when a candidate boundary is invalid."""
+
+    members = [b"foo\n" * 1000, b"bar\n" * 1000, b"baz\n" * 1000]
+    archive = tmp_path / "archive.gz"
+    compressed = [gzip.compress(member) for member in members]
+    archive.write_bytes(b"".join(compressed))
+
+    def mock_find_gzip_members(input_file, segment_size):
+        """Return a false boundary in the middle of the second member"""
+        # pylint: disable=unused-argument
+
+        return [0, len(compressed[0]), len(compressed[0]) + 10]
+
+    monkeypatch.setattr("ralph.compression.find_gzip_members", mock_find_gzip_members)
+
+    data = b"".join(iter_parallel_gunzip(str(archive), 2))
+    assert data == b"".join(members)
+
+
+def test_parallel_gunzip_chunks_size(tmp_path):
+    """Test uncompressed chunks size of the parallel decompression."""
+
+    rng = random.Random(42)
+    members = [
+        "".join(f"{rng.random()}\n" for _ in range(5000)).encode() for _ in range(4)
+    ]
+    archive = tmp_path / "archive.gz"
+
+    # Single member files are streamed instead of being decompressed at once
+    archive.write_bytes(gzip.compress(b"".join(members)))
+    chunks = list(iter_parallel_gunzip(str(archive), 3, 1024, chunk_size=4096))
+    assert b"".join(chunks) == b"".join(members)
+    assert len(chunks) > 1
+    assert max(len(chunk) for chunk in chunks) <= 4096
+
+    archive.write_bytes(b"".join(gzip.compress(member) for member in members))
+    chunks = list(
+        iter_parallel_gunzip(str(archive), 3, 1024, chunk_size=4096, prefetch_size=8192)
+    )
+    assert b"".join(chunks) == b"".join(members)
+    assert max(len(chunk) for chunk in chunks) <= 4096
+
+    # Only the first prefetch_size bytes of segments are decompressed ahead
+    # pylint: disable=protected-access
+    segment = GzipSegment(str(archive), 0, chunk_size=4096).prefetch(8192)
+    assert 8192 <= sum(len(chunk) for chunk in segment._head) < 8192 + 4096
+    assert b"".join(segment) == b"".join(members)
+    assert not segment.overrun
+
+
+def test_gzip_segment_with_truncated_file(tmp_path):
+    """Test the decompression of a truncated gzip file."""
+
+    archive = tmp_path / "archive.gz"
+    archive.write_bytes(gzip.compress(b"foo\n" * 1000)[:-10])
+
+    with pytest.raises(DecompressionError, match="ended before the end-of-stream"):
+        b"".join(GzipSegment(str(archive), 0))
+
+
+def test_threaded_reader():
+    """Test the ThreadedReader raw stream."""
+
+    chunks = [b"foo\nb", b"ar\n", b"", b"baz\n"]
+    with BufferedReader(ThreadedReader(iter(chunks))) as reader:
+        assert list(reader) == [b"foo\n", b"bar\n", b"baz\n"]
+
+    def failing_chunks():
+        """Raise an error after the first chunk"""
+
+        yield b"foo\n"
+        raise DecompressionError("Boom")
+
+    with BufferedReader(ThreadedReader(failing_chunks())) as reader:
+        with pytest.raises(DecompressionError, match="Boom"):
+            list(reader)
+
+    # Closing the reader before the end of the stream stops the producer
+    reader = ThreadedReader(iter_file_chunks(BytesIO(b"x" * 1024), 1), max_chunks=2)
+    reader.close()
+    assert reader.closed
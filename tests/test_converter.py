@@ -0,0 +1,158 @@
+"""
+Tests for the ralph.converter module
+"""
+import json
+
+import pytest
+
+from ralph.converter import (
+    PageCloseConverter,
+    PlayVideoConverter,
+    ProblemCheckConverter,
+    SeekVideoConverter,
+    XAPIConverter,
+)
+from ralph.defaults import Converters
+from ralph.utils import import_string
+
+PLATFORM_URL = "https://lms.example.org"
+
+
+def make_event(event_type, **fields):
+    """Return an Open edX event of the given type"""
+
+    return {
+        "username": "john",
+        "event_type": event_type,
+        "time": "2021-01-01T12:00:00.000000+00:00",
+        "context": {"course_id": "course-v1:a+b+c", "user_id": 1},
+        **fields,
+    }
+
+
+def test_converters_registry():
+    """Test each registered converter handles a distinct event type."""
+
+    event_types = [
+        import_string(converter.value).event_type for converter in Converters
+    ]
+    assert len(set(event_types)) == len(event_types)
+    assert set(XAPIConverter(PLATFORM_URL).converters) == set(event_types)
+
+
+def test_base_converter_statement():
+    """Test statements common members."""
+
+    event = make_event("page_close", page="https://lms.example.org/courses/foo")
+    raw_event = json.dumps(event)
+    converter = PageCloseConverter(PLATFORM_URL + "/")
+    statement = converter.convert(event, raw_event)
+
+    assert statement["actor"] == {
+        "objectType": "Agent",
+        "account": {"homePage": PLATFORM_URL, "name": "john"},
+    }
+    assert statement["verb"] == {
+        "id": "http://adlnet.gov/expapi/verbs/terminated",
+        "display": {"en-US": "terminated"},
+    }
+    assert statement["object"] == {
+        "id": "https://lms.example.org/courses/foo",
+        "objectType": "Activity",
+        "definition": {"type": "http://activitystrea.ms/schema/1.0/page"},
+    }
+    assert statement["context"]["contextActivities"]["parent"][0]["id"] == (
+        "https://lms.example.org/course/course-v1:a+b+c"
+    )
+    assert statement["timestamp"] == event["time"]
+    assert "result" not in statement
+
+    # Statement ids are derived from raw events
+    assert converter.convert(event, raw_event)["id"] == statement["id"]
+    assert converter.convert(event, raw_event + " ")["id"] != statement["id"]
+
+    # Anonymous events without course
+    event.update(username="", context={})
+    statement = converter.convert(event, json.dumps(event))
+    assert statement["actor"]["account"]["name"] == "anonymous"
+    assert statement["context"] == {"platform": PLATFORM_URL}
+
+
+def test_video_converters():
+    """Test video events conversion."""
+
+    event = make_event("play_video", event='{"id": "video1", "currentTime": 12.5}')
+    statement = PlayVideoConverter(PLATFORM_URL).convert(event, json.dumps(event))
+    assert statement["verb"]["id"] == "https://w3id.org/xapi/video/verbs/played"
+    assert statement["object"]["id"] == "https://lms.example.org/xblock/video1"
+    assert statement["result"] == {
+        "extensions": {"https://w3id.org/xapi/video/extensions/time": 12.5}
+    }
+
+    event = make_event(
+        "seek_video", event={"id": "video1", "old_time": 1, "new_time": 10}
+    )
+    statement = SeekVideoConverter(PLATFORM_URL).convert(event, json.dumps(event))
+    assert statement["result"] == {
+        "extensions": {
+            "https://w3id.org/xapi/video/extensions/time-from": 1,
+            "https://w3id.org/xapi/video/extensions/time-to": 10,
+        }
+    }
+
+
+def test_problem_check_converter():
+    """Test problem_check events conversion."""
+
+    event = make_event(
+        "problem_check",
+        event={"problem_id": "problem1", "grade": 1, "max_grade": 2, "success": "ok"},
+    )
+    statement = ProblemCheckConverter(PLATFORM_URL).convert(event, json.dumps(event))
+    assert statement["object"]["id"] == "https://lms.example.org/xblock/problem1"
+    assert statement["result"] == {
+        "score": {"raw": 1, "min": 0, "max": 2},
+        "success": False,
+    }
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_xapi_converter(jobs):
+    """Test converting a stream of raw events by batches."""
+
+    events = [
+        json.dumps(make_event("play_video", event=f'{{"id": "video{idx}"}}'))
+        if idx % 2
+        else json.dumps(make_event("unknown"))
+        for idx in range(20)
+    ]
+    converter = XAPIConverter(PLATFORM_URL)
+    statements = [json.loads(statement) for statement in converter(events, 3, jobs)]
+    assert [statement["object"]["id"] for statement in statements] == [
+        f"https://lms.example.org/xblock/video{idx}" for idx in range(1, 20, 2)
+    ]
+    assert converter.skipped == 10
+    assert converter.failed == 0
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_xapi_converter_with_failing_events(jobs, caplog):
+    """Test events that cannot be converted are logged, counted and skipped."""
+
+    events = [
+        json.dumps(make_event("play_video", event='{"id": "video1"}')),
+        json.dumps(make_event("play_video")),
+        "[]",
+        "{",
+        json.dumps(make_event("play_video", event='{"id": "video2"}')),
+    ]
+    converter = XAPIConverter(PLATFORM_URL)
+    statements = [json.loads(statement) for statement in converter(events, 2, jobs)]
+    assert [statement["object"]["id"] for statement in statements] == [
+        "https://lms.example.org/xblock/video1",
+        "https://lms.example.org/xblock/video2",
+    ]
+    assert converter.skipped == 0
+    assert converter.failed == 3
+    if jobs == 1:
+        assert caplog.text.count("Cannot convert event") == 3
@@ -0,0 +1,146 @@
+"""
+Tests for the ralph.dedupe module
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from ralph.dedupe import BloomFilter, DedupeIndex, Deduplicator, DigestSet, get_digest
+from ralph.filters import FilterPipeline
+
+
+def test_get_digest():
+    """Test digests do not depend on JSON keys order."""
+
+    assert get_digest({"a": 1, "b": [1, 2]}) == get_digest({"b": [1, 2], "a": 1})
+    assert get_digest({"a": 1}) != get_digest({"a": "1"})
+    assert len(get_digest("foo")) == 16
+
+
+def test_bloom_filter(tmp_path):
+    """Test the memory-mapped bloom filter."""
+
+    path = tmp_path / "bloom.bin"
+    bloom = BloomFilter(path, capacity=1000, error_rate=0.01)
+    digests = [get_digest(idx) for idx in range(2000)]
+    assert [bloom.add(digest) for digest in digests[:1000]].count(True) < 50
+    assert all(digest in bloom for digest in digests[:1000])
+    assert sum(digest in bloom for digest in digests[1000:]) < 50
+    bloom.close()
+
+    # Filter parameters are read from the existing file
+    bloom = BloomFilter(path, capacity=10)
+    assert all(digest in bloom for digest in digests[:1000])
+    assert bloom.hashes == 7
+    bloom.close()
+
+    with pytest.raises(ValueError, match="Invalid index file"):
+        DigestSet(path, capacity=10)
+
+
+def test_digest_set(tmp_path):
+    """Test the memory-mapped digests set."""
+
+    path = tmp_path / "digests.bin"
+    digests = DigestSet(path, capacity=100)
+    assert digests.slots == 256
+    assert digests.capacity == 128
+    assert all(digests.add(get_digest(idx)) for idx in range(100))
+    assert not any(digests.add(get_digest(idx)) for idx in range(100))
+    assert get_digest(0) in digests
+    assert get_digest(100) not in digests
+    digests.close()
+
+    digests = DigestSet(path, capacity=10)
+    assert len(digests) == 100
+    assert set(digests) == {get_digest(idx) for idx in range(100)}
+    digests.close()
+
+
+def test_dedupe_index(tmp_path):
+    """Test the persistent deduplication index grows and persists digests."""
+
+    with DedupeIndex(tmp_path, capacity=10) as index:
+        assert all(index.add(get_digest(idx)) for idx in range(500))
+        assert not any(index.add(get_digest(idx)) for idx in range(500))
+        assert len(index) == 500
+        assert index.digests.capacity >= 500
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "bloom.bin",
+        "digests.bin",
+        "index.lock",
+    ]
+    with DedupeIndex(tmp_path, capacity=10) as index:
+        assert len(index) == 500
+        assert get_digest(0) in index
+        assert get_digest(500) not in index
+        assert [index.add(get_digest(idx)) for idx in range(490, 510)] == [
+            False
+        ] * 10 + [True] * 10
+
+
+def add_digests(directory, worker, count):
+    """Add distinct digests to a shared deduplication index from a worker process."""
+
+    for idx in range(count):
+        with DedupeIndex(directory, capacity=10) as index:
+            index.add(get_digest(f"{worker}-{idx}"))
+
+
+def test_dedupe_index_concurrent_updates(tmp_path):
+    """Test concurrent processes do not lose digests added to the same index."""
+
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        list(executor.map(add_digests, [tmp_path] * 4, range(4), [50] * 4))
+
+    with DedupeIndex(tmp_path) as index:
+        assert len(index) == 200
+        assert all(
+            get_digest(f"{worker}-{idx}") in index
+            for worker in range(4)
+            for idx in range(50)
+        )
+
+
+def test_deduplicator(tmp_path):
+    """Test the deduplicator drops events seen in previous batches or runs."""
+
+    events = [
+        {"id": 1, "username": "foo"},
+        {"username": "foo", "id": 1},
+        {"id": 1, "username": "bar"},
+        {"username": "baz", "context": {"id": 2}},
+    ]
+    with DedupeIndex(tmp_path / "content") as index:
+        deduplicator = Deduplicator(index)
+        assert deduplicator(events) == [events[0], events[2], events[3]]
+        assert deduplicator(events) == []
+        assert deduplicator.duplicates == 5
+
+    with DedupeIndex(tmp_path / "content") as index:
+        assert Deduplicator(index)(events + [{"id": 3}]) == [{"id": 3}]
+
+    with DedupeIndex(tmp_path / "id") as index:
+        # Events missing the key field are identified by their content
+        assert Deduplicator(index, key="id")(events + events) == [
+            events[0],
+            events[3],
+        ]
+    with DedupeIndex(tmp_path / "context") as index:
+        deduplicator = Deduplicator(index, key="context.id")
+        assert deduplicator(events) == [events[0], events[2], events[3]]
+
+    with DedupeIndex(tmp_path / "array") as index:
+        # Events that are not objects are identified by their content
+        assert Deduplicator(index, key="id")([[1], [1], [2]]) == [[1], [2]]
+
+
+def test_deduplicator_pipeline(tmp_path):
+    """Test the deduplicator as a filter pipeline stage."""
+
+    events = [f'{{"id": {idx % 7}}}' for idx in range(30)]
+    with DedupeIndex(tmp_path) as index:
+        pipeline = FilterPipeline([Deduplicator(index)], chunksize=4)
+        assert list(pipeline(events)) == events[:7]
+        assert list(pipeline(events)) == []
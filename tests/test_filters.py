@@ -1,11 +1,14 @@
 """
 Tests for the ralph.filters module
 """
+import hmac
+from hashlib import sha256
+
 import pandas as pd
 import pytest
 
 from ralph import filters
-from ralph.exceptions import EventKeyError
+from ralph.exceptions import ConfigurationException, EventKeyError
 
 
 def test_anonymous_with_empty_events():
@@ -25,3 +28,115 @@ def test_anonymous_filtering():
     assert len(events) == 2
     assert len(filters.anonymous(events)) == 1
     assert filters.anonymous(events).equals(pd.DataFrame({"username": ["john"]}))
+
+
+def test_anonymous_filtering_event_batches():
+    """Test anonymous filtering of decoded event batches."""
+
+    events = [{"username": "john"}, {"username": ""}, {"username": "jane"}]
+    assert filters.anonymous(events) == [{"username": "john"}, {"username": "jane"}]
+
+    # Events without username are kept
+    events = [{"username": "john"}, {"event_type": "foo"}, [1], {"username": ""}]
+    assert filters.anonymous(events) == events[:3]
+
+
+def test_filter_pipeline():
+    """Test filtering a stream of raw events by batches."""
+
+    events = [
+        '{"username": "john",  "event_type": "foo"}',
+        '{"username": "", "event_type": "bar"}',
+        '{"username": "jane", "event_type": "bar"}',
+    ]
+
+    pipeline = filters.FilterPipeline(["ralph.filters.anonymous"], chunksize=2)
+    # Kept events are yielded untouched
+    assert list(pipeline(iter(events))) == [events[0], events[2]]
+
+    def only_bar(batch):
+        """Keep bar events"""
+
+        return [event for event in batch if event["event_type"] == "bar"]
+
+    def uppercase(batch):
+        """Uppercase usernames"""
+
+        return [{**event, "username": event["username"].upper()} for event in batch]
+
+    pipeline = filters.FilterPipeline([filters.anonymous, only_bar])
+    assert list(pipeline(iter(events))) == [events[2]]
+
+    # Modified events are encoded again
+    pipeline = filters.FilterPipeline([filters.anonymous, uppercase])
+    assert list(pipeline(iter(events))) == [
+        '{"username": "JOHN", "event_type": "foo"}',
+        '{"username": "JANE", "event_type": "bar"}',
+    ]
+
+
+def test_pseudonymizer():
+    """Test replacing identifying fields with keyed HMAC pseudonyms."""
+
+    pseudonymizer = filters.Pseudonymizer(
+        "secret", ["username", "context.user_id", "ip"], cache_size=2
+    )
+    events = [
+        {"username": "john", "ip": "10.0.0.1", "context": {"user_id": 1, "org": "a"}},
+        {"username": "", "ip": None, "context": "n/a"},
+        {"username": "jane", "context": {"course_id": "foo"}},
+        {"username": "john", "context": {"user_id": "1"}},
+    ]
+    pseudonymized = pseudonymizer(events)
+
+    john = hmac.new(b"secret", b"john", sha256).hexdigest()
+    assert pseudonymized[0] == {
+        "username": john,
+        "ip": hmac.new(b"secret", b"10.0.0.1", sha256).hexdigest(),
+        "context": {
+            "user_id": hmac.new(b"secret", b"1", sha256).hexdigest(),
+            "org": "a",
+        },
+    }
+    # Events are not updated in place, unchanged (nested) objects are shared
+    assert events[0]["username"] == "john"
+    assert events[0]["context"] == {"user_id": 1, "org": "a"}
+    assert pseudonymized[1] is events[1]
+    assert pseudonymized[2]["context"] is events[2]["context"]
+    # Identifiers are hashed as strings
+    assert pseudonymized[3] == {
+        "username": john,
+        "context": {"user_id": pseudonymized[0]["context"]["user_id"]},
+    }
+    assert pseudonymizer.get_pseudonym.cache_info().currsize == 2
+
+    other = filters.Pseudonymizer(b"other", ["username"])
+    assert other.pseudonymize(events[0])["username"] != john
+
+
+def test_pseudonymize(monkeypatch):
+    """Test the pseudonymize filter configured by settings."""
+
+    events = [{"username": "john", "context": {"user_id": 1}, "ip": ""}]
+
+    monkeypatch.setattr(filters, "PSEUDONYMIZATION_KEY", None)
+    with pytest.raises(ConfigurationException, match="RALPH_PSEUDONYMIZATION_KEY"):
+        filters.pseudonymize(events)
+
+    monkeypatch.setattr(filters, "PSEUDONYMIZATION_KEY", "secret")
+    assert filters.pseudonymize(events) == [
+        {
+            "username": hmac.new(b"secret", b"john", sha256).hexdigest(),
+            "context": {"user_id": hmac.new(b"secret", b"1", sha256).hexdigest()},
+            "ip": "",
+        }
+    ]
+
+    monkeypatch.setattr(filters, "PSEUDONYMIZED_FIELDS", ["context.user_id"])
+    assert filters.pseudonymize(events)[0]["username"] == "john"
+
+    pipeline = filters.FilterPipeline(["ralph.filters.pseudonymize"])
+    assert list(pipeline(['{"username": "john", "context": {"user_id": 1}}'])) == [
+        '{"username": "john", "context": {"user_id": "%s"}}'
+        % hmac.new(b"secret", b"1", sha256).hexdigest()
+    ]
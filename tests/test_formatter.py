@@ -0,0 +1,113 @@
+"""
+Tests for the ralph.formatter module.
+"""
+import json
+
+import pytest
+
+from ralph.formatter import ArrowFormatter, NDJSONFormatter, ParquetFormatter, get_field
+
+EVENTS = [
+    json.dumps(
+        {
+            "username": "john",
+            "event_type": "play_video",
+            "event_source": "browser",
+            "event": '{"id": "video"}',
+            "context": {"course_id": "course-v1:foo+bar+baz", "user_id": 42},
+            "time": "2020-06-16T12:00:00.000000+00:00",
+        }
+    ),
+    json.dumps(
+        {
+            "username": "",
+            "event_type": "/courses/",
+            "event": {"GET": {}},
+            "context": {"user_id": ""},
+            "page": None,
+        }
+    ),
+]
+
+
+def test_get_field():
+    """Test nested fields getter."""
+
+    event = {"context": {"course_id": "foo", "module": "bar"}, "event": "baz"}
+    assert get_field(event, ("context", "course_id")) == "foo"
+    assert get_field(event, ("context", "user_id")) is None
+    assert get_field(event, ("event", "id")) is None
+    assert get_field(event, ("foo",)) is None
+
+
+def test_ndjson_formatter(tmp_path, capsys):
+    """Test the NDJSON formatter writing to stdout or to a file."""
+
+    NDJSONFormatter().write(iter(EVENTS))
+    assert capsys.readouterr().out == "\n".join(EVENTS) + "\n"
+
+    output = tmp_path / "events.ndjson"
+    NDJSONFormatter(output=str(output)).write(iter(EVENTS))
+    assert output.read_text() == "\n".join(EVENTS) + "\n"
+
+
+def test_arrow_formatter_record_batch():
+    """Test events conversion to Arrow record batches."""
+
+    pytest.importorskip("pyarrow")
+
+    batch = ArrowFormatter().to_record_batch(EVENTS)
+    assert batch.num_rows == 2
+    assert batch.column("username").to_pylist() == ["john", ""]
+    assert batch.column("event_type").to_pylist() == ["play_video", "/courses/"]
+    assert batch.column("context_course_id").to_pylist() == [
+        "course-v1:foo+bar+baz",
+        None,
+    ]
+    assert batch.column("context_user_id").to_pylist() == [42, None]
+    assert batch.column("page").to_pylist() == [None, None]
+    assert batch.column("raw").to_pylist() == EVENTS
+
+
+def test_arrow_formatter_write(tmp_path, capsysbinary):
+    """Test the Arrow formatter writing to a file or to stdout."""
+
+    pyarrow = pytest.importorskip("pyarrow")
+
+    output = tmp_path / "events.arrow"
+    ArrowFormatter(output=str(output), batch_size=1).write(iter(EVENTS))
+    with pyarrow.memory_map(str(output)) as source:
+        table = pyarrow.ipc.open_file(source).read_all()
+    assert table.num_rows == 2
+    assert table.column("raw").to_pylist() == EVENTS
+
+    ArrowFormatter(batch_size=1).write(iter(EVENTS))
+    reader = pyarrow.ipc.open_stream(capsysbinary.readouterr().out)
+    batches = list(reader)
+    assert len(batches) == 2
+    assert batches[1].column("raw").to_pylist() == EVENTS[1:]
+
+
+def test_parquet_formatter(tmp_path):
+    """Test the Parquet formatter."""
+
+    pytest.importorskip("pyarrow")
+    parquet = pytest.importorskip("pyarrow.parquet")
+
+    with pytest.raises(ValueError, match="The parquet formatter requires an output"):
+        ParquetFormatter()
+
+    output = tmp_path / "events.parquet"
+    ParquetFormatter(output=str(output)).write(iter(EVENTS))
+    table = parquet.read_table(str(output))
+    assert table.column("username").to_pylist() == ["john", ""]
+    assert table.column("raw").to_pylist() == EVENTS
+
+
+def test_arrow_formatter_without_pyarrow(monkeypatch):
+    """Test the Arrow formatter instantiation when pyarrow is not installed."""
+
+    monkeypatch.setitem(__import__("sys").modules, "pyarrow", None)
+
+    with pytest.raises(ImportError, match="requires the pyarrow package"):
+        ArrowFormatter()
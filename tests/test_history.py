@@ -0,0 +1,256 @@
+"""
+Tests for the ralph.history module
+"""
+
+import datetime
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from ralph.history import HistoryStore
+
+ENTRIES = [
+    {"backend": "fs", "command": "fetch", "id": "foo", "size": 1},
+    {"backend": "ldp", "command": "fetch", "id": "foo", "size": 2},
+    {"backend": "fs", "command": "push", "id": "bar", "size": 3},
+    {"backend": "fs", "command": "fetch", "id": "foo", "size": 4},
+]
+
+
+def test_history_store_append(tmp_path):
+    """Test entries are appended to the JSON lines history file"""
+
+    path = tmp_path / "history" / "history.jsonl"
+    store = HistoryStore(path, None)
+
+    assert store.entries == []
+    assert not path.exists()
+
+    for entry in ENTRIES:
+        store.append(entry)
+
+    assert path.read_text().splitlines() == [json.dumps(entry) for entry in ENTRIES]
+    assert store.entries == ENTRIES
+    assert len(store) == 4
+    assert list(HistoryStore(path, None)) == ENTRIES
+
+
+def test_history_store_append_without_loading(tmp_path, monkeypatch):
+    """Test entries are appended without loading the history"""
+    # pylint: disable=protected-access
+
+    path = tmp_path / "history.jsonl"
+    path.write_text(json.dumps(ENTRIES[0]) + "\n")
+    reads = []
+    read = HistoryStore._read
+
+    def spy_read(store):
+        reads.append(store)
+        return read(store)
+
+    monkeypatch.setattr(HistoryStore, "_read", spy_read)
+    store = HistoryStore(path, None)
+    store.append(ENTRIES[1])
+    assert not reads
+    assert store.entries == ENTRIES[:2]
+    assert len(reads) == 1
+
+    # JSON history files are migrated before entries are appended
+    legacy_path = tmp_path / "history.json"
+    legacy_path.write_text(json.dumps(ENTRIES[:2]))
+    path = tmp_path / "other.jsonl"
+    HistoryStore(path, legacy_path).append(ENTRIES[2])
+    assert HistoryStore(path, None).entries == ENTRIES[:3]
+
+
+def test_history_store_index(tmp_path):
+    """Test history entries are indexed by backend, command and id"""
+
+    path = tmp_path / "history.jsonl"
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in ENTRIES[:3]))
+    store = HistoryStore(path, None)
+
+    assert set(store.ids("fs", "fetch")) == {"foo"}
+    assert set(store.ids("fs", "push")) == {"bar"}
+    assert not store.ids("es", "fetch")
+    assert store.get("ldp", "fetch", "foo") == ENTRIES[1]
+    assert store.get("ldp", "fetch", "bar") is None
+
+    # The index is updated by appends (the latest entry of an id wins)
+    store.append(ENTRIES[3])
+    assert store.get("fs", "fetch", "foo") == ENTRIES[3]
+
+    store.rewrite(
+        lambda entries: (entry for entry in entries if entry["backend"] != "fs")
+    )
+    assert store.entries == [ENTRIES[1]]
+    assert not store.ids("fs", "fetch")
+    assert path.read_text() == json.dumps(ENTRIES[1]) + "\n"
+    assert not (tmp_path / "history.jsonl.tmp").exists()
+
+
+def test_history_store_truncated_entry(tmp_path):
+    """Test a truncated last entry (interrupted append) is skipped"""
+
+    path = tmp_path / "history.jsonl"
+    path.write_text(json.dumps(ENTRIES[0]) + "\n\n" + json.dumps(ENTRIES[1])[:10])
+
+    store = HistoryStore(path, None)
+    assert store.entries == [ENTRIES[0]]
+
+    # Entries are not appended to the truncated line
+    store.append(ENTRIES[2])
+    assert HistoryStore(path, None).entries == [ENTRIES[0], ENTRIES[2]]
+    assert path.read_text().endswith("\n" + json.dumps(ENTRIES[2]) + "\n")
+
+
+def test_history_store_migration(tmp_path):
+    """Test JSON history files are migrated to the JSON lines format"""
+
+    legacy_path = tmp_path / "history.json"
+    legacy_path.write_text(json.dumps(ENTRIES))
+    path = tmp_path / "history.jsonl"
+
+    store = HistoryStore(path, legacy_path)
+    assert store.entries == ENTRIES
+    assert set(store.ids("fs", "fetch")) == {"foo"}
+    assert path.read_text().splitlines() == [json.dumps(entry) for entry in ENTRIES]
+    # The legacy history file is kept
+    assert legacy_path.exists()
+
+    # The history file itself may be a JSON history file
+    path.write_text(json.dumps(ENTRIES[:1]))
+    store = HistoryStore(path, None)
+    assert store.entries == ENTRIES[:1]
+    assert path.read_text() == json.dumps(ENTRIES[0]) + "\n"
+
+
+def test_history_store_compact(tmp_path):
+    """Test old history entries are compacted into sorted arrays of ids"""
+
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    old = (now - datetime.timedelta(days=10)).isoformat()
+    recent = now.isoformat()
+    entries = [
+        {"backend": "fs", "command": "fetch", "id": "b", "fetched_at": old},
+        {"backend": "fs", "command": "fetch", "id": "a", "fetched_at": old},
+        {"backend": "fs", "command": "push", "id": "c", "pushed_at": old},
+        {"backend": "fs", "command": "fetch", "id": "d", "fetched_at": recent},
+        {"backend": "ldp", "command": "fetch", "id": "e"},
+        {"backend": "ldp", "command": "fetch", "fetched_at": old},
+    ]
+    path = tmp_path / "history.jsonl"
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in entries))
+
+    store = HistoryStore(path, None, retention_days=5)
+    assert store.compact() == 4
+    assert store.entries == [entries[3], entries[5]]
+    assert set(store.ids("fs", "fetch")) == {"a", "b", "d"}
+    assert store.get("fs", "push", "c") == {
+        "backend": "fs",
+        "command": "push",
+        "id": "c",
+    }
+    assert store.get("fs", "fetch", "d") == entries[3]
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert lines == [
+        {"backend": "fs", "command": "fetch", "compacted_ids": ["a", "b"]},
+        {"backend": "fs", "command": "push", "compacted_ids": ["c"]},
+        {"backend": "ldp", "command": "fetch", "compacted_ids": ["e"]},
+        entries[3],
+        entries[5],
+    ]
+
+    # Compacted ids are loaded, kept by appends and merged by compactions
+    store = HistoryStore(path, None)
+    assert set(store.ids("ldp", "fetch")) == {"e"}
+    store.append({"backend": "ldp", "command": "fetch", "id": "f"})
+    assert HistoryStore(path, None).compact(retention_days=0) == 2
+    store = HistoryStore(path, None)
+    assert store.entries == [entries[5]]
+    assert set(store.ids("ldp", "fetch")) == {"e", "f"}
+    assert set(store.ids("fs", "fetch")) == {"a", "b", "d"}
+
+    # Rewriting the history keeps compacted ids
+    HistoryStore(path, None).rewrite(lambda entries: [])
+    assert set(HistoryStore(path, None).ids("fs", "fetch")) == {"a", "b", "d"}
+
+
+def test_history_store_automatic_compaction(tmp_path):
+    """Test the history is compacted when loaded with too many entries"""
+
+    path = tmp_path / "history.jsonl"
+    path.write_text(
+        "".join(
+            json.dumps({"backend": "fs", "command": "fetch", "id": str(idx)}) + "\n"
+            for idx in range(5)
+        )
+    )
+
+    assert len(HistoryStore(path, None, max_entries=5)) == 5
+    store = HistoryStore(path, None, max_entries=4)
+    assert len(store) == 0
+    assert len(store.ids("fs", "fetch")) == 5
+    assert len(path.read_text().splitlines()) == 1
+
+    # The history is not rewritten when no entry is older than the retention
+    # period
+    now = datetime.datetime.now(tz=datetime.timezone.utc).isoformat()
+    path.write_text(
+        "".join(
+            json.dumps(
+                {"backend": "fs", "command": "fetch", "id": str(idx), "fetched_at": now}
+            )
+            + "\n"
+            for idx in range(5)
+        )
+    )
+    inode = path.stat().st_ino
+    store = HistoryStore(path, None, max_entries=4)
+    assert len(store) == 5
+    assert store.compact() == 0
+    assert path.stat().st_ino == inode
+
+
+def append_entries(path, worker, count):
+    """Append entries to the history (or compact it) from a worker process"""
+
+    store = HistoryStore(path, None, max_entries=0)
+    for idx in range(count):
+        store.append({"backend": "fs", "command": "fetch", "id": f"{worker}-{idx}"})
+        if worker == 0 and idx % 10 == 0:
+            HistoryStore(path, None, max_entries=0).compact(retention_days=0)
+
+
+def test_history_store_concurrent_updates(tmp_path):
+    """Test concurrent appends and compactions do not lose history entries"""
+
+    path = tmp_path / "history.jsonl"
+
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        list(executor.map(append_entries, [path] * 4, range(4), [50] * 4))
+
+    store = HistoryStore(path, None, max_entries=0)
+    expected = {f"{worker}-{idx}" for worker in range(4) for idx in range(50)}
+    assert set(store.ids("fs", "fetch")) == expected
+
+    # Threads of a process are serialized as well
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(append_entries, [path] * 4, range(4, 8), [50] * 4))
+    store = HistoryStore(path, None, max_entries=0)
+    expected |= {f"{worker}-{idx}" for worker in range(4, 8) for idx in range(50)}
+    assert set(store.ids("fs", "fetch")) == expected
+    assert not (tmp_path / "history.jsonl.tmp").exists()
+
+
+def test_history_store_remove(tmp_path):
+    """Test entries appended by other processes are kept by removals"""
+
+    path = tmp_path / "history.jsonl"
+    store = HistoryStore(path, None)
+    store.append(ENTRIES[0])
+    HistoryStore(path, None).append(ENTRIES[1])
+
+    store.remove(lambda entry: entry["backend"] == "fs")
+    assert store.entries == [ENTRIES[1]]
+    assert HistoryStore(path, None).entries == [ENTRIES[1]]
@@ -1,12 +1,60 @@
 """
 Tests for ralph.parsers module.
 """
+import asyncio
+import bz2
 import gzip
+import json
+import lzma
+import mmap
 import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
 
 import pytest
 
-from ralph.parsers import GELFParser
+from ralph.parsers import (
+    GELFParser,
+    Quarantine,
+    aiter_lines,
+    extract_short_message,
+    get_shards,
+    iter_chunks,
+    iter_mapped_lines,
+    open_lines,
+)
+from ralph.predicates import Predicate
+
+
+def test_gelfparser_unsupported_engine():
+    """Test the GELFParser instantiation with an unsupported engine."""
+
+    with pytest.raises(ValueError, match="Unsupported GELF parser engine: foo"):
+        GELFParser(engine="foo")
+
+
+def test_gelfparser_missing_engine_package(monkeypatch):
+    """Test the GELFParser instantiation when the engine package is missing."""
+
+    def mock_import_string(dotted_path):
+        """Simulate a missing package"""
+
+        raise ImportError(f"No module named {dotted_path}")
+
+    monkeypatch.setattr("ralph.parsers.import_string", mock_import_string)
+
+    with pytest.raises(
+        ImportError, match="The orjson engine requires the orjson package"
+    ):
+        GELFParser(engine="orjson")
+
+
+def test_iter_chunks():
+    """Test the iter_chunks utility."""
+
+    assert list(iter_chunks([], 2)) == []
+    assert list(iter_chunks(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(iter_chunks(range(4), 10)) == [[0, 1, 2, 3]]
 
 
 def test_gelfparser_parse_non_existing_file():
@@ -100,3 +148,506 @@ def test_gelfparser_parse_with_various_chunksizes(fs, gelf_logger):
     assert events[1] == '{"username": "bar"}'
     assert events[2] == '{"username": "baz"}'
     assert events[3] == '{"username": "lol"}'
+
+
+@pytest.mark.parametrize("engine", ["pandas", "json", "orjson", "msgspec"])
+def test_gelfparser_parse_with_engines(gelf_logger, engine):
+    """Test the GELFParser parsing using different JSON engines."""
+
+    if engine != "json":
+        pytest.importorskip(engine)
+
+    gelf_logger.info('{"username": "foo"}')
+    gelf_logger.info('{"username": "bar", "event": "\\u00e9t\\u00e9"}')
+    gelf_logger.info('{"username": "baz"}')
+
+    parser = GELFParser(engine=engine)
+    events = list(parser.parse(gelf_logger.handlers[0].stream.name, chunksize=2))
+    assert events == [
+        '{"username": "foo"}',
+        '{"username": "bar", "event": "\\u00e9t\\u00e9"}',
+        '{"username": "baz"}',
+    ]
+
+
+def test_gelfparser_parse_file_object_with_blank_lines(gelf_logger):
+    """Test the GELFParser streaming engine with an opened file object."""
+
+    gelf_logger.info('{"username": "foo"}')
+    gelf_logger.info('{"username": "bar"}')
+    log_file_name = gelf_logger.handlers[0].stream.name
+    with open(log_file_name, "a") as log_file:
+        log_file.write("\n")
+
+    parser = GELFParser(engine="json")
+    with open(log_file_name) as log_file:
+        events = list(parser.parse(log_file))
+    assert events == ['{"username": "foo"}', '{"username": "bar"}']
+
+
+def test_gelfparser_parse_file_with_whitespace_lines(gelf_logger):
+    """Test that whitespace-only lines of mapped and streamed inputs are
+    skipped."""
+
+    gelf_logger.info('{"username": "foo"}')
+    log_file_name = gelf_logger.handlers[0].stream.name
+    with open(log_file_name, "a") as log_file:
+        log_file.write("    \n \t \r\n")
+
+    parser = GELFParser(engine="json")
+    assert list(parser.parse(log_file_name)) == ['{"username": "foo"}']
+    with open(log_file_name) as log_file:
+        assert list(parser.parse(log_file)) == ['{"username": "foo"}']
+
+
+def test_get_shards(tmp_path):
+    """Test input file splitting into byte ranges aligned on lines."""
+
+    input_file = tmp_path / "lines"
+    input_file.write_bytes(b"aaaa\nbb\ncccccc\nd\n")
+
+    shards = list(get_shards(str(input_file), 3))
+    assert shards == [(0, 5), (5, 8), (8, 15), (15, 17)]
+
+    shards = list(get_shards(str(input_file), 5))
+    assert shards == [(0, 5), (5, 15), (15, 17)]
+
+    shards = list(get_shards(str(input_file), 100))
+    assert shards == [(0, 17)]
+
+    content = input_file.read_bytes()
+    for start, end in shards:
+        assert content[start:end].endswith(b"\n")
+
+
+@pytest.mark.parametrize("engine", ["pandas", "json"])
+def test_gelfparser_parse_parallel(gelf_logger, engine):
+    """Test the GELFParser parsing using multiple processes."""
+
+    for idx in range(50):
+        gelf_logger.info(f'{{"username": "user_{idx}"}}')
+    log_file_name = gelf_logger.handlers[0].stream.name
+    expected = [f'{{"username": "user_{idx}"}}' for idx in range(50)]
+
+    parser = GELFParser(engine=engine)
+    events = list(parser.parse_parallel(log_file_name, 3, ordered=True, shard_size=512))
+    assert events == expected
+
+    events = list(
+        parser.parse_parallel(log_file_name, 3, ordered=False, shard_size=512)
+    )
+    assert sorted(events) == sorted(expected)
+
+
+@pytest.mark.parametrize("engine", ["pandas", "json"])
+@pytest.mark.parametrize("compress", [gzip.compress, bz2.compress, lzma.compress])
+def test_gelfparser_parse_compressed_inputs(gelf_logger, tmp_path, engine, compress):
+    """Test the GELFParser parsing compressed files and streams."""
+
+    gelf_logger.info('{"username": "foo"}')
+    gelf_logger.info('{"username": "bar"}')
+    with open(gelf_logger.handlers[0].stream.name, "rb") as log_file:
+        compressed = compress(log_file.read())
+    compressed_file = tmp_path / "archive"
+    compressed_file.write_bytes(compressed)
+
+    parser = GELFParser(engine=engine)
+    expected = ['{"username": "foo"}', '{"username": "bar"}']
+    assert list(parser.parse(str(compressed_file))) == expected
+    assert list(parser.parse(BytesIO(compressed), chunksize=1)) == expected
+
+
+def test_gelfparser_parse_parallel_multi_member_gzip(gelf_logger, tmp_path):
+    """Test the GELFParser parsing a multi-member gzip file with multiple jobs."""
+
+    for idx in range(20):
+        gelf_logger.info(f'{{"username": "user_{idx}"}}')
+    with open(gelf_logger.handlers[0].stream.name, "rb") as log_file:
+        lines = log_file.readlines()
+    archive = tmp_path / "archive.gz"
+    archive.write_bytes(b"".join(gzip.compress(line) for line in lines))
+
+    parser = GELFParser()
+    events = list(parser.parse_parallel(str(archive), 2))
+    assert events == [f'{{"username": "user_{idx}"}}' for idx in range(20)]
+
+
+MALFORMED_GELF_LINES = [
+    b'{"short_message": "{\\"username\\": \\"foo\\"}"}\n',
+    b'{"short_message": "truncated\n',
+    b'{"host": "missing short_message"}\n',
+    b"\n",
+    b'["not", "an", "object"]\n',
+    # Truncated after the short_message member
+    b'{"version": "1.1", "short_message": "{\\"a\\": 2}", "host": "tru\n',
+    b'{"short_message": "{\\"username\\": \\"bar\\"}"}\n',
+]
+
+
+@pytest.mark.parametrize("engine", ["pandas", "json", "orjson", "msgspec"])
+@pytest.mark.parametrize("fast_path", [True, False])
+def test_gelfparser_parse_tolerant(tmp_path, engine, fast_path):
+    """Test the GELFParser skipping malformed lines in tolerant mode."""
+
+    if engine != "json":
+        pytest.importorskip(engine)
+
+    log_file = tmp_path / "gelf.log"
+    log_file.write_bytes(b"".join(MALFORMED_GELF_LINES))
+    expected = ['{"username": "foo"}', '{"username": "bar"}']
+
+    with pytest.raises((AttributeError, KeyError, ValueError)):
+        list(GELFParser(engine=engine).parse(str(log_file)))
+
+    quarantine = Quarantine()
+    parser = GELFParser(engine=engine, fast_path=fast_path, quarantine=quarantine)
+    for chunksize in (1, 2, 10):
+        quarantine.records.clear()
+        assert list(parser.parse(str(log_file), chunksize=chunksize)) == expected
+        if engine == "pandas":
+            # pandas fills missing members with NaN values
+            continue
+        assert [record["offset"] for record in quarantine.records] == [
+            len(b"".join(MALFORMED_GELF_LINES[:idx])) for idx in (1, 2, 4, 5)
+        ]
+        assert [record["line"] for record in quarantine.records] == [
+            MALFORMED_GELF_LINES[idx].decode().rstrip("\n") for idx in (1, 2, 4, 5)
+        ]
+        assert all(record["input"] == str(log_file) for record in quarantine.records)
+
+
+def test_gelfparser_parse_tolerant_streams_and_shards(tmp_path):
+    """Test tolerant parsing of compressed inputs and by shards."""
+
+    data = b"".join(MALFORMED_GELF_LINES)
+    offsets = [len(b"".join(MALFORMED_GELF_LINES[:idx])) for idx in (1, 2, 4, 5)]
+    expected = ['{"username": "foo"}', '{"username": "bar"}']
+
+    # Offsets of compressed inputs lines are relative to the uncompressed stream
+    quarantine = Quarantine()
+    parser = GELFParser(quarantine=quarantine)
+    assert list(parser.parse(BytesIO(gzip.compress(data)))) == expected
+    assert [record["offset"] for record in quarantine.records] == offsets
+
+    # Malformed lines found by worker processes are written by the main process
+    log_file = tmp_path / "gelf.log"
+    log_file.write_bytes(data)
+    quarantine_file = tmp_path / "quarantine.jsonl"
+    quarantine = Quarantine(str(quarantine_file))
+    parser = GELFParser(quarantine=quarantine)
+    events = list(parser.parse_parallel(str(log_file), 2, shard_size=40))
+    quarantine.close()
+    assert events == expected
+    assert quarantine.count == 4
+    records = [json.loads(line) for line in quarantine_file.read_text().splitlines()]
+    assert [record["offset"] for record in records] == offsets
+    assert all(record["input"] == str(log_file) for record in records)
+    assert records[0]["error"].startswith("JSONDecodeError")
+
+
+@pytest.mark.parametrize("engine", ["pandas", "json", "orjson", "msgspec"])
+@pytest.mark.parametrize("fast_path", [True, False])
+def test_gelfparser_parse_with_predicate(tmp_path, engine, fast_path):
+    """Test the GELFParser only yielding events matching a predicate."""
+
+    if engine != "json":
+        pytest.importorskip(engine)
+
+    events = [
+        {"username": "foo", "event_type": "problem_check", "context": {"id": 1}},
+        {"username": "bar", "event_type": "play_video", "context": {"id": 2}},
+        {"username": "baz", "event_type": "problem_graded", "context": {"id": 1}},
+        # Literals are found in the raw line but the event does not match
+        {"username": "problem_", "event_type": "video", "context": {"id": 1}},
+        {"username": "qux", "event_type": "problem_check", "context": "n/a"},
+    ]
+    log_file = tmp_path / "gelf.log"
+    log_file.write_text(
+        "".join(
+            json.dumps({"short_message": json.dumps(event)}) + "\n" for event in events
+        )
+    )
+
+    predicate = Predicate('event_type startswith "problem_" and context.id == 1')
+    parser = GELFParser(engine=engine, fast_path=fast_path, predicate=predicate)
+    expected = [json.dumps(events[0]), json.dumps(events[2])]
+    for chunksize in (1, 2, 10):
+        assert list(parser.parse(str(log_file), chunksize=chunksize)) == expected
+    assert [
+        event
+        for _, chunk in parser.parse_chunks(str(log_file), chunksize=2)
+        for event in chunk
+    ] == expected
+    assert list(parser.parse_parallel(str(log_file), 2, shard_size=100)) == expected
+
+    # Lines are only decoded if they contain the predicate literals
+    assert parser.parse_lines([(0, b"not even json")]) == []
+
+
+def test_gelfparser_parse_with_predicate_tolerant(tmp_path):
+    """Test the GELFParser with a predicate skipping malformed lines."""
+
+    log_file = tmp_path / "gelf.log"
+    log_file.write_bytes(b"".join(MALFORMED_GELF_LINES))
+    quarantine = Quarantine()
+    offsets = [len(b"".join(MALFORMED_GELF_LINES[:idx])) for idx in (1, 2, 4, 5)]
+
+    # Malformed lines not containing the predicate literals are skipped
+    parser = GELFParser(quarantine=quarantine, predicate=Predicate("username != foo"))
+    assert list(parser.parse(str(log_file))) == ['{"username": "bar"}']
+    assert quarantine.count == 0
+
+    parser = GELFParser(
+        quarantine=quarantine, predicate=Predicate("not username == foo")
+    )
+    assert list(parser.parse(str(log_file))) == ['{"username": "bar"}']
+    assert [record["offset"] for record in quarantine.records] == offsets
+
+
+@pytest.mark.parametrize("compress", [None, gzip.compress])
+def test_gelfparser_parse_chunks(tmp_path, compress):
+    """Test the GELFParser parsing by chunks from a given offset."""
+
+    lines = [f'{{"short_message": "event_{idx}"}}\n'.encode() for idx in range(5)]
+    data = b"".join(lines[:2]) + b"\n" + b"".join(lines[2:])
+    log_file = tmp_path / "gelf.log"
+    log_file.write_bytes(compress(data) if compress else data)
+
+    parser = GELFParser()
+    chunks = list(parser.parse_chunks(str(log_file), chunksize=2))
+    assert chunks == [
+        (len(b"".join(lines[:2])), ["event_0", "event_1"]),
+        (len(b"".join(lines[:4])) + 1, ["event_2", "event_3"]),
+        (len(data), ["event_4"]),
+    ]
+
+    chunks = list(parser.parse_chunks(str(log_file), chunksize=2, start=chunks[0][0]))
+    assert chunks == [
+        (len(b"".join(lines[:4])) + 1, ["event_2", "event_3"]),
+        (len(data), ["event_4"]),
+    ]
+
+    assert not list(parser.parse_chunks(str(log_file), start=len(data)))
+
+
+async def iter_async_chunks(data, chunk_size):
+    """Yield data by chunks as an asynchronous byte stream would"""
+
+    for chunk in iter_chunks(data, chunk_size):
+        await asyncio.sleep(0)
+        yield bytes(chunk)
+
+
+def test_aiter_lines():
+    """Test lines reading from an asynchronous byte stream."""
+
+    async def read_lines(stream):
+        """Return all (offset, line) tuples of the stream"""
+
+        return [line async for lines in aiter_lines(stream) for line in lines]
+
+    data = b"foo\n\nbar\r\n  \nbaz"
+    expected = [(0, b"foo\n"), (5, b"bar\r\n"), (13, b"baz")]
+    for chunk_size in (1, 4, 100):
+        assert asyncio.run(read_lines(iter_async_chunks(data, chunk_size))) == expected
+    assert asyncio.run(read_lines(iter_async_chunks(gzip.compress(data), 3))) == (
+        expected
+    )
+
+    async def read_stream_reader():
+        """Read lines from an asyncio StreamReader"""
+
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await read_lines(reader)
+
+    assert asyncio.run(read_stream_reader()) == expected
+
+
+@pytest.mark.parametrize("engine", ["pandas", "json"])
+@pytest.mark.parametrize("executor", [None, ThreadPoolExecutor, ProcessPoolExecutor])
+def test_gelfparser_aparse(engine, executor):
+    """Test the GELFParser parsing asynchronous byte streams concurrently."""
+
+    streams = [
+        b"".join(
+            f'{{"short_message": "stream_{stream}_{idx}"}}\n'.encode()
+            for idx in range(20)
+        )
+        for stream in range(3)
+    ]
+    parser = GELFParser(engine=engine)
+
+    async def parse(data, pool):
+        """Parse a stream and return its events"""
+
+        return [
+            event
+            async for event in parser.aparse(
+                iter_async_chunks(data, 64), chunksize=3, executor=pool
+            )
+        ]
+
+    async def parse_streams(pool):
+        """Parse all streams concurrently"""
+
+        return await asyncio.gather(*(parse(data, pool) for data in streams))
+
+    if executor is None:
+        results = asyncio.run(parse_streams(None))
+    else:
+        with executor(max_workers=2) as pool:
+            results = asyncio.run(parse_streams(pool))
+
+    assert results == [
+        [f"stream_{stream}_{idx}" for idx in range(20)] for stream in range(3)
+    ]
+
+
+def test_gelfparser_aparse_tolerant():
+    """Test the GELFParser skipping malformed lines of asynchronous streams."""
+
+    data = b"".join(MALFORMED_GELF_LINES)
+    quarantine = Quarantine()
+    parser = GELFParser(quarantine=quarantine)
+
+    async def parse():
+        """Parse the gzipped stream"""
+
+        return [
+            event
+            async for event in parser.aparse(
+                iter_async_chunks(gzip.compress(data), 10), chunksize=2
+            )
+        ]
+
+    assert asyncio.run(parse()) == ['{"username": "foo"}', '{"username": "bar"}']
+    assert [record["offset"] for record in quarantine.records] == [
+        len(b"".join(MALFORMED_GELF_LINES[:idx])) for idx in (1, 2, 4, 5)
+    ]
+
+
+def test_iter_mapped_lines(tmp_path):
+    """Test line iteration over a memory-mapped file."""
+
+    input_file = tmp_path / "lines"
+    input_file.write_bytes(b"foo\n\nbar\r\n\r\n  \nbaz")
+
+    with open(input_file, "rb") as stream:
+        mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+
+    assert list(iter_mapped_lines(mapped)) == [b"foo\n", b"bar\r\n", b"baz"]
+
+    lines = list(iter_mapped_lines(mapped, buffers=True))
+    assert all(isinstance(line, memoryview) for line in lines)
+    assert [line.tobytes() for line in lines] == [b"foo\n", b"bar\r\n", b"baz"]
+    for line in lines:
+        line.release()
+
+    assert list(iter_mapped_lines(mapped, offsets=True)) == [
+        (0, b"foo\n"),
+        (5, b"bar\r\n"),
+        (15, b"baz"),
+    ]
+    mapped.close()
+
+
+def test_open_lines(tmp_path):
+    """Test the open_lines context manager with mapped and streamed inputs."""
+
+    input_file = tmp_path / "lines"
+    input_file.write_bytes(b"foo\n\nbar\n")
+
+    with open_lines(str(input_file), buffers=True) as lines:
+        assert [bytes(line) for line in lines] == [b"foo\n", b"bar\n"]
+
+    # Lines still referenced by the consumer do not prevent the input closing
+    with open_lines(str(input_file), buffers=True) as lines:
+        first = next(lines)
+    assert bytes(first) == b"foo\n"
+
+    # Compressed and empty inputs are not memory-mapped
+    gzip_file = tmp_path / "lines.gz"
+    gzip_file.write_bytes(gzip.compress(b"foo\n\nbar\n"))
+    with open_lines(str(gzip_file), buffers=True) as lines:
+        assert list(lines) == [b"foo\n", b"bar\n"]
+
+    empty_file = tmp_path / "empty"
+    empty_file.write_bytes(b"")
+    with open_lines(str(empty_file)) as lines:
+        assert list(lines) == []
+
+    with open_lines(BytesIO(b"foo\n\nbar\n")) as lines:
+        assert list(lines) == [b"foo\n", b"bar\n"]
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        b'{"version": "1.1", "short_message": "foo", "level": 6}\n',
+        b'{"version":"1.1","short_message":"foo","level":6}',
+        b'{"short_message" :"foo"}',
+        b'{ "short_message":\t"foo" }\n',
+        b'{"short_message": "{\\"username\\": \\"foo\\"}", "host": "bar"}\n',
+        b'{"short_message": "\\u00e9t\\u00e9 \\\\", "host": "bar"}\n',
+        b'{"short_message": "\\\\\\"", "host": "bar"}\n',
+        '{"short_message": "été", "host": "bar"}\n'.encode(),
+        b'{"short_message": "", "host": "bar"}\n',
+        b'{"full_message": "\\"short_message\\": \\"bar\\"", "short_message": "f"}',
+        b'{"_extra": "x", "short_message": 1}',
+        b'{"short_message": "foo", "short_message": "bar"}',
+        b'{"x\\"short_message": "bar", "short_message": "foo"}',
+    ],
+)
+def test_extract_short_message(line):
+    """Test the short_message fast path against a full JSON decoding."""
+
+    value = extract_short_message(line)
+    if value is not None:
+        assert value == json.loads(line)["short_message"]
+
+
+def test_extract_short_message_fallbacks():
+    """Test that unusual lines are not handled by the fast path."""
+
+    assert extract_short_message(b'{"host": "bar"}') is None
+    assert extract_short_message(b'["short_message", "foo"]') is None
+    assert extract_short_message(b'{"short_message": 1}') is None
+    assert extract_short_message(b'{"short_message": null}') is None
+    assert extract_short_message(b'{"short_message": "foo') is None
+    assert extract_short_message(b'{"short_message": "foo" "host": "bar"}') is None
+    assert extract_short_message(b'{"short_message": "\\x"}') is None
+    assert extract_short_message(b'{"short_message": "\xff"}') is None
+    assert (
+        extract_short_message(b'{"short_message": "foo", "short_message": "bar"}')
+        is None
+    )
+    assert extract_short_message(b'{"x\\"short_message": "bar"}') is None
+    assert extract_short_message(b'{"short_message": "foo", "host": "tru') is None
+    assert extract_short_message(b'{"short_message": "foo", "host": "bar"') is None
+    assert extract_short_message(b'{"short_message": "foo", "host": }') is None
+    assert extract_short_message(b'{"short_message": "foo", "host" "bar"}') is None
+    assert extract_short_message(b'{"short_message": "foo"} "host": "bar"}') is None
+
+
+@pytest.mark.parametrize("engine", ["json", "orjson", "msgspec"])
+@pytest.mark.parametrize("fast_path", [True, False])
+def test_gelfparser_parse_with_fast_path(gelf_logger, engine, fast_path):
+    """Test the GELFParser parsing with or without the fast path."""
+
+    if engine != "json":
+        pytest.importorskip(engine)
+
+    gelf_logger.info('{"username": "foo", "event": "\\"quoted\\" \\u00e9"}')
+    gelf_logger.info('{"username": "bar"}')
+    log_file_name = gelf_logger.handlers[0].stream.name
+    with open(log_file_name, "a") as log_file:
+        log_file.write('{"short_message": "baz", "short_message": "lol"}\n')
+
+    parser = GELFParser(engine=engine, fast_path=fast_path)
+    assert list(parser.parse(log_file_name)) == [
+        '{"username": "foo", "event": "\\"quoted\\" \\u00e9"}',
+        '{"username": "bar"}',
+        "lol",
+    ]
@@ -0,0 +1,149 @@
+"""
+Tests for ralph.predicates module.
+"""
+import json
+import pickle
+
+import pytest
+
+from ralph.exceptions import PredicateSyntaxError
+from ralph.predicates import Predicate
+
+EVENTS = [
+    {
+        "username": "foo",
+        "event_type": "problem_check",
+        "context": {"course_id": "course-v1:a+b+c", "user_id": 1},
+        "tags": ["a", "b"],
+    },
+    {
+        "username": "bar",
+        "event_type": "play_video",
+        "context": {"course_id": "course-v1:d+e+f", "user_id": 2},
+    },
+    {"username": "", "event_type": "problem_graded", "context": "n/a"},
+]
+
+
+@pytest.mark.parametrize(
+    "expression,expected",
+    [
+        ('username == "foo"', ["foo"]),
+        ("username == foo", ["foo"]),
+        ("username != foo", ["bar", ""]),
+        ('event_type startswith "problem_"', ["foo", ""]),
+        ("event_type endswith _video", ["bar"]),
+        ("event_type contains check", ["foo"]),
+        ("tags contains a", ["foo"]),
+        ("context.course_id == course-v1:a+b+c", ["foo"]),
+        ("context.user_id >= 2", ["bar"]),
+        ("context.user_id < 2", ["foo"]),
+        ("context.user_id in (1, 3)", ["foo"]),
+        ('username in ("bar", "")', ["bar", ""]),
+        ("context.user_id == 1.0", ["foo"]),
+        ("context.user_id == null", []),
+        ("missing == null or missing != null", []),
+        ("context.user_id > foo", []),
+        ("username == foo or username == bar", ["foo", "bar"]),
+        ("username != foo and not event_type endswith video", [""]),
+        ("not (username == foo or username == bar)", [""]),
+        ("not not username == foo", ["foo"]),
+        (
+            "event_type startswith problem_ and (username == foo or username == bar)",
+            ["foo"],
+        ),
+    ],
+)
+def test_predicate_evaluate(expression, expected):
+    """Test predicates evaluation on decoded events."""
+
+    predicate = Predicate(expression)
+    assert [event["username"] for event in predicate(EVENTS)] == expected
+
+
+def test_predicate_evaluate_non_object_events():
+    """Test that comparisons on events that are not objects are false."""
+
+    events = [[1], "foo", None, {"username": "foo", "context": [1]}]
+    assert Predicate("username == foo")(events) == events[3:]
+    assert Predicate("context.user_id == 1 or username != foo")(events) == []
+    assert Predicate("not username == foo")(events) == events[:3]
+
+
+@pytest.mark.parametrize(
+    "expression,error",
+    [
+        ("", "Unexpected end of expression"),
+        ("username ==", "Unexpected end of expression"),
+        ("username = foo", "Unexpected character at position 9"),
+        ("username is foo", "Unsupported operator 'is'"),
+        ("and == foo", "Expected a field name, got 'and'"),
+        ("1 == foo", "Expected a field name, got '1'"),
+        ("username == foo bar", "Unexpected token 'bar'"),
+        ("username == (", "Expected a value, got '('"),
+        ("(username == foo", "Unexpected end of expression"),
+        ("(username == foo or", "Unexpected end of expression"),
+        ("username in foo", "Expected a parenthesized list of values"),
+        ("username in (foo bar)", "Missing closing parenthesis"),
+        ('username == "\\x"', 'Invalid string "\\x"'),
+    ],
+)
+def test_predicate_syntax_errors(expression, error):
+    """Test predicates with an invalid syntax."""
+
+    with pytest.raises(PredicateSyntaxError) as excinfo:
+        Predicate(expression)
+    assert str(excinfo.value) == f"Invalid predicate expression '{expression}': {error}"
+
+
+def test_predicate_literals():
+    """Test literals that must appear in raw events matching a predicate."""
+
+    predicate = Predicate(
+        'event_type startswith "problem_" and context.course_id == course-v1:a+b+c'
+    )
+    assert predicate.fields == {("event_type",), ("context", "course_id")}
+    assert predicate.literals == {
+        '"event_type"',
+        '"problem_',
+        '"course_id"',
+        '"course-v1:a+b+c"',
+    }
+    assert predicate.get_raw_literals(depth=1) == {
+        '\\"event_type\\"',
+        '\\"problem_',
+        '\\"course_id\\"',
+        '\\"course-v1:a+b+c\\"',
+    }
+
+    # Literals of all operands of a disjunction are required
+    assert Predicate("username == foo or username endswith bar").literals == {
+        '"username"'
+    }
+    # Negations and non-string comparisons do not require literals
+    assert Predicate("not username == foo").literals == set()
+    assert Predicate("user_id == 1 and tags contains a").literals == {
+        '"user_id"',
+        '"tags"',
+        "a",
+    }
+    # Literals that could be escaped by JSON encoders are ignored
+    assert Predicate('page == "/courses/" and name == "f\\u00e9e"').literals == {
+        '"page"',
+        '"name"',
+    }
+
+    # Raw events matching a predicate contain its literals
+    for expression in ("context.course_id == course-v1:a+b+c", "username != foo"):
+        predicate = Predicate(expression)
+        for event in predicate(EVENTS):
+            raw_event = json.dumps(event)
+            assert all(literal in raw_event for literal in predicate.literals)
+
+
+def test_predicate_pickling():
+    """Test predicates are compiled again when unpickled."""
+
+    predicate = pickle.loads(pickle.dumps(Predicate("username == foo")))
+    assert repr(predicate) == "Predicate('username == foo')"
+    assert predicate(EVENTS) == EVENTS[:1]
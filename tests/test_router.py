@@ -0,0 +1,108 @@
+"""
+Tests for the ralph.router module
+"""
+import json
+from queue import Queue
+
+import pytest
+
+from ralph.exceptions import ConfigurationException
+from ralph.router import END, QueueStream, Route, Router, load_routes
+
+EVENTS = [
+    json.dumps({"username": f"user_{idx}", "event_type": event_type}) + "\n"
+    for idx, event_type in enumerate(
+        ["play_video", "problem_check", "pause_video", "page_close"] * 5
+    )
+]
+
+
+def test_queue_stream():
+    """Test reading lines received by batches from a queue."""
+
+    queue = Queue()
+    for batch in (["a\n", "bc\n"], ["def\n"], END):
+        queue.put(batch)
+    stream = QueueStream(queue)
+    assert stream.read(3) == "a\nb"
+    assert stream.read(1) == "c"
+    assert stream.read() == "\ndef\n"
+    assert stream.read(10) == ""
+
+    queue = Queue()
+    for batch in (["a\n", "bc\n"], ["def\n"], END):
+        queue.put(batch)
+    assert list(QueueStream(queue)) == ["a\n", "bc\n", "def\n"]
+
+
+def test_route_validation(fs):
+    """Test routes are validated when instantiated."""
+    # pylint: disable=invalid-name,unused-argument
+
+    with pytest.raises(ConfigurationException, match="Invalid route foo: foo class"):
+        Route("foo", backend="foo")
+    with pytest.raises(ConfigurationException, match="Invalid predicate"):
+        Route("foo", backend="fs", where="event_type ==", archive="foo")
+    with pytest.raises(ConfigurationException, match="require an archive name"):
+        Route("foo", backend="fs")
+
+    fs.create_file("routes.yml", contents="routes:\n  - foo\n")
+    with pytest.raises(ConfigurationException, match="Routes file routes.yml is not"):
+        load_routes("routes.yml")
+
+
+def test_router(fs):
+    """Test routing events to several backends in a single pass."""
+    # pylint: disable=invalid-name,unused-argument
+
+    fs.create_file(
+        "routes.yml",
+        contents="""
+routes:
+  videos:
+    where: event_type endswith _video
+    backend: fs
+    archive: videos.jsonl
+    fs_path: archives
+  problems:
+    where: event_type startswith problem_
+    backend: fs
+    archive: problems.jsonl
+    fs_path: archives
+  all:
+    backend: fs
+    archive: all.jsonl
+    fs_path: archives
+""",
+    )
+    routes = load_routes("routes.yml")
+    assert [route.name for route in routes] == ["videos", "problems", "all"]
+
+    router = Router(routes, batch_size=3, queue_size=1)
+    events = EVENTS[:-1] + [EVENTS[-1].rstrip("\n"), "\n"]
+    assert router.route(iter(events)) == {"videos": 10, "problems": 5, "all": 20}
+
+    with open("archives/videos.jsonl") as archive:
+        assert archive.read() == "".join(event for event in EVENTS if "_video" in event)
+    with open("archives/problems.jsonl") as archive:
+        assert archive.read() == "".join(EVENTS[1::4])
+    with open("archives/all.jsonl") as archive:
+        assert archive.read() == "".join(EVENTS)
+
+
+def test_router_failed_route(fs):
+    """Test other routes are written when a route fails."""
+    # pylint: disable=invalid-name,unused-argument
+
+    fs.create_file("archives/existing.jsonl", contents="foo\n")
+    routes = [
+        Route("existing", backend="fs", archive="existing.jsonl", fs_path="archives"),
+        Route("new", backend="fs", archive="new.jsonl", fs_path="archives"),
+    ]
+    with pytest.raises(FileExistsError):
+        Router(routes, batch_size=1, queue_size=1).route(iter(EVENTS))
+
+    with open("archives/existing.jsonl") as archive:
+        assert archive.read() == "foo\n"
+    with open("archives/new.jsonl") as archive:
+        assert archive.read() == "".join(EVENTS)
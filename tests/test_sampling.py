@@ -0,0 +1,97 @@
+"""
+Tests for the ralph.sampling module
+"""
+import pickle
+from collections import Counter
+
+import pytest
+
+from ralph.filters import FilterPipeline
+from ralph.sampling import HashSampler, ReservoirSampler
+
+
+def test_hash_sampler_invalid_rate():
+    """Test the HashSampler instantiation with an invalid rate."""
+
+    with pytest.raises(ValueError, match="Sampling rate should be between 0 and 1"):
+        HashSampler(1.5)
+
+
+def test_hash_sampler():
+    """Test the HashSampler keeps a deterministic fraction of key values."""
+
+    events = [{"username": f"user_{idx % 1000}", "idx": idx} for idx in range(5000)]
+    sampler = HashSampler(0.1)
+    sampled = sampler(events)
+
+    # Events of a learner are all kept or all dropped
+    users = Counter(event["username"] for event in sampled)
+    assert set(users.values()) == {5}
+    assert 70 <= len(users) <= 130
+
+    # The sample is the same for another sampler or a subset of the stream
+    assert HashSampler(0.1)(events[:1000]) == sampled[: len(users)]
+    # Samples of lower rates are included in samples of higher rates
+    assert {event["idx"] for event in HashSampler(0.05)(events)} < {
+        event["idx"] for event in HashSampler(0.2)(events)
+    }
+    # Another seed samples other learners
+    assert HashSampler(0.1, seed="foo")(events) != sampled
+
+    assert HashSampler(0)(events) == []
+    assert HashSampler(1)(events) == events
+
+
+def test_hash_sampler_key():
+    """Test the HashSampler with nested or missing key fields."""
+
+    events = [{"context": {"user_id": idx}} for idx in range(1000)] + [{}, {}]
+    sampler = HashSampler(0.5, key="context.user_id")
+    assert 400 <= len(sampler(events)) <= 600
+    # Events missing the key field are hashed as null values
+    assert len(sampler([{}, {"context": "n/a"}])) in (0, 2)
+
+    sampler = pickle.loads(pickle.dumps(sampler))
+    assert sampler.key == "context.user_id"
+    assert sampler(events) == HashSampler(0.5, key="context.user_id")(events)
+
+
+def test_hash_sampler_pipeline():
+    """Test the HashSampler as a filter pipeline stage."""
+
+    events = [f'{{"username": "user_{idx}"}}' for idx in range(100)]
+    pipeline = FilterPipeline([HashSampler(0.5)], chunksize=7)
+    assert list(pipeline(events)) == [
+        event for event in events if HashSampler(0.5).keeps({"username": event[14:-2]})
+    ]
+
+
+def test_reservoir_sampler_invalid_size():
+    """Test the ReservoirSampler instantiation with an invalid size."""
+
+    with pytest.raises(ValueError, match="Reservoir size should be positive, not 0"):
+        ReservoirSampler(0)
+
+
+def test_reservoir_sampler():
+    """Test the ReservoirSampler samples a fixed number of events."""
+
+    # Streams shorter than the reservoir are fully kept
+    assert list(ReservoirSampler(10)(iter(range(5)))) == list(range(5))
+
+    sample = ReservoirSampler(10, seed=1).sample(iter(range(1000)))
+    assert len(sample) == len(set(sample)) == 10
+    assert all(0 <= event < 1000 for event in sample)
+    assert ReservoirSampler(10, seed=1).sample(range(1000)) == sample
+    assert ReservoirSampler(10, seed=2).sample(range(1000)) != sample
+
+
+def test_reservoir_sampler_uniformity():
+    """Test events have the same probability to be sampled."""
+
+    counts = Counter()
+    for seed in range(2000):
+        counts.update(ReservoirSampler(10, seed=seed).sample(range(100)))
+    # Each event is expected 200 times
+    assert len(counts) == 100
+    assert all(140 <= count <= 260 for count in counts.values())
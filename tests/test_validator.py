@@ -0,0 +1,122 @@
+"""
+Tests for the ralph.validator module
+"""
+
+import json
+
+from ralph.validator import BASE_SCHEMA, JSONString, Validator, compile_schema, optional
+
+
+def make_event(event_type, **fields):
+    """Return a raw Open edX event of the given type"""
+
+    return json.dumps(
+        {
+            "username": "john",
+            "event_type": event_type,
+            "event_source": "browser",
+            "time": "2021-01-01T12:00:00.000000+00:00",
+            "context": {"course_id": "course-v1:a+b+c", "user_id": 1},
+            "event": "",
+            **fields,
+        }
+    )
+
+
+def test_compile_schema():
+    """Test compiled schemas return the first error of invalid objects"""
+
+    validate = compile_schema(
+        {
+            "a": int,
+            "b.c": {"x", "y"},
+            "d": optional((int, float)),
+            "e": JSONString({"f": str}),
+        }
+    )
+
+    assert validate({"a": 1, "b": {"c": "x"}, "e": '{"f": "g"}'}) is None
+    assert validate({"a": 1, "b": {"c": "y"}, "d": None, "e": {"f": "g"}}) is None
+    assert validate({"b": {"c": "x"}}) == "a is missing"
+    assert validate({"a": "1"}) == "a should be of type int"
+    assert validate({"a": 1, "b": {"c": "z"}}) == "b.c should be one of x, y"
+    assert validate({"a": 1, "b": {"c": "x"}, "d": "2"}) == (
+        "d should be of type int or float"
+    )
+    assert validate({"a": 1, "b": {"c": "x"}, "e": "{"}) == (
+        "e should be a JSON string"
+    )
+    assert validate({"a": 1, "b": {"c": "x"}, "e": "[]"}) == "e should be an object"
+    assert validate({"a": 1, "b": {"c": "x"}, "e": {"f": 1}}) == (
+        "e.f should be of type str"
+    )
+
+
+def test_validator_validate_batch():
+    """Test batches of events are validated in input order"""
+
+    events = [
+        make_event("page_close", page="https://lms.example.org/courses"),
+        make_event("page_close"),
+        make_event("play_video", event='{"id": "video1", "currentTime": 1.5}'),
+        "{",
+        make_event("play_video", event='{"currentTime": 1.5}'),
+        make_event("unknown"),
+        make_event("problem_check", event_source="browser"),
+        make_event("other"),
+    ]
+
+    validator = Validator()
+    valid, invalid = validator.validate_batch(events)
+
+    assert valid == [events[0], events[2], events[5], events[7]]
+    assert invalid == [
+        (events[1], "page is missing"),
+        (events[3], "Event should be a JSON object"),
+        (events[4], "event.id is missing"),
+        (events[6], "event_source should be one of server"),
+    ]
+    assert {
+        key: (stats["valid"], stats["invalid"])
+        for key, stats in validator.stats.items()
+    } == {
+        "page_close": (1, 1),
+        "play_video": (1, 1),
+        "<unknown>": (2, 0),
+        "problem_check": (0, 1),
+        None: (0, 1),
+    }
+    assert all(stats["duration"] >= 0 for stats in validator.stats.values())
+
+
+def test_validator_strict():
+    """Test strict validators reject events of unknown types"""
+
+    events = [make_event("unknown"), make_event("other")]
+    validator = Validator(strict=True)
+    assert validator.validate_batch(events) == (
+        [],
+        [
+            (events[0], "Unknown event type unknown"),
+            (events[1], "Unknown event type other"),
+        ],
+    )
+    assert validator.stats["<unknown>"]["invalid"] == 2
+    assert Validator(schemas={}, base_schema={"username": str}).validate_batch(
+        ['{"username": 1}']
+    ) == ([], [('{"username": 1}', "username should be of type str")])
+
+
+def test_validator_get_validator_cache():
+    """Test validators are compiled once per event type"""
+
+    validator = Validator()
+
+    assert validator.get_validator("page_close") is validator.get_validator(
+        "page_close"
+    )
+    assert validator.get_validator("page_close") is not validator.get_validator(
+        "play_video"
+    )
+    assert validator.get_validator("foo") is validator.get_validator("bar")
+    assert validator.base_schema is BASE_SCHEMA